@@ -0,0 +1,219 @@
+"""
+Benchmark Suite for the Class Scheduling ETL
+
+Generates synthetic exports with generate_data.py at several sizes, runs the
+ETL on each one in its own directory, and records the time taken by every
+ETL stage (from the --report of etl_process.py) and by every validation query
+(the queries in etl_process.VALIDATION_QUERIES and validation.sql). Per-stage
+peak memory is left out, since tracemalloc would slow the ETL down several
+times over; the peak resident memory of the whole run is recorded instead.
+
+Results can be saved as a baseline, and a later run compared against it: the
+comparison fails if a stage or query got more than --tolerance slower than the
+baseline. Timings depend on the machine, so baselines should only be compared
+on the machine that recorded them.
+
+Generated workbooks and the baseline are kept in .benchmarks/ (ignored by
+git), and the workbooks are reused by later runs. The ETL always parses them
+(--no-cache), so the extract stage is measured too.
+
+Usage:
+    python benchmark.py --save-baseline
+    python benchmark.py --compare
+    python benchmark.py --sizes 10000,100000 --compare
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+
+import etl_process
+import generate_data
+import query_plans
+
+# Directory that holds the generated workbooks and the databases built from them
+BENCH_DIR = '.benchmarks'
+
+# Baselines are only valid on the machine that recorded them, so they are
+# kept with the other local benchmark files
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# A timing regresses if it is this much slower than the baseline...
+TOLERANCE = 0.25
+
+# ...and slower by at least this many seconds, so noise on tiny timings is ignored
+MIN_REGRESSION_S = 0.05
+
+# Each query is run this many times and the fastest run is kept
+QUERY_REPEATS = 3
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def workbook_for(rows, terms, departments, duplicate_rate, seed):
+    """
+    Return the path of the synthetic workbook for the given parameters,
+    generating it if it doesn't exist yet.
+    """
+    name = f"synthetic-{rows}-t{terms}-d{departments}-dup{duplicate_rate}-s{seed}.xlsx"
+    path = os.path.join(BENCH_DIR, name)
+    if not os.path.exists(path):
+        print(f"Generating {path}...")
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        df = generate_data.generate(rows, terms, departments, duplicate_rate, seed)
+        tmp = f"{path}.tmp.xlsx"
+        generate_data.write_workbook(df, tmp)
+        os.replace(tmp, path)
+    return path
+
+def run_etl(workbook, workdir):
+    """
+    Run etl_process.py on a workbook inside workdir and return its JSON report.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    report_file = os.path.join(workdir, 'report.json')
+    command = [sys.executable, os.path.join(HERE, 'etl_process.py'),
+               '--input', os.path.abspath(workbook), '--no-cache', '--report', 'report.json',
+               '--no-trace-memory']
+    with open(os.path.join(workdir, 'etl_output.txt'), 'w') as output:
+        subprocess.run(command, cwd=workdir, stdout=output, stderr=subprocess.STDOUT, check=True)
+    with open(report_file) as f:
+        return json.load(f)
+
+def time_queries(db_file):
+    """
+    Return the fastest of QUERY_REPEATS runs of every validation query, in seconds.
+    """
+    queries = dict(etl_process.VALIDATION_QUERIES)
+    queries.update(query_plans.read_sql_file(os.path.join(HERE, query_plans.VALIDATION_SQL)))
+
+    conn = sqlite3.connect(db_file)
+    timings = {}
+    for name, sql in queries.items():
+        best = None
+        for _ in range(QUERY_REPEATS):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    conn.close()
+    return timings
+
+def run_benchmarks(sizes, terms, departments, duplicate_rate, seed):
+    """
+    Benchmark the ETL and the validation queries at each size.
+    Returns the results keyed by size.
+    """
+    results = {}
+    for rows in sizes:
+        workbook = workbook_for(rows, terms, departments, duplicate_rate, seed)
+        workdir = os.path.join(BENCH_DIR, f"run-{rows}")
+        print(f"Running the ETL on {rows} rows...")
+        report = run_etl(workbook, workdir)
+        queries = time_queries(os.path.join(workdir, etl_process.DB_FILE))
+
+        results[str(rows)] = {
+            'total_s': report['wall_s'],
+            'max_rss_mb': report['max_rss_mb'],
+            'stages': {stage['name']: stage['wall_s'] for stage in report['stages']},
+            'queries': queries
+        }
+        print(f"  ETL {report['wall_s']:.2f}s, queries {sum(queries.values()):.3f}s")
+    return results
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Return a description of every timing in results that is more than
+    tolerance slower than the same timing in baseline.
+    """
+    regressions = []
+    for size, result in results.items():
+        if size not in baseline:
+            continue
+        base = baseline[size]
+        timings = [('total', result['total_s'], base.get('total_s'))]
+        for group in ('stages', 'queries'):
+            for name, seconds in result[group].items():
+                timings.append((f"{group[:-1]} {name}", seconds, base.get(group, {}).get(name)))
+
+        for name, seconds, before in timings:
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before >= MIN_REGRESSION_S:
+                regressions.append(f"{size} rows, {name}: {before:.3f}s -> {seconds:.3f}s "
+                                   f"(+{(seconds / before - 1) * 100:.0f}%)")
+    return regressions
+
+def print_results(results):
+    """
+    Print the stage and query timings for each size.
+    """
+    for size, result in results.items():
+        print(f"\n--- {size} rows: {result['total_s']:.2f}s ---")
+        for name, seconds in result['stages'].items():
+            print(f"{name}: {seconds:.3f}s")
+        slowest = sorted(result['queries'].items(), key=lambda item: -item[1])[:5]
+        print("Slowest queries:")
+        for name, seconds in slowest:
+            print(f"  {name}: {seconds:.4f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ETL on synthetic exports.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated row counts to benchmark")
+    parser.add_argument('--terms', type=int, default=2)
+    parser.add_argument('--departments', type=int, default=10)
+    parser.add_argument('--duplicate-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline results file")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="save the results as the new baseline")
+    parser.add_argument('--compare', action='store_true',
+                        help="fail if any timing regressed against the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed slowdown as a fraction of the baseline (default: %(default)s)")
+    parser.add_argument('--output', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run_benchmarks(sizes, args.terms, args.departments, args.duplicate_rate, args.seed)
+    print_results(results)
+
+    document = {'python': platform.python_version(), 'machine': platform.node(), 'sizes': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    ok = True
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['sizes']
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n--- Comparison with {args.baseline} ---")
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print("No regressions" if not regressions else f"{len(regressions)} regressions")
+        ok = not regressions
+
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+            previous['sizes'].update(results)
+            document['sizes'] = previous['sizes']
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Room and Instructor Conflict Detection for the Class Scheduling Database
+
+Finds every pair of schedule rows in the same term that overlap in time on the
+same day, either in the same room or for the same instructor, and stores them
+in the conflict table. Unlike the self-join in validation.sql, which only
+matched identical day_pattern strings, this compares actual meeting times, so
+"MW 9:00-10:15" conflicts with "MWF 9:30-10:20".
+
+Each schedule row is expanded into one interval per meeting day. Intervals are
+sorted by (room or instructor, day, start time), and for each interval a binary
+search finds the later intervals that start before it ends. That is a sort and
+sweep in O(n log n + k) for n intervals and k conflicting pairs, with no
+Python-level loop per row.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Day letters used in "Class Days", in bitmask order (M = 1, T = 2, W = 4, ...)
+DAY_LETTERS = 'MTWRFSU'
+
+def parse_days(days):
+    """
+    Convert a column of day strings such as "MWF" or "TR" into day bitmasks.
+    A categorical column is converted once per category.
+    """
+    if isinstance(days.dtype, pd.CategoricalDtype):
+        masks = parse_days(pd.Series(days.cat.categories)).to_numpy()
+        codes = days.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, masks[codes], 0), index=days.index, dtype='int64')
+
+    days = days.fillna('').astype(str).str.upper()
+    mask = pd.Series(0, index=days.index, dtype='int64')
+    for bit, letter in enumerate(DAY_LETTERS):
+        mask |= days.str.contains(letter, regex=False).astype('int64') * (1 << bit)
+    return mask
+
+def days_to_text(mask):
+    """
+    Convert a column of day bitmasks back into day strings such as "MWF".
+    """
+    mask = mask.astype('int64')
+    text = pd.Series('', index=mask.index, dtype=object)
+    for bit, letter in enumerate(DAY_LETTERS):
+        text = text + np.where(mask & (1 << bit), letter, '')
+    return text
+
+def to_minutes(times):
+    """
+    Convert a column of H.MM clock times, as the registrar export writes them
+    (13.15 is 1:15 pm, 8.5 is 8:50 am), into minutes after midnight.
+    """
+    times = pd.to_numeric(times, errors='coerce')
+    hours = np.floor(times)
+    minutes = np.round((times - hours) * 100)
+    return (hours * 60 + minutes).astype('Int64')
+
+def expand_meetings(schedules):
+    """
+    Expand schedule rows with a days bitmask and start and end minutes into one
+    row per meeting day. Rows without a valid time range are dropped.
+    """
+    valid = schedules['start_min'].notna() & schedules['end_min'].notna()
+    schedules = schedules[valid & (schedules['end_min'] > schedules['start_min'])]
+
+    meetings = []
+    for bit in range(len(DAY_LETTERS)):
+        on_day = schedules[(schedules['days'] & (1 << bit)) != 0]
+        meetings.append(on_day.assign(day=1 << bit))
+    meetings = pd.concat(meetings, ignore_index=True)
+    meetings['start_min'] = meetings['start_min'].astype('int64')
+    meetings['end_min'] = meetings['end_min'].astype('int64')
+    return meetings
+
+def find_overlaps(meetings, key_columns):
+    """
+    Return every pair of meetings with the same key_columns and day whose times
+    overlap. Meetings that only touch (one ends as the other starts) don't.
+    Returns a DataFrame with schedule_id_a < schedule_id_b, the day bit and the
+    overlapping time range.
+    """
+    columns = ['schedule_id_a', 'schedule_id_b', 'day', 'overlap_start', 'overlap_end']
+    if meetings.empty:
+        return pd.DataFrame(columns=columns, dtype='int64')
+
+    group = meetings.groupby(key_columns + ['day'], sort=False).ngroup().to_numpy()
+    start = meetings['start_min'].to_numpy()
+    end = meetings['end_min'].to_numpy()
+
+    # Sort by (group, start) and encode both in one key, so a single binary
+    # search per meeting stays inside its own group
+    order = np.lexsort((start, group))
+    group, start, end = group[order], start[order], end[order]
+    schedule_id = meetings['schedule_id'].to_numpy()[order]
+    day = meetings['day'].to_numpy()[order]
+
+    span = int(end.max()) + 1
+    start_key = group.astype('int64') * span + start
+    end_key = group.astype('int64') * span + end
+
+    # Meetings i+1 .. hi-1 start at or after meeting i starts and before it ends
+    first = np.arange(len(start)) + 1
+    hi = np.searchsorted(start_key, end_key, side='left')
+    counts = np.maximum(hi - first, 0)
+
+    left = np.repeat(np.arange(len(start)), counts)
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    right = np.repeat(first, counts) + np.arange(counts.sum()) - run_start
+
+    a, b = schedule_id[left], schedule_id[right]
+    return pd.DataFrame({
+        'schedule_id_a': np.minimum(a, b),
+        'schedule_id_b': np.maximum(a, b),
+        'day': day[left],
+        'overlap_start': start[right],
+        'overlap_end': np.minimum(end[left], end[right])
+    }, columns=columns)
+
+def summarize_pairs(pairs, conflict_type):
+    """
+    Combine the per-day overlaps of each pair into one conflict row.
+    """
+    pairs = pairs.drop_duplicates(['schedule_id_a', 'schedule_id_b', 'day'])
+    summary = pairs.groupby(['schedule_id_a', 'schedule_id_b'], as_index=False).agg(
+        days=('day', 'sum'),
+        overlap_start=('overlap_start', 'min'),
+        overlap_end=('overlap_end', 'max')
+    )
+    summary['days'] = days_to_text(summary['days'])
+    summary.insert(0, 'conflict_type', conflict_type)
+    return summary
+
+def read_meetings(conn):
+    """
+    Read every schedule row with its term, room and instructor, and its meeting
+    days and times.
+    """
+    schedules = pd.read_sql_query('''
+    SELECT sch.schedule_id, sch.section_id, s.term_id, sch.bldg_id, sch.room_num,
+           CASE WHEN i.first_name = 'Unknown' AND i.last_name = 'Unknown'
+                THEN NULL ELSE s.instr_id END AS instr_id,
+           sch.days, sch.start_min, sch.end_min
+    FROM schedule sch
+    JOIN section s ON sch.section_id = s.section_id
+    LEFT JOIN instructor i ON s.instr_id = i.instr_id
+    ''', conn)
+    return expand_meetings(schedules)
+
+def detect_conflicts(meetings):
+    """
+    Return the room and instructor conflicts among the given meetings.
+    """
+    # Rooms that aren't known can't conflict with each other
+    in_room = meetings[meetings['room_num'] != 'UNKNOWN']
+    room_pairs = find_overlaps(in_room, ['term_id', 'bldg_id', 'room_num'])
+
+    # Two meetings of the same section aren't an instructor conflict
+    with_instructor = meetings[meetings['instr_id'].notna()]
+    instr_pairs = find_overlaps(with_instructor, ['term_id', 'instr_id'])
+    section_of = meetings.drop_duplicates('schedule_id').set_index('schedule_id')['section_id']
+    same_section = (instr_pairs['schedule_id_a'].map(section_of).to_numpy()
+                    == instr_pairs['schedule_id_b'].map(section_of).to_numpy())
+    instr_pairs = instr_pairs[~same_section]
+
+    return pd.concat([summarize_pairs(room_pairs, 'room'),
+                      summarize_pairs(instr_pairs, 'instructor')], ignore_index=True)
+
+def refresh_conflicts(conn):
+    """
+    Recompute the conflict table from the loaded schedules, in the caller's
+    transaction. Returns the number of room and instructor conflicts found.
+    """
+    conflicts = detect_conflicts(read_meetings(conn))
+
+    conn.execute("DELETE FROM conflict")
+    conn.executemany('''
+    INSERT INTO conflict (conflict_type, schedule_id_a, schedule_id_b, days, overlap_start, overlap_end)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', conflicts[['conflict_type', 'schedule_id_a', 'schedule_id_b', 'days',
+                    'overlap_start', 'overlap_end']].astype(object).itertuples(index=False, name=None))
+
+    counts = conflicts['conflict_type'].value_counts()
+    return int(counts.get('room', 0)), int(counts.get('instructor', 0))
@@ -0,0 +1,232 @@
+"""
+Data-Quality Checks for the Class Scheduling ETL
+
+Checks the data twice. Before the load, every extract chunk is checked against
+the rules in EXTRACT_RULES with column-wise masks, so a million-row extract
+costs a few vectorized passes rather than a Python loop per row. After the
+load, LOAD_CHECKS runs set-based checks on the loaded tables in a single
+INSERT ... SELECT.
+
+Every violation becomes one row of the data_issue table, with the rule it broke,
+its severity, the Class Nbr or table ID it concerns and what was wrong. Rows
+with an error-severity issue can't be loaded (a course without a subject, say,
+would break the NOT NULL columns of course and section), so they are left out
+of the load and kept in data_issue with their source values: that is the
+quarantine. Warnings are recorded but their rows are still loaded; a meeting
+whose times aren't a time of day (invalid_time) is loaded without its start
+and end minutes, so it never reaches the time grids of conflicts.py and
+room_usage.py.
+
+Usage:
+    sqlite3 class_schedule.db "SELECT rule, severity, COUNT(*) FROM data_issue GROUP BY 1, 2"
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns of data_issue, other than its issue_id
+ISSUE_COLUMNS = ['stage', 'rule', 'severity', 'source', 'row_key', 'detail', 'row_data']
+
+# Source columns without which a row can't be turned into a department, course and section
+REQUIRED_COLUMNS = ['Class Nbr', 'College', 'Acad Org', 'Subject', 'Catalog', 'Title']
+
+# Rules checked on the extract, and their severity. Errors are quarantined.
+EXTRACT_RULES = {
+    'missing_key': 'error',
+    'missing_date': 'warning',
+    'date_order': 'warning',
+    'missing_time': 'warning',
+    'invalid_time': 'warning',
+    'time_order': 'warning',
+    'negative_capacity': 'warning',
+    'orphan_room': 'warning',
+    'duplicate_class_nbr': 'warning'
+}
+
+# Set-based checks on the loaded tables, run together by check_database().
+# Each SELECT returns (rule, severity, source table, row ID, detail).
+LOAD_CHECKS = {
+    'orphan_course_dept': '''
+    SELECT 'orphan_course_dept', 'error', 'course', c.course_id, 'dept_id ' || IFNULL(c.dept_id, 'NULL')
+    FROM course c
+    WHERE NOT EXISTS (SELECT 1 FROM department d WHERE d.dept_id = c.dept_id)
+    ''',
+    'orphan_section_course': '''
+    SELECT 'orphan_section_course', 'error', 'section', s.section_id, 'course_id ' || IFNULL(s.course_id, 'NULL')
+    FROM section s
+    WHERE NOT EXISTS (SELECT 1 FROM course c WHERE c.course_id = s.course_id)
+    ''',
+    'orphan_section_term': '''
+    SELECT 'orphan_section_term', 'error', 'section', s.section_id, 'term_id ' || IFNULL(s.term_id, 'NULL')
+    FROM section s
+    WHERE NOT EXISTS (SELECT 1 FROM term t WHERE t.term_id = s.term_id)
+    ''',
+    'orphan_section_instructor': '''
+    SELECT 'orphan_section_instructor', 'error', 'section', s.section_id, 'instr_id ' || IFNULL(s.instr_id, 'NULL')
+    FROM section s
+    WHERE NOT EXISTS (SELECT 1 FROM instructor i WHERE i.instr_id = s.instr_id)
+    ''',
+    'orphan_schedule_section': '''
+    SELECT 'orphan_schedule_section', 'error', 'schedule', sch.schedule_id, 'section_id ' || IFNULL(sch.section_id, 'NULL')
+    FROM schedule sch
+    WHERE NOT EXISTS (SELECT 1 FROM section s WHERE s.section_id = sch.section_id)
+    ''',
+    'orphan_schedule_building': '''
+    SELECT 'orphan_schedule_building', 'error', 'schedule', sch.schedule_id, 'bldg_id ' || IFNULL(sch.bldg_id, 'NULL')
+    FROM schedule sch
+    WHERE NOT EXISTS (SELECT 1 FROM building b WHERE b.bldg_id = sch.bldg_id)
+    ''',
+    'negative_seats': '''
+    SELECT 'negative_seats', 'warning', 'section', section_id, 'max_seats ' || max_seats
+    FROM section
+    WHERE max_seats < 0
+    ''',
+    'time_order': '''
+    SELECT 'time_order', 'warning', 'schedule', schedule_id, 'start_min ' || start_min || ', end_min ' || end_min
+    FROM schedule
+    WHERE start_min >= end_min
+    ''',
+    'duplicate_term_code': '''
+    SELECT 'duplicate_term_code', 'warning', 'term', term_id, 'term_code ' || term_code || ' is used by another term'
+    FROM term t
+    WHERE EXISTS (SELECT 1 FROM term o WHERE o.term_code = t.term_code AND o.term_id <> t.term_id)
+    '''
+}
+
+def create_table(cursor):
+    """
+    Create the data_issue table.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS data_issue (
+        issue_id INTEGER PRIMARY KEY,
+        stage TEXT NOT NULL,
+        rule TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        source TEXT NOT NULL,
+        row_key INTEGER,
+        detail TEXT NOT NULL,
+        row_data TEXT
+    )
+    ''')
+
+def issues(rule, keys, detail, source='extract', row_data=None):
+    """
+    Return a DataFrame of data_issue rows for an extract rule, one per key.
+    detail is a string or a Series aligned with keys.
+    """
+    keys = pd.Series(keys).reset_index(drop=True)
+    if isinstance(detail, pd.Series):
+        detail = detail.astype(str).reset_index(drop=True)
+    return pd.DataFrame({
+        'stage': 'extract',
+        'rule': rule,
+        'severity': EXTRACT_RULES[rule],
+        'source': source,
+        'row_key': pd.array(keys, dtype='Int64'),
+        'detail': detail,
+        'row_data': row_data
+    }, index=keys.index, columns=ISSUE_COLUMNS)
+
+def text(values):
+    """
+    Return values as strings for a detail message, with missing values as ''
+    rather than missing, since data_issue.detail can't be NULL.
+    """
+    return values.astype('string').fillna('')
+
+def missing_room_parts(rows):
+    """
+    Return which parts of each row's Room couldn't be parsed, as text.
+    """
+    no_building = (rows['BuildingCode'] == 'UNKNOWN').to_numpy()
+    no_number = (rows['RoomNumber'] == 'UNKNOWN').to_numpy()
+    parts = np.select([no_building & no_number, no_building], ['building code or room number', 'building code'],
+                      'room number')
+    return pd.Series(parts, index=rows.index)
+
+def valid_clock_times(times):
+    """
+    Return a mask of the H.MM clock times (see conflicts.to_minutes) that are a
+    real time of day. Missing times count as valid.
+    """
+    hours = np.floor(times)
+    minutes = np.round((times - hours) * 100)
+    return times.isna() | ((hours >= 0) & (hours < 24) & (minutes < 60))
+
+def extract_checks(df):
+    """
+    Yield (rule, mask, detail) for every rule in EXTRACT_RULES that is checked
+    row by row on a compacted extract (see etl_process.compact_extract). detail
+    is a string, or a function that describes the violating rows as a Series,
+    so text is only built for the rows that break a rule.
+    """
+    for col in REQUIRED_COLUMNS:
+        yield 'missing_key', df[col].isna(), f"{col} is empty"
+
+    start_date, end_date = df['Start Date'], df['End Date']
+    yield 'missing_date', start_date.isna() | end_date.isna(), "Start Date or End Date is missing or unparseable"
+    yield 'date_order', (end_date < start_date).fillna(False), "End Date is before Start Date"
+
+    start_time, end_time = df['Class Start Time'], df['Class End Time']
+    has_days = df['Class Days'].notna()
+    yield 'missing_time', has_days & (start_time.isna() | end_time.isna()), "Class Days without a start and end time"
+    valid = valid_clock_times(start_time) & valid_clock_times(end_time)
+    yield 'invalid_time', ~valid, lambda rows: (
+        "Class Start Time " + text(rows['Class Start Time']) +
+        ", Class End Time " + text(rows['Class End Time']) + " is not a time of day, loaded without a time")
+    yield 'time_order', valid & (end_time <= start_time).fillna(False), "Class End Time is not after Class Start Time"
+
+    capacity = df['Enrollment Capacity']
+    yield 'negative_capacity', (capacity < 0).fillna(False), lambda rows: (
+        "Enrollment Capacity " + text(rows['Enrollment Capacity']))
+
+    unknown = (df['BuildingCode'] == 'UNKNOWN') | (df['RoomNumber'] == 'UNKNOWN')
+    yield 'orphan_room', unknown, lambda rows: (
+        "Room " + text(rows['Room']) + " has no " + missing_room_parts(rows))
+
+def check_extract(df):
+    """
+    Check a compacted extract against EXTRACT_RULES. Returns the data_issue rows
+    found and a boolean array of the rows with an error, which must not be
+    loaded. The quarantined rows' source values are kept in row_data as JSON.
+    """
+    found = []
+    quarantine = np.zeros(len(df), dtype=bool)
+    for rule, mask, detail in extract_checks(df):
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            continue
+        rows = np.flatnonzero(mask)
+        if callable(detail):
+            detail = detail(df.iloc[rows])
+        found.append(issues(rule, df['Class Nbr'].iloc[rows], detail).assign(_row=rows))
+        if EXTRACT_RULES[rule] == 'error':
+            quarantine |= mask
+
+    if not found:
+        return pd.DataFrame(columns=ISSUE_COLUMNS), quarantine
+
+    found = pd.concat(found, ignore_index=True)
+    if quarantine.any():
+        rows = df.iloc[np.flatnonzero(quarantine)]
+        row_data = pd.Series(rows.to_json(orient='records', lines=True, date_format='iso').splitlines(),
+                             index=np.flatnonzero(quarantine))
+        is_error = (found['severity'] == 'error').to_numpy()
+        found.loc[is_error, 'row_data'] = row_data.reindex(found.loc[is_error, '_row']).to_numpy()
+    return found.drop(columns='_row'), quarantine
+
+def check_database(conn):
+    """
+    Run every check in LOAD_CHECKS on the loaded tables in one statement and
+    add what they find to data_issue, in the caller's transaction. Returns the
+    number of issues per (rule, severity) recorded by the whole run, extract
+    checks included.
+    """
+    conn.execute("DELETE FROM data_issue WHERE stage = 'load'")
+    conn.execute(f'''
+    INSERT INTO data_issue (rule, severity, source, row_key, detail, stage)
+    SELECT *, 'load' FROM ({' UNION ALL '.join(LOAD_CHECKS.values())})
+    ''')
+    return {(rule, severity): count for rule, severity, count in conn.execute(
+        "SELECT rule, severity, COUNT(*) FROM data_issue GROUP BY rule, severity ORDER BY severity, rule")}
@@ -0,0 +1,161 @@
+"""
+Dimension Registry for the Class Scheduling ETL
+
+The loaders turn source rows into departments, courses, terms, instructors and
+buildings, and then resolve the foreign keys of sections and schedules from the
+same source values. DimensionRegistry holds, for every dimension table, the
+natural key of each loaded row and its surrogate ID. One registry is created
+per run and shared by every process_* stage, and each stage adds the rows it
+loads to it.
+
+Natural keys are tuples of column values, never strings formatted from them,
+so an instructor named "Ann_Marie" or a title containing a separator can't be
+mistaken for another key. Each dimension keeps its keys in a pandas
+MultiIndex, which stores every distinct value of a key column once (its
+levels, the intern table) and each key as a tuple of integer codes into them.
+A chunk's keys are resolved with one hash lookup per distinct key
+(Index.get_indexer), instead of a DataFrame merge that copies the key columns
+of every row. Keys are always looked up on every column of the natural key:
+two terms that start on the same day, or two courses with the same number and
+title in different departments, are different rows, and a partial key would
+silently send them to one of the two.
+
+The registry is persisted in the dimension tables themselves: an incremental
+load rebuilds it from the database with DimensionRegistry.from_database(), so
+keys resolve to the IDs of earlier runs.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Dimension tables, with their surrogate ID column and the columns of their natural key
+DIMENSIONS = {
+    'department': ('dept_id', ['College', 'Acad Org']),
+    'course': ('course_id', ['SubjectCatalog', 'Title', 'College', 'Acad Org']),
+    'term': ('term_id', ['start_date', 'end_date']),
+    'instructor': ('instr_id', ['first_name', 'last_name']),
+    'building': ('bldg_id', ['bldg_code'])
+}
+
+# Queries that read the natural keys and IDs of each dimension back from a database
+DATABASE_KEYS = {
+    'department': 'SELECT dept_name AS College, dept_code AS "Acad Org", dept_id FROM department ORDER BY dept_id',
+    'course': '''
+    SELECT c.course_num AS SubjectCatalog, c.course_name AS Title,
+           d.dept_name AS College, d.dept_code AS "Acad Org", c.course_id
+    FROM course c
+    JOIN department d ON c.dept_id = d.dept_id
+    ORDER BY c.course_id
+    ''',
+    'term': 'SELECT start_date, end_date, term_id FROM term ORDER BY term_id',
+    'instructor': 'SELECT first_name, last_name, instr_id FROM instructor ORDER BY instr_id',
+    'building': 'SELECT bldg_code, bldg_id FROM building ORDER BY bldg_id'
+}
+
+def distinct_keys(keys):
+    """
+    Return the distinct rows of a DataFrame of key columns, as plain objects,
+    and for every row the position of its key among them.
+    """
+    codes = keys.groupby(list(keys.columns), sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    return keys.drop_duplicates().astype(object), codes
+
+class Dimension:
+    """
+    The natural keys and surrogate IDs of one dimension table, in the order
+    they were loaded.
+    """
+
+    def __init__(self, table, id_column, key_columns):
+        self.table = table
+        self.id_column = id_column
+        self.key_columns = list(key_columns)
+        self.keys = pd.DataFrame(columns=self.key_columns, dtype=object)
+        self.ids = np.empty(0, dtype='int64')
+
+        # MultiIndex of the keys, built by index() when first needed
+        self.key_index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def next_ids(self, count):
+        """
+        Return the next count surrogate IDs after the ones already loaded.
+        """
+        start = int(self.ids.max()) + 1 if len(self.ids) else 1
+        return pd.RangeIndex(start, start + count)
+
+    def index(self):
+        """
+        Return a MultiIndex of the loaded keys, in the order of their IDs.
+        """
+        if self.key_index is None:
+            self.key_index = pd.MultiIndex.from_frame(self.keys)
+        return self.key_index
+
+    def positions(self, keys):
+        """
+        Return the position of each row of keys among the loaded keys, or -1
+        for keys that haven't been loaded. Each distinct key is looked up once.
+        keys must have exactly the key columns, in order.
+        """
+        if list(keys.columns) != self.key_columns:
+            raise ValueError(f"{self.table} keys must have the columns {self.key_columns}, "
+                             f"not {list(keys.columns)}")
+        if not len(self) or keys.empty:
+            return np.full(len(keys), -1, dtype='int64')
+        distinct, codes = distinct_keys(keys)
+        return self.index().get_indexer(pd.MultiIndex.from_frame(distinct))[codes]
+
+    def missing(self, keys):
+        """
+        Return a boolean array of the rows of keys that haven't been loaded.
+        """
+        return self.positions(keys) < 0
+
+    def lookup(self, keys):
+        """
+        Return the IDs of the rows of keys as a nullable integer array. Keys
+        that haven't been loaded are missing.
+        """
+        positions = self.positions(keys)
+        missing = positions < 0
+        return pd.arrays.IntegerArray(self.ids[np.maximum(positions, 0)] if len(self) else
+                                      np.zeros(len(keys), dtype='int64'), missing)
+
+    def add(self, keys, ids):
+        """
+        Register newly loaded rows with their natural keys and IDs. Raises
+        ValueError if a key is already registered or repeated, since one key
+        can only stand for one row.
+        """
+        keys = keys[self.key_columns].astype(object)
+        if keys.duplicated().any() or not self.missing(keys).all():
+            raise ValueError(f"{self.table} keys registered more than once")
+        self.keys = pd.concat([self.keys, keys], ignore_index=True)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype='int64')])
+        self.key_index = None
+
+class DimensionRegistry:
+    """
+    Every Dimension of DIMENSIONS, by table name.
+    """
+
+    def __init__(self):
+        self.dimensions = {table: Dimension(table, id_column, key_columns)
+                           for table, (id_column, key_columns) in DIMENSIONS.items()}
+
+    def __getitem__(self, table):
+        return self.dimensions[table]
+
+    @classmethod
+    def from_database(cls, conn):
+        """
+        Rebuild the registry from the dimension tables of a loaded database.
+        """
+        registry = cls()
+        for table, dimension in registry.dimensions.items():
+            rows = pd.read_sql_query(DATABASE_KEYS[table], conn)
+            dimension.add(rows, rows[dimension.id_column])
+        return registry
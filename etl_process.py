@@ -5,620 +5,1592 @@ This script performs the Extract-Transform-Load (ETL) process for the Class Sche
 It reads data from an Excel file, transforms it according to the database schema, and loads it
 into a SQLite database.
 
+The pipeline can also be used as a library. Importing this module has no side effects and
+doesn't import pandas; the heavy imports happen when a stage first needs them:
+
+    from etl_process import ETLPipeline
+
+    with ETLPipeline('class_schedule.db') as pipeline:
+        pipeline.run(['export.xlsx'])
+
 Author: Chantelle Cabanilla
 Date: 05/09/2025
 """
 
-import pandas as pd
 import sqlite3
 import os
-import re
-from datetime import datetime
+import sys
+import time
+import glob
+import argparse
+
+import instrumentation
+import reporting
+import search
 
 # Configure file paths
 EXCEL_FILE = 'sample ClassSched-CS-S25.xlsx'
 DB_FILE = 'class_schedule.db'
 
-# Remove existing database if it exists
-if os.path.exists(DB_FILE):
-    os.remove(DB_FILE)
-    print(f"Removed existing database: {DB_FILE}")
+# Number of rows sent to SQLite per executemany call
+BATCH_SIZE = 5000
+
+# Reuse parsed extracts from extract_cache when a workbook hasn't changed
+USE_CACHE = True
+
+# Columns given a fixed dtype when an extract is read, so chunks line up
+INTEGER_COLUMNS = ['Class Nbr', 'Section', 'Enrollment Capacity', 'Room Capacity']
+FLOAT_COLUMNS = ['Class Start Time', 'Class End Time']
 
-# Connect to SQLite database
-conn = sqlite3.connect(DB_FILE)
-cursor = conn.cursor()
-print(f"Connected to database: {DB_FILE}")
+# Low-cardinality text columns held as categoricals by compact_extract()
+CATEGORY_COLUMNS = ['College', 'Acad Org', 'Subject', 'Catalog', 'Title', 'Class Days', 'Room',
+                    'Instructor Last Name', 'Instructor First Name']
 
-def create_database_schema():
+# Columns that older exports may not have, added as missing by normalize_extract()
+OPTIONAL_COLUMNS = ['Room Capacity']
+
+# Date columns parsed once by normalize_extract()
+DATE_COLUMNS = ['Start Date', 'End Date']
+
+# Source columns used by the ETLPipeline.process_* methods
+SOURCE_COLUMNS = ['College', 'Acad Org', 'Subject', 'Catalog', 'Title', 'Section', 'Class Nbr',
+                  'Class Days', 'Class Start Time', 'Class End Time', 'Start Date', 'End Date',
+                  'Room', 'Instructor Last Name', 'Instructor First Name', 'Enrollment Capacity',
+                  'Room Capacity']
+
+# Indexes created after the load by create_indexes(). Indexes on a table's
+# foreign key also cover its INTEGER PRIMARY KEY, since SQLite stores the rowid
+# in every index entry.
+INDEXES = {
+    'idx_course_dept': 'course (dept_id)',
+    'idx_section_course': 'section (course_id)',
+    'idx_section_term': 'section (term_id)',
+    'idx_section_instr': 'section (instr_id)',
+    'idx_section_seats': 'section (max_seats)',
+    'idx_schedule_section': 'schedule (section_id)',
+    'idx_schedule_room': 'schedule (bldg_id, room_num, start_min, end_min, days)',
+    'idx_schedule_days': 'schedule (days, start_min, end_min)',
+    'idx_course_name': 'course (course_name)',
+    'idx_department_name': 'department (dept_name)',
+    'idx_term_code': 'term (term_code)',
+    'idx_building_name': 'building (bldg_name)',
+    'idx_instructor_name': 'instructor (last_name, first_name)',
+    'idx_conflict_a': 'conflict (schedule_id_a)',
+    'idx_conflict_b': 'conflict (schedule_id_b)',
+    'idx_flat_term': 'schedule_flat (term_id)',
+    'idx_flat_dept': 'schedule_flat (dept_name)',
+    'idx_flat_instructor': 'schedule_flat (last_name, first_name)',
+    'idx_flat_room': 'schedule_flat (bldg_code, room_num)',
+    'idx_flat_days': 'schedule_flat (days, start_min, end_min)',
+    'idx_free_slot_building': 'room_free_slot (term_id, bldg_code, day, free_start)'
+}
+
+# Queries run by validate_database(). They are also checked by query_plans.py,
+# so any query added here must be able to use the indexes from create_indexes().
+VALIDATION_QUERIES = {
+    'record_counts': '''
+    SELECT 'Department' as Table_Name, COUNT(*) as Record_Count FROM department
+    UNION ALL
+    SELECT 'Course', COUNT(*) FROM course
+    UNION ALL
+    SELECT 'Term', COUNT(*) FROM term
+    UNION ALL
+    SELECT 'Instructor', COUNT(*) FROM instructor
+    UNION ALL
+    SELECT 'Section', COUNT(*) FROM section
+    UNION ALL
+    SELECT 'Building', COUNT(*) FROM building
+    UNION ALL
+    SELECT 'Schedule', COUNT(*) FROM schedule;
+    ''',
+    'courses_per_department': '''
+    SELECT d.dept_name, COUNT(c.course_id) as Course_Count
+    FROM department d
+    LEFT JOIN course c ON d.dept_id = c.dept_id
+    GROUP BY d.dept_name
+    ''',
+    'sections_per_course': '''
+    SELECT c.course_name, COUNT(s.section_id) as Section_Count
+    FROM course c
+    LEFT JOIN section s ON c.course_id = s.course_id
+    GROUP BY c.course_name
+    LIMIT 5
+    ''',
+    'sections_per_instructor': '''
+    SELECT i.last_name, i.first_name, COUNT(s.section_id) as Section_Count
+    FROM instructor i
+    LEFT JOIN section s ON i.instr_id = s.instr_id
+    GROUP BY i.last_name, i.first_name
+    LIMIT 5
+    ''',
+    'class_schedule': '''
+    SELECT 
+        dept_name as Department,
+        course_num as Course,
+        course_name as Title,
+        section_num as Section,
+        last_name as Instructor,
+        term_name as Term,
+        bldg_name as Building,
+        room_num as Room,
+        day_pattern as Schedule
+    FROM schedule_flat
+    LIMIT 5
+    '''
+}
+
+def frame_to_rows(frame):
     """
-    Create the database schema based on the ERD.
+    Convert a DataFrame into a list of plain tuples ready for executemany.
+    Works column by column so there is no Python-level loop per row; missing
+    values become None and numpy scalars become native Python values.
     """
-    print("Creating database schema...")
-    
-    # Department table
-    cursor.execute('''
-    CREATE TABLE department (
-        dept_id INTEGER PRIMARY KEY,
-        dept_code TEXT NOT NULL,
-        dept_name TEXT NOT NULL
-    )
-    ''')
-    
-    # Course table
-    cursor.execute('''
-    CREATE TABLE course (
-        course_id INTEGER PRIMARY KEY,
-        dept_id INTEGER NOT NULL,
-        course_num TEXT NOT NULL,
-        course_name TEXT NOT NULL,
-        FOREIGN KEY (dept_id) REFERENCES department(dept_id)
-    )
-    ''')
-    
-    # Term table
-    cursor.execute('''
-    CREATE TABLE term (
-        term_id INTEGER PRIMARY KEY,
-        term_code TEXT NOT NULL,
-        term_name TEXT NOT NULL,
-        start_date TEXT NOT NULL
-    )
-    ''')
-    
-    # Instructor table
-    cursor.execute('''
-    CREATE TABLE instructor (
-        instr_id INTEGER PRIMARY KEY,
-        first_name TEXT NOT NULL,
-        last_name TEXT NOT NULL,
-        email TEXT
-    )
-    ''')
-    
-    # Section table
-    cursor.execute('''
-    CREATE TABLE section (
-        section_id INTEGER PRIMARY KEY,
-        course_id INTEGER NOT NULL,
-        term_id INTEGER NOT NULL,
-        instr_id INTEGER NOT NULL,
-        section_num TEXT NOT NULL,
-        max_seats INTEGER NOT NULL,
-        FOREIGN KEY (course_id) REFERENCES course(course_id),
-        FOREIGN KEY (term_id) REFERENCES term(term_id),
-        FOREIGN KEY (instr_id) REFERENCES instructor(instr_id)
-    )
-    ''')
-    
-    # Building table
-    cursor.execute('''
-    CREATE TABLE building (
-        bldg_id INTEGER PRIMARY KEY,
-        bldg_code TEXT NOT NULL,
-        bldg_name TEXT NOT NULL
-    )
-    ''')
-    
-    # Schedule table
-    cursor.execute('''
-    CREATE TABLE schedule (
-        schedule_id INTEGER PRIMARY KEY,
-        section_id INTEGER NOT NULL,
-        bldg_id INTEGER NOT NULL,
-        room_num TEXT NOT NULL,
-        day_pattern TEXT NOT NULL,
-        FOREIGN KEY (section_id) REFERENCES section(section_id),
-        FOREIGN KEY (bldg_id) REFERENCES building(bldg_id)
-    )
-    ''')
-    
-    # Commit the changes
-    conn.commit()
-    print("Database schema created successfully")
+    columns = []
+    for col in frame.columns:
+        series = frame[col]
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        columns.append(series.tolist())
+    return list(zip(*columns))
 
-def read_excel_data():
+def normalize_extract(df):
     """
-    Read the Excel file and return a pandas DataFrame.
+    Give the columns of an extract their workbook names and the key columns a
+    fixed dtype, so every chunk of an extract has the same schema no matter
+    which format it was read from or which values it contains.
     """
-    print(f"Reading Excel file: {EXCEL_FILE}")
-    
-    # Read Excel file, skipping the first row (title)
-    df = pd.read_excel(EXCEL_FILE, skiprows=1)
-    
-    # Clean column names (remove spaces and special chars)
-    df.columns = [col.strip() for col in df.columns]
-    
-    print(f"Read {len(df)} rows from Excel file")
+    import pandas as pd
+    import readers
+
+    # Clean column names (remove spaces, match case) and rename the columns
+    # other exports name differently
+    df.columns = [readers.canonical_column(col) for col in df.columns]
+    for col in OPTIONAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+
+    # Catalog numbers are text (e.g. "135" or "135L"), but the workbook may hold
+    # them as numbers or as padded strings such as " 135"
+    if 'Catalog' in df.columns:
+        catalog = df['Catalog']
+        if pd.api.types.is_float_dtype(catalog):
+            catalog = catalog.astype('Int64')
+        df['Catalog'] = catalog.astype(str).str.strip()
+
+    # CSV files hold dates as text
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_term_dates(df[col])
+
     return df
 
-def process_departments(df):
+def extract_workbook(path, use_cache=True):
     """
-    Process department data from the DataFrame and load into the database.
-    Returns a dictionary mapping department keys to dept_id values.
+    Return the cleaned DataFrame for an export (every sheet of a workbook, a CSV
+    or a Parquet file), reusing the cached extract if the file hasn't changed
+    since it was last parsed. Parquet exports are read directly, never cached.
+    Returns the DataFrame and whether it came from the cache.
     """
-    print("Processing department data...")
-    
-    # Extract unique departments
-    departments = df[['College', 'Acad Org']].drop_duplicates()
-    
-    # Create department data
-    dept_data = []
-    for idx, (_, row) in enumerate(departments.iterrows(), 1):
-        dept_data.append({
-            'dept_id': idx,
-            'dept_code': row['Acad Org'],
-            'dept_name': row['College']
-        })
-    
-    # Insert departments into the database
-    for dept in dept_data:
-        cursor.execute('''
-        INSERT INTO department (dept_id, dept_code, dept_name)
-        VALUES (?, ?, ?)
-        ''', (dept['dept_id'], dept['dept_code'], dept['dept_name']))
-    
-    # Create a lookup dictionary for department IDs
-    dept_lookup = {f"{dept['dept_code']}_{dept['dept_name']}": dept['dept_id'] for dept in dept_data}
-    
-    conn.commit()
-    print(f"Processed {len(dept_data)} departments")
-    return dept_lookup
+    import pandas as pd
+    import extract_cache
+    import readers
+
+    use_cache = use_cache and readers.detect_format(path) != 'parquet'
+    if use_cache:
+        df = extract_cache.load(path)
+        if df is not None:
+            return df, True
+    
+    # Normalize every sheet before combining them, since sheets may name the
+    # same column differently
+    frames = [normalize_extract(frame) for frame in readers.iter_frames(path)]
+    if not frames:
+        raise ValueError(f"{path}: no sheet with a header row")
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    
+    if use_cache:
+        extract_cache.store(path, df)
+    return df, False
 
-def process_courses(df, dept_lookup):
+def iter_export_chunks(chunk_size, path=None, use_cache=True):
     """
-    Process course data from the DataFrame and load into the database.
-    Returns a dictionary mapping course keys to course_id values.
+    Stream an export in DataFrames of at most chunk_size rows, through the
+    reader for its format (see readers.py). Workbooks are read with openpyxl's
+    read-only mode and CSV and Parquet files batch by batch, so only the current
+    chunk is held in memory.
     """
-    print("Processing course data...")
+    import extract_cache
+    import readers
     
-    # Extract unique courses
-    df['SubjectCatalog'] = df['Subject'] + df['Catalog'].astype(str)
-    courses = df[['SubjectCatalog', 'Title', 'College', 'Acad Org']].drop_duplicates()
+    path = path or EXCEL_FILE
     
-    # Create course data
-    course_data = []
-    for idx, (_, row) in enumerate(courses.iterrows(), 1):
-        dept_key = f"{row['Acad Org']}_{row['College']}"
-        dept_id = dept_lookup.get(dept_key)
-        
-        course_data.append({
-            'course_id': idx,
-            'dept_id': dept_id,
-            'course_num': row['SubjectCatalog'],
-            'course_name': row['Title']
-        })
+    # Stream from the cached extract when the workbook hasn't changed
+    batches = extract_cache.iter_batches(path, chunk_size) if use_cache else None
+    if batches is not None:
+        print(f"Streaming cached extract for {path} ({chunk_size} rows per chunk)")
+        yield from batches
+        return
     
-    # Insert courses into the database
-    for course in course_data:
-        cursor.execute('''
-        INSERT INTO course (course_id, dept_id, course_num, course_name)
-        VALUES (?, ?, ?, ?)
-        ''', (course['course_id'], course['dept_id'], course['course_num'], course['course_name']))
+    print(f"Streaming {readers.detect_format(path)} file: {path} ({chunk_size} rows per chunk)")
     
-    # Create a lookup dictionary for course IDs
-    course_lookup = {f"{course['course_num']}_{course['course_name']}": course['course_id'] for course in course_data}
+    total = 0
+    for frame in readers.iter_frames(path, chunk_size):
+        total += len(frame)
+        yield normalize_extract(frame)
     
-    conn.commit()
-    print(f"Processed {len(course_data)} courses")
-    return course_lookup
+    print(f"Read {total} rows from {path}")
 
-def process_terms(df):
+def resolve_input_files(pattern):
     """
-    Process term data from the DataFrame and load into the database.
-    Returns a dictionary mapping term dates to term_id values.
+    Return the exports named by a file path, a directory or a glob pattern, in
+    sorted order so surrogate IDs are assigned the same way on every run. A
+    directory contributes every file in a format readers.py can read.
     """
-    print("Processing term data...")
-    
-    # Extract unique terms
-    df['TermKey'] = df['Start Date'].astype(str) + '_' + df['End Date'].astype(str)
-    terms = df[['TermKey', 'Start Date', 'End Date']].drop_duplicates()
-    
-    # Create term data
-    term_data = []
-    for idx, (_, row) in enumerate(terms.iterrows(), 1):
-        # Parse the date string
-        start_date = row['Start Date']
-        end_date = row['End Date']
-        
-        # Format the term code and name
-        if isinstance(start_date, str):
-            # Parse the date string if it's a string
-            try:
-                start_date_obj = datetime.strptime(start_date, '%m/%d/%y')
-                end_date_obj = datetime.strptime(end_date, '%m/%d/%y')
-                term_code = f"{start_date_obj.year}{start_date_obj.month:02d}"
-                term_name = f"{start_date_obj.strftime('%b %Y')} - {end_date_obj.strftime('%b %Y')}"
-            except ValueError:
-                # Default values if date parsing fails
-                term_code = f"TERM{idx}"
-                term_name = f"Term {idx}"
-        else:
-            # If start_date is already a datetime object
-            try:
-                term_code = f"{start_date.year}{start_date.month:02d}"
-                term_name = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
-            except AttributeError:
-                # Handle case where date isn't a datetime object
-                term_code = f"TERM{idx}"
-                term_name = f"Term {idx}"
-        
-        term_data.append({
-            'term_id': idx,
-            'term_code': term_code,
-            'term_name': term_name,
-            'start_date': str(start_date)  # Store as string
-        })
-    
-    # Insert terms into the database
-    for term in term_data:
-        cursor.execute('''
-        INSERT INTO term (term_id, term_code, term_name, start_date)
-        VALUES (?, ?, ?, ?)
-        ''', (term['term_id'], term['term_code'], term['term_name'], term['start_date']))
-    
-    # Create a lookup dictionary for term IDs
-    term_lookup = {term['start_date']: term['term_id'] for term in term_data}
-    
-    conn.commit()
-    print(f"Processed {len(term_data)} terms")
-    return term_lookup
+    import readers
 
-def process_instructors(df):
+    if os.path.isdir(pattern):
+        files = [f for f in glob.glob(os.path.join(pattern, '*'))
+                 if os.path.splitext(f)[1].lower() in readers.EXTENSIONS]
+    else:
+        files = glob.glob(pattern)
+    # Skip the lock files Excel leaves next to open workbooks
+    return sorted(f for f in files if not os.path.basename(f).startswith('~$'))
+
+def read_workbook(path, use_cache=True):
     """
-    Process instructor data from the DataFrame and load into the database.
-    Returns a dictionary mapping instructor names to instr_id values.
+    Read one workbook and return only the columns the loaders use, without
+    duplicate rows. Runs in a worker process, so it doesn't print or touch the
+    database.
     """
-    print("Processing instructor data...")
-    
-    # Extract unique instructors
-    instructors = df[['Instructor First Name', 'Instructor Last Name']].drop_duplicates()
+    df, _ = extract_workbook(path, use_cache)
+    return df[SOURCE_COLUMNS].drop_duplicates()
+
+def iter_workbooks(paths, workers=None, use_cache=True):
+    """
+    Parse several workbooks in parallel and yield their DataFrames in the order
+    of paths. Parsing happens in a process pool; the caller loads each frame as
+    it arrives, so SQLite only ever has one writer.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"Reading {len(paths)} Excel files with {workers or os.cpu_count()} workers")
     
-    # Create instructor data
-    instructor_data = []
-    for idx, (_, row) in enumerate(instructors.iterrows(), 1):
-        first_name = row['Instructor First Name']
-        last_name = row['Instructor Last Name']
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(read_workbook, paths, [use_cache] * len(paths))
+        for path, df in zip(paths, results):
+            print(f"Read {len(df)} rows from {path}")
+            yield df
+
+def peak_memory_mb():
+    """
+    Return the peak resident set size of this process in MB, or None if the
+    platform doesn't expose it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def read_database_state(path):
+    """
+    Return the generation of a published database (its PRAGMA user_version,
+    advanced by every load) and whether it is in WAL mode, or (0, False) if
+    the file doesn't exist.
+    """
+    if not os.path.exists(path):
+        return 0, False
+    conn = sqlite3.connect(path)
+    try:
+        generation = conn.execute("PRAGMA user_version").fetchone()[0]
+        wal = conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    finally:
+        conn.close()
+    return generation, wal
+
+def row_hash(frame):
+    """
+    Return a content hash for each row of frame as signed 64-bit integers,
+    so it can be stored in an INTEGER column and compared between runs.
+    """
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view('int64')
+
+def date_key(dates):
+    """
+    Format a date column the way str() formats a single value, so term and
+    section rows produce the same key for the same start date.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('NaT')
+    return dates.astype(str)
+
+def parse_term_dates(dates):
+    """
+    Return a datetime column for term dates, parsing '%m/%d/%y' strings (or ISO
+    dates, which CSV and Parquet exports may hold) if the reader did not already
+    produce datetimes. Unparseable values become NaT.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    parsed = pd.to_datetime(dates, format='%m/%d/%y', errors='coerce')
+    retry = parsed.isna() & dates.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(dates[retry], errors='coerce')
+    return parsed
+
+def extract_building_code(rooms):
+    """
+    Extract the building code from a Room column (e.g. "SEM" from "SEM 101").
+    """
+    return rooms.str.extract(r'^([A-Za-z]+)', expand=False).fillna("UNKNOWN")
+
+def extract_room_number(rooms):
+    """
+    Extract the room number from a Room column (e.g. "101" from "SEM 101").
+    """
+    return rooms.str.extract(r'(\d+)$', expand=False).fillna("UNKNOWN")
+
+def map_distinct(values, transform):
+    """
+    Apply a vectorized transform to each distinct value of a column (or each
+    distinct row of a DataFrame) only, and return the result as a categorical
+    column aligned with values. Strings are built once per distinct key instead
+    of once per row.
+    """
+    import pandas as pd
+
+    if isinstance(values, pd.DataFrame):
+        codes = values.groupby(list(values.columns), sort=False, observed=True,
+                               dropna=False).ngroup().to_numpy()
+        distinct = values.drop_duplicates().reset_index(drop=True)
+    else:
+        codes, distinct = pd.factorize(values, use_na_sentinel=False)
+        distinct = pd.Series(distinct)
+
+    labels, categories = pd.factorize(transform(distinct))
+    return pd.Series(pd.Categorical.from_codes(labels[codes], categories), index=values.index)
+
+def downcast_integers(values):
+    """
+    Return a nullable integer column in the narrowest type that holds its values.
+    """
+    if values.isna().all():
+        return values
+    low, high = values.min(), values.max()
+    for dtype, bits in (('Int8', 8), ('Int16', 16), ('Int32', 32)):
+        if -2 ** (bits - 1) <= low and high < 2 ** (bits - 1):
+            return values.astype(dtype)
+    return values.astype('Int64')
+
+def fill_missing(values, fill):
+    """
+    Fill the missing values of a text or categorical column with fill.
+    """
+    import pandas as pd
+
+    if isinstance(values.dtype, pd.CategoricalDtype) and fill not in values.cat.categories:
+        values = values.cat.add_categories([fill])
+    return values.fillna(fill)
+
+def frame_memory_mb(df):
+    """
+    Return the memory held by a DataFrame, including its strings, in MB.
+    """
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def compact_extract(df):
+    """
+    Return the columns of an extract that the loaders use, in a compact form:
+    low-cardinality text as categoricals and integers in the narrowest type
+    that holds them. The natural keys the loaders join on (SubjectCatalog,
+    TermKey, TermEndKey, BuildingCode and RoomNumber) are added as categoricals, so the
+    process_* methods never build a string per row.
+    A frame that is already compact is returned as it is.
+    """
+    if 'SubjectCatalog' in df.columns:
+        return df
+
+    df = df[SOURCE_COLUMNS].copy()
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    for col in INTEGER_COLUMNS:
+        df[col] = downcast_integers(df[col])
+
+    df['SubjectCatalog'] = map_distinct(
+        df[['Subject', 'Catalog']],
+        lambda keys: keys['Subject'].astype(object) + keys['Catalog'].astype(object).astype(str))
+    df['TermKey'] = map_distinct(df['Start Date'], date_key)
+    df['TermEndKey'] = map_distinct(df['End Date'], date_key)
+    df['BuildingCode'] = map_distinct(df['Room'], extract_building_code)
+    df['RoomNumber'] = map_distinct(df['Room'], extract_room_number)
+    return df
+
+class ETLPipeline:
+    """
+    Loads class schedule exports into one SQLite database. Holds the database
+    connection and the per-run state (load statistics and, for incremental
+    loads, the rows already in the database); the transform helpers above are
+    plain functions.
+    """
+
+    def __init__(self, db_file=DB_FILE, batch_size=BATCH_SIZE, use_cache=USE_CACHE, in_memory=False,
+                 strict=False):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.in_memory = in_memory
+
+        # Fail the run instead of publishing it if a data-quality error is found
+        self.strict = strict
+
+        # SQLite connection, opened by connect_database()
+        self.conn = None
+        self.cursor = None
+
+        # Database being built by a rebuild, published over db_file by publish_database()
+        self.build_file = None
+
+        # Rows loaded and seconds spent per table, filled in by execute_rows()
+        self.load_stats = {}
+
+        # schedule_id of the next schedule loaded, set by run()
+        self.next_schedule_id = None
+
+        # Sorted hashes of the section rows (Class Nbr with its section attributes)
+        # seen by the run so far, loaded or not, reset by run()
+        self.section_variants = None
+
+        # Largest Room Capacity per (bldg_id, room_num) in the chunks loaded by
+        # the run so far, as a Series, reset by run()
+        self.room_capacities = None
+
+        # Natural keys and IDs of the loaded dimension rows (a dimensions.DimensionRegistry),
+        # created by run() and shared by the process_* stages
+        self.dimensions = None
+
+        # Existing section row hashes and schedule row hashes, filled in by
+        # read_existing_rows() when loading incrementally
+        self.existing_rows = {}
+
+        # Memory held by the extract before and after compact_extract(), in MB
+        # summed over the chunks, filled in by compact()
+        self.memory_stats = {'extract_mb': 0.0, 'compact_mb': 0.0}
+
+        # Data-quality issues per (rule, severity), filled in by validate_database()
+        self.issue_counts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.discard_build()
+
+    def connect_database(self, rebuild=True):
+        """
+        Open the SQLite database. With rebuild=True a new database is built from
+        scratch in a temporary file next to the existing one (or in memory, with
+        in_memory set), which only replaces the existing database when
+        publish_database() is called. Readers keep seeing the old database until
+        then, and never see a missing or half-built one.
+        """
+        if not rebuild:
+            self.conn = sqlite3.connect(self.db_file)
+            self.cursor = self.conn.cursor()
+            print(f"Connected to database: {self.db_file}")
+            return
         
-        # Generate email (placeholder)
-        if pd.notna(first_name) and pd.notna(last_name):
-            email = f"{first_name.lower()}.{last_name.lower()}@university.edu"
+        self.build_file = f"{self.db_file}.{os.getpid()}.build"
+        if os.path.exists(self.build_file):
+            os.remove(self.build_file)
+        self.conn = sqlite3.connect(':memory:' if self.in_memory else self.build_file)
+        self.cursor = self.conn.cursor()
+        
+        # Nothing else can see the new database until it is published, so skip
+        # the rollback journal and the fsync after every commit. A failed build
+        # is thrown away rather than rolled back.
+        self.cursor.execute("PRAGMA journal_mode = OFF")
+        self.cursor.execute("PRAGMA synchronous = OFF")
+        print(f"Building new database {'in memory' if self.in_memory else self.build_file}")
+
+    def publish_database(self):
+        """
+        Publish the loaded data as the next generation of the database, then
+        reopen the connection on the published file. The generation is stored
+        in PRAGMA user_version, so readers such as query_service.py can tell
+        cheaply when the data has changed. An incremental load only advances
+        the generation of the database it updated in place, in the same
+        transaction as the load and the derived tables, so readers see the
+        base tables, the derived tables and the new generation together.
+
+        A rebuild replaces the database file in one atomic rename. If the
+        existing database is in WAL mode, readers may be holding it open, and
+        a rename would leave them on the old file (and a new file must never
+        meet the old file's -wal); the new database is copied into the existing
+        file with the SQLite backup API instead, in a single write transaction
+        that WAL readers don't wait on. Either way the published database is
+        left in WAL mode, so readers and later incremental loads don't block
+        each other.
+        """
+        if self.build_file is None:
+            generation = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+            self.cursor.execute(f"PRAGMA user_version = {generation + 1}")
+            self.conn.commit()
+            return
+
+        generation, wal = read_database_state(self.db_file)
+        self.cursor.execute(f"PRAGMA user_version = {generation + 1}")
+        self.conn.commit()
+        if wal:
+            target = sqlite3.connect(self.db_file)
+            self.conn.backup(target)
+            target.close()
+            self.conn.close()
+            self.discard_build()
         else:
-            email = "unknown@university.edu"
+            if self.in_memory:
+                target = sqlite3.connect(self.build_file)
+                self.conn.backup(target)
+                target.close()
+            self.conn.close()
+            os.replace(self.build_file, self.db_file)
+            self.build_file = None
+        print(f"Published new database: {self.db_file} (generation {generation + 1})")
         
-        instructor_data.append({
-            'instr_id': idx,
-            'first_name': first_name if pd.notna(first_name) else "Unknown",
-            'last_name': last_name if pd.notna(last_name) else "Unknown",
-            'email': email
-        })
-    
-    # Insert instructors into the database
-    for instr in instructor_data:
-        cursor.execute('''
-        INSERT INTO instructor (instr_id, first_name, last_name, email)
-        VALUES (?, ?, ?, ?)
-        ''', (instr['instr_id'], instr['first_name'], instr['last_name'], instr['email']))
-    
-    # Create a lookup dictionary for instructor IDs
-    instr_lookup = {f"{instr['first_name']}_{instr['last_name']}": instr['instr_id'] for instr in instructor_data}
-    
-    conn.commit()
-    print(f"Processed {len(instructor_data)} instructors")
-    return instr_lookup
+        self.conn = sqlite3.connect(self.db_file)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute("PRAGMA journal_mode = WAL")
 
-def process_buildings(df):
-    """
-    Process building data from the DataFrame and load into the database.
-    Returns a dictionary mapping building codes to bldg_id values.
-    """
-    print("Processing building data...")
-    
-    # Function to extract building code from room
-    def extract_building(room):
-        if pd.isna(room):
-            return "UNKNOWN"
-        
-        # Extract building code (assuming format like "SEM 101" where "SEM" is the building code)
-        match = re.match(r'([A-Za-z]+)', room)
-        if match:
-            return match.group(1)
+    def discard_build(self):
+        """
+        Delete the database being built, if a rebuild wasn't published.
+        """
+        if self.build_file is not None and os.path.exists(self.build_file):
+            os.remove(self.build_file)
+        self.build_file = None
+
+    def create_database_schema(self):
+        """
+        Create the database schema based on the ERD.
+        """
+        import data_quality
+        import room_usage
+
+        print("Creating database schema...")
+        
+        # Department table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS department (
+            dept_id INTEGER PRIMARY KEY,
+            dept_code TEXT NOT NULL,
+            dept_name TEXT NOT NULL,
+            UNIQUE (dept_code, dept_name)
+        )
+        ''')
+        
+        # Course table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course (
+            course_id INTEGER PRIMARY KEY,
+            dept_id INTEGER NOT NULL,
+            course_num TEXT NOT NULL,
+            course_name TEXT NOT NULL,
+            FOREIGN KEY (dept_id) REFERENCES department(dept_id),
+            UNIQUE (dept_id, course_num, course_name)
+        )
+        ''')
+        
+        # Term table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS term (
+            term_id INTEGER PRIMARY KEY,
+            term_code TEXT NOT NULL,
+            term_name TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            UNIQUE (start_date, end_date)
+        )
+        ''')
+        
+        # Instructor table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instructor (
+            instr_id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT,
+            UNIQUE (first_name, last_name)
+        )
+        ''')
+        
+        # Section table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS section (
+            section_id INTEGER PRIMARY KEY,
+            course_id INTEGER NOT NULL,
+            term_id INTEGER NOT NULL,
+            instr_id INTEGER NOT NULL,
+            section_num TEXT NOT NULL,
+            max_seats INTEGER NOT NULL,
+            row_hash INTEGER NOT NULL,
+            FOREIGN KEY (course_id) REFERENCES course(course_id),
+            FOREIGN KEY (term_id) REFERENCES term(term_id),
+            FOREIGN KEY (instr_id) REFERENCES instructor(instr_id)
+        )
+        ''')
+        
+        # Building table
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS building (
+            bldg_id INTEGER PRIMARY KEY,
+            bldg_code TEXT NOT NULL,
+            bldg_name TEXT NOT NULL,
+            UNIQUE (bldg_code)
+        )
+        ''')
+        
+        # Room table: the rooms schedules meet in, with the largest Room
+        # Capacity the exports gave for each (NULL if they gave none)
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room (
+            bldg_id INTEGER NOT NULL,
+            room_num TEXT NOT NULL,
+            capacity INTEGER,
+            PRIMARY KEY (bldg_id, room_num),
+            FOREIGN KEY (bldg_id) REFERENCES building(bldg_id)
+        )
+        ''')
+        
+        # Schedule table. days is a bitmask of the meeting days (M = 1, T = 2,
+        # W = 4, R = 8, F = 16, S = 32, U = 64) and start_min and end_min are
+        # minutes after midnight, so time-of-day lookups don't parse day_pattern.
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule (
+            schedule_id INTEGER PRIMARY KEY,
+            section_id INTEGER NOT NULL,
+            bldg_id INTEGER NOT NULL,
+            room_num TEXT NOT NULL,
+            day_pattern TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            start_min INTEGER,
+            end_min INTEGER,
+            row_hash INTEGER NOT NULL UNIQUE,
+            FOREIGN KEY (section_id) REFERENCES section(section_id),
+            FOREIGN KEY (bldg_id) REFERENCES building(bldg_id)
+        )
+        ''')
+        
+        # Conflict table, filled in by conflicts.refresh_conflicts().
+        # overlap_start and overlap_end are minutes after midnight.
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conflict (
+            conflict_id INTEGER PRIMARY KEY,
+            conflict_type TEXT NOT NULL,
+            schedule_id_a INTEGER NOT NULL,
+            schedule_id_b INTEGER NOT NULL,
+            days TEXT NOT NULL,
+            overlap_start INTEGER NOT NULL,
+            overlap_end INTEGER NOT NULL,
+            FOREIGN KEY (schedule_id_a) REFERENCES schedule(schedule_id),
+            FOREIGN KEY (schedule_id_b) REFERENCES schedule(schedule_id)
+        )
+        ''')
+        
+        # Denormalized schedule and summary tables for reports, filled in by
+        # reporting.refresh_reporting_tables()
+        reporting.create_tables(self.cursor)
+        
+        # Room occupancy, time-slot peaks and free periods, filled in by
+        # room_usage.refresh_room_usage()
+        room_usage.create_tables(self.cursor)
+        
+        # Full-text search index over schedule_flat, maintained by triggers
+        search.create_index(self.cursor)
+        
+        # Data-quality issues and quarantined rows, filled in by data_quality.py
+        data_quality.create_table(self.cursor)
+        
+        # Commit the changes
+        self.conn.commit()
+        print("Database schema created successfully")
+
+    def create_indexes(self):
+        """
+        Create the indexes used by the join and group-by paths of validate_database()
+        and validation.sql, then refresh the planner statistics with ANALYZE.
+        Called after the bulk load, so rows aren't indexed one insert at a time,
+        and committed with it by publish_database().
+        """
+        print("Creating indexes...")
+
+        for name, definition in INDEXES.items():
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+        self.cursor.execute("ANALYZE")
+
+        print(f"Created {len(INDEXES)} indexes")
+
+    def load_rows(self, table, frame, batch_size=None, conflict_key=None, updates=None):
+        """
+        Bulk-load a DataFrame into a table whose columns match the frame's columns.
+        The rows are written by execute_rows(); the caller owns the transaction, so
+        nothing is committed here.
+        If conflict_key (one or more comma-separated columns) is given, rows whose
+        key already exists are updated in place, with the new values or with the
+        SQL expressions given per column in updates.
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        columns = list(frame.columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        if conflict_key is not None:
+            keys = [key.strip() for key in conflict_key.split(',')]
+            updates = updates or {col: f"excluded.{col}" for col in columns if col not in keys}
+            sql += (f" ON CONFLICT ({conflict_key}) DO UPDATE SET "
+                    f"{', '.join(f'{col} = {value}' for col, value in updates.items())}")
+        rows = frame_to_rows(frame)
+        self.execute_rows(table, sql, rows, batch_size)
+        instrumentation.count_rows(len(rows))
+
+    def execute_rows(self, table, sql, rows, batch_size):
+        """
+        Send rows to SQLite in batches through executemany, adding them to
+        load_stats. A batch size of 1 falls back to one execute per row, which
+        is useful for comparing against the old path.
+        """
+        start = time.perf_counter()
+        if batch_size <= 1:
+            for row in rows:
+                self.cursor.execute(sql, row)
         else:
-            return "UNKNOWN"
-    
-    # Extract building codes from Room column
-    df['BuildingCode'] = df['Room'].apply(extract_building)
-    buildings = df[['BuildingCode']].drop_duplicates()
-    
-    # Create building data
-    building_data = []
-    for idx, (_, row) in enumerate(buildings.iterrows(), 1):
-        bldg_code = row['BuildingCode']
+            for i in range(0, len(rows), batch_size):
+                self.cursor.executemany(sql, rows[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+
+        count, total = self.load_stats.get(table, (0, 0.0))
+        self.load_stats[table] = (count + len(rows), total + elapsed)
+
+    def print_load_stats(self):
+        """
+        Print the rows loaded and rows/sec for each table, and how much smaller
+        compact_extract() made the extract.
+        """
+        print("\n--- Load Throughput ---")
+        for table, (count, elapsed) in self.load_stats.items():
+            rate = count / elapsed if elapsed > 0 else float('inf')
+            print(f"{table}: {count} rows in {elapsed:.4f}s ({rate:,.0f} rows/sec)")
+
+        before, after = self.memory_stats['extract_mb'], self.memory_stats['compact_mb']
+        if before > 0:
+            print(f"Extract memory: {before:.2f} MB as read, {after:.2f} MB compacted "
+                  f"({100 * (1 - after / before):.0f}% smaller)")
+
+    def check_extract(self, df):
+        """
+        Check a compacted extract with data_quality.check_extract(), record the
+        issues found and return the rows that can be loaded.
+        """
+        import data_quality
+
+        found, quarantine = data_quality.check_extract(df)
+        self.record_issues(found)
+        if quarantine.any():
+            print(f"Warning: {int(quarantine.sum())} rows quarantined by data-quality errors")
+            df = df[~quarantine]
+        return df
+
+    def skip_archived_terms(self, df):
+        """
+        Drop the rows of terms that partitions.archive_term() has moved into
+        read-only archives, so a load only writes to the main database.
+        """
+        import partitions
+
+        archived = partitions.archived_terms(self.db_file)
+        if not archived:
+            return df
+        term_code = map_distinct(df['Start Date'], lambda dates: parse_term_dates(dates).dt.strftime('%Y%m'))
+        in_archive = term_code.isin(archived).to_numpy()
+        if in_archive.any():
+            print(f"Skipping {int(in_archive.sum())} rows of archived terms")
+            df = df[~in_archive]
+        return df
+
+    def record_issues(self, issues):
+        """
+        Add data-quality issues to the data_issue table, in the load's transaction.
+        Not counted as loaded rows.
+        """
+        if len(issues):
+            import data_quality
+
+            columns = data_quality.ISSUE_COLUMNS
+            self.cursor.executemany(
+                f"INSERT INTO data_issue ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                frame_to_rows(issues[columns]))
+
+    def compact(self, df):
+        """
+        Convert an extract to its compact form with compact_extract(), adding
+        its memory before and after to memory_stats.
+        """
+        self.memory_stats['extract_mb'] += frame_memory_mb(df)
+        df = compact_extract(df)
+        self.memory_stats['compact_mb'] += frame_memory_mb(df)
+        return df
+
+    def compacted_chunks(self, chunks):
+        """
+        Yield the chunks of an extract in their compact form, timing the reading
+        and the compaction of each as the extract and compact stages.
+        """
+        for df in instrumentation.iter_stage('extract', chunks):
+            with instrumentation.stage('compact', len(df)):
+                df = self.compact(df)
+            yield df
+
+    def read_excel_data(self, path=None):
+        """
+        Read an export (every sheet of a workbook, a CSV or a Parquet file) and
+        return a pandas DataFrame.
+        """
+        import readers
+
+        path = path or EXCEL_FILE
+        print(f"Reading export: {path}")
+        
+        df, cached = extract_workbook(path, self.use_cache)
+        
+        source = "cached extract" if cached else f"{readers.detect_format(path)} file"
+        print(f"Read {len(df)} rows from {source}")
+        return df
+
+    def process_departments(self, df):
+        """
+        Process department data from the DataFrame and load into the database,
+        registering the new departments' (College, Acad Org) keys.
+        """
+        import pandas as pd
+
+        print("Processing department data...")
+        
+        # Extract unique departments that haven't been loaded yet
+        registry = self.dimensions['department']
+        departments = df[['College', 'Acad Org']].drop_duplicates()
+        departments = departments[registry.missing(departments)]
+        
+        # Create department data
+        dept_data = pd.DataFrame({
+            'dept_id': registry.next_ids(len(departments)),
+            'dept_code': departments['Acad Org'].to_numpy(),
+            'dept_name': departments['College'].to_numpy()
+        })
+        
+        # Insert departments into the database
+        self.load_rows('department', dept_data)
+        
+        # Register the new departments
+        registry.add(departments, dept_data['dept_id'])
+        
+        print(f"Processed {len(dept_data)} departments")
+
+    def process_courses(self, df):
+        """
+        Process course data from the DataFrame and load into the database,
+        registering the new courses' (SubjectCatalog, Title, College, Acad Org) keys.
+        """
+        import pandas as pd
+
+        print("Processing course data...")
+        
+        # Extract unique courses that haven't been loaded yet
+        registry = self.dimensions['course']
+        courses = df[registry.key_columns].drop_duplicates()
+        courses = courses[registry.missing(courses)]
+        
+        # Create course data, resolving dept_id from the registered departments
+        course_data = pd.DataFrame({
+            'course_id': registry.next_ids(len(courses)),
+            'dept_id': self.dimensions['department'].lookup(courses[['College', 'Acad Org']]),
+            'course_num': courses['SubjectCatalog'].to_numpy(),
+            'course_name': courses['Title'].to_numpy()
+        })
+        
+        # Insert courses into the database
+        self.load_rows('course', course_data)
+        
+        # Register the new courses
+        registry.add(courses, course_data['course_id'])
+        
+        print(f"Processed {len(course_data)} courses")
+
+    def process_terms(self, df):
+        """
+        Process term data from the DataFrame and load into the database,
+        registering the new terms' (start_date, end_date) keys.
+        """
+        import pandas as pd
+
+        print("Processing term data...")
+        
+        # Extract unique terms that haven't been loaded yet, keyed on their dates as stored
+        terms = df[['Start Date', 'End Date']].drop_duplicates()
+        terms = terms.assign(start_date=date_key(terms['Start Date']),
+                             end_date=date_key(terms['End Date']))
+        terms = terms.drop_duplicates(['start_date', 'end_date'])
+        registry = self.dimensions['term']
+        terms = terms[registry.missing(terms[['start_date', 'end_date']])].reset_index(drop=True)
+        term_ids = pd.Series(registry.next_ids(len(terms)))
+        
+        # Format the term code and name, falling back to placeholders if a date can't be parsed
+        start_dates = parse_term_dates(terms['Start Date'])
+        end_dates = parse_term_dates(terms['End Date'])
+        valid = start_dates.notna() & end_dates.notna()
+        term_code = start_dates.dt.strftime('%Y%m')
+        term_name = start_dates.dt.strftime('%b %Y') + ' - ' + end_dates.dt.strftime('%b %Y')
+        
+        term_data = pd.DataFrame({
+            'term_id': term_ids,
+            'term_code': term_code.where(valid, 'TERM' + term_ids.astype(str)),
+            'term_name': term_name.where(valid, 'Term ' + term_ids.astype(str)),
+            'start_date': terms['start_date'],  # Store as string
+            'end_date': terms['end_date']
+        })
+        
+        # Insert terms into the database
+        self.load_rows('term', term_data)
+        
+        # Register the new terms
+        registry.add(term_data, term_data['term_id'])
+        
+        print(f"Processed {len(term_data)} terms")
+
+    def process_instructors(self, df):
+        """
+        Process instructor data from the DataFrame and load into the database,
+        registering the new instructors' (first_name, last_name) keys.
+        """
+        import pandas as pd
+
+        print("Processing instructor data...")
+        
+        # Extract unique instructors
+        instructors = df[['Instructor First Name', 'Instructor Last Name']].drop_duplicates()
+        first_name = instructors['Instructor First Name'].astype(object)
+        last_name = instructors['Instructor Last Name'].astype(object)
+        
+        # Generate email (placeholder)
+        email = (first_name.str.lower() + '.' + last_name.str.lower() + '@university.edu')
+        email = email.where(first_name.notna() & last_name.notna(), "unknown@university.edu")
+        
+        # Create instructor data for the instructors that haven't been loaded yet
+        instructor_data = pd.DataFrame({
+            'first_name': first_name.fillna("Unknown").to_numpy(),
+            'last_name': last_name.fillna("Unknown").to_numpy(),
+            'email': email.to_numpy()
+        }).drop_duplicates(['first_name', 'last_name'])
+        registry = self.dimensions['instructor']
+        instructor_data = instructor_data[registry.missing(instructor_data[['first_name', 'last_name']])]
+        instructor_data.insert(0, 'instr_id', registry.next_ids(len(instructor_data)))
+        
+        # Insert instructors into the database
+        self.load_rows('instructor', instructor_data)
+        
+        # Register the new instructors
+        registry.add(instructor_data, instructor_data['instr_id'])
+        
+        print(f"Processed {len(instructor_data)} instructors")
+
+    def process_buildings(self, df):
+        """
+        Process building data from the DataFrame and load into the database,
+        registering the new buildings' codes.
+        """
+        import pandas as pd
+
+        print("Processing building data...")
+        
+        # Extract building codes from Room column that haven't been loaded yet
+        buildings = df[['BuildingCode']].drop_duplicates().rename(columns={'BuildingCode': 'bldg_code'})
+        registry = self.dimensions['building']
+        buildings = buildings[registry.missing(buildings)]
+        bldg_code = buildings['bldg_code'].astype(object)
         
         # Generate building name based on code
-        if bldg_code == "SEM":
-            bldg_name = "Seminar Building"
-        elif bldg_code == "WPEB":
-            bldg_name = "William Pearson Engineering Building"
-        else:
-            bldg_name = f"{bldg_code} Building"
+        known_names = {
+            "SEM": "Seminar Building",
+            "WPEB": "William Pearson Engineering Building"
+        }
+        bldg_name = bldg_code.map(known_names).fillna(bldg_code + " Building")
         
-        building_data.append({
-            'bldg_id': idx,
-            'bldg_code': bldg_code,
-            'bldg_name': bldg_name
+        # Create building data
+        building_data = pd.DataFrame({
+            'bldg_id': registry.next_ids(len(buildings)),
+            'bldg_code': bldg_code.to_numpy(),
+            'bldg_name': bldg_name.to_numpy()
         })
-    
-    # Insert buildings into the database
-    for bldg in building_data:
-        cursor.execute('''
-        INSERT INTO building (bldg_id, bldg_code, bldg_name)
-        VALUES (?, ?, ?)
-        ''', (bldg['bldg_id'], bldg['bldg_code'], bldg['bldg_name']))
-    
-    # Create a lookup dictionary for building IDs
-    bldg_lookup = {bldg['bldg_code']: bldg['bldg_id'] for bldg in building_data}
-    
-    conn.commit()
-    print(f"Processed {len(building_data)} buildings")
-    return bldg_lookup
+        
+        # Insert buildings into the database
+        self.load_rows('building', building_data)
+        
+        # Register the new buildings
+        registry.add(building_data, building_data['bldg_id'])
+        
+        print(f"Processed {len(building_data)} buildings")
 
-def process_sections(df, course_lookup, term_lookup, instr_lookup):
-    """
-    Process section data from the DataFrame and load into the database.
-    Returns a dictionary mapping section IDs to section_id values.
-    """
-    print("Processing section data...")
-    
-    # Using 'Class Nbr' as the section_id
-    sections = df[['Class Nbr', 'Subject', 'Catalog', 'Title', 'Section', 'Start Date', 
-                   'Instructor First Name', 'Instructor Last Name', 'Enrollment Capacity']].drop_duplicates()
-    
-    # Create section data
-    section_data = []
-    seen_class_nbrs = set()  # Keep track of used class numbers
-    
-    for _, row in sections.iterrows():
-        class_nbr = row['Class Nbr']
-        # If we've seen this class number before, skip it
-        if class_nbr in seen_class_nbrs:
-            print(f"Warning: Duplicate Class Nbr {class_nbr} found, skipping...")
-            continue
-            
-        seen_class_nbrs.add(class_nbr)
-        subject_catalog = row['Subject'] + str(row['Catalog'])
-        course_key = f"{subject_catalog}_{row['Title']}"
-        course_id = course_lookup.get(course_key)
-        
-        # Get term_id
-        start_date = str(row['Start Date'])
-        term_id = term_lookup.get(start_date)
-        
-        # Get instructor_id
-        first_name = row['Instructor First Name'] if pd.notna(row['Instructor First Name']) else "Unknown"
-        last_name = row['Instructor Last Name'] if pd.notna(row['Instructor Last Name']) else "Unknown"
-        instr_key = f"{first_name}_{last_name}"
-        instr_id = instr_lookup.get(instr_key)
-        
-        # Get enrollment capacity
-        max_seats = row['Enrollment Capacity'] if pd.notna(row['Enrollment Capacity']) else 0
-        
-        section_data.append({
-            'section_id': class_nbr,  # Use Class Nbr as section_id
+    def process_rooms(self, df):
+        """
+        Process room data from the DataFrame and load into the database. A
+        room's capacity is the largest Room Capacity given for it in this load
+        (in any chunk), replacing the capacity of an earlier load, so it can
+        go down as well as up.
+        """
+        import pandas as pd
+
+        print("Processing room data...")
+        
+        # Extract the rooms with the largest capacity given in this chunk
+        rooms = (df[['BuildingCode', 'RoomNumber']].assign(capacity=df['Room Capacity'].astype('Int64'))
+                 .groupby(['BuildingCode', 'RoomNumber'], observed=True, sort=False)['capacity'].max()
+                 .reset_index())
+        
+        room_data = pd.DataFrame({
+            'bldg_id': self.dimensions['building'].lookup(rooms[['BuildingCode']].set_axis(['bldg_code'], axis=1)),
+            'room_num': rooms['RoomNumber'].astype(object).to_numpy(),
+            'capacity': rooms['capacity'].array
+        })
+        
+        # Combine with the capacities of the earlier chunks of this load
+        capacities = room_data.set_index(['bldg_id', 'room_num'])['capacity']
+        if self.room_capacities is not None:
+            capacities = pd.concat([self.room_capacities, capacities]).groupby(level=[0, 1]).max()
+        self.room_capacities = capacities
+        room_data['capacity'] = capacities.reindex(pd.MultiIndex.from_frame(room_data[['bldg_id', 'room_num']])).array
+        
+        # Insert new rooms and replace the capacity of rooms loaded before
+        self.load_rows('room', room_data, conflict_key='bldg_id, room_num')
+        
+        print(f"Processed {len(room_data)} rooms")
+
+    def process_sections(self, df, section_lookup=None):
+        """
+        Process section data from the DataFrame and load into the database.
+        Returns a Series of the loaded section_id values, including any sections
+        already loaded from earlier chunks.
+        """
+        import pandas as pd
+        import numpy as np
+
+        print("Processing section data...")
+        
+        # Using 'Class Nbr' as the section_id
+        sections = df[['Class Nbr', 'SubjectCatalog', 'Title', 'College', 'Acad Org', 'Section',
+                       'TermKey', 'TermEndKey', 'Instructor First Name', 'Instructor Last Name',
+                       'Enrollment Capacity']].drop_duplicates()
+        
+        # Skip section rows seen before, as the extra meeting rows of a section
+        # in a later chunk are. A class number seen before with different
+        # section attributes is a duplicate: the first row seen wins, as it
+        # does within a chunk.
+        variants = row_hash(sections.astype({col: 'Int64' for col, dtype in sections.dtypes.items()
+                                             if pd.api.types.is_integer_dtype(dtype)}))
+        if self.section_variants is None:
+            self.section_variants = np.empty(0, dtype='int64')
+        seen = np.isin(variants, self.section_variants)
+        self.section_variants = np.union1d(self.section_variants, variants)
+        sections = sections[~seen]
+        duplicates = sections['Class Nbr'].duplicated().to_numpy()
+        if section_lookup is not None:
+            duplicates = duplicates | sections['Class Nbr'].isin(section_lookup).to_numpy()
+        if duplicates.any():
+            import data_quality
+
+            self.record_issues(data_quality.issues('duplicate_class_nbr', sections.loc[duplicates, 'Class Nbr'],
+                                                   "Class Nbr already loaded from a different row, skipped"))
+            print(f"Warning: {int(duplicates.sum())} duplicate Class Nbr rows found, skipping them")
+        sections = sections[~duplicates]
+        
+        # Resolve course_id, term_id and instr_id from the registered natural keys
+        course_id = self.dimensions['course'].lookup(sections[['SubjectCatalog', 'Title', 'College', 'Acad Org']])
+        term_id = self.dimensions['term'].lookup(sections[['TermKey', 'TermEndKey']].set_axis(
+            ['start_date', 'end_date'], axis=1))
+        instr_id = self.dimensions['instructor'].lookup(pd.DataFrame({
+            'first_name': fill_missing(sections['Instructor First Name'], "Unknown"),
+            'last_name': fill_missing(sections['Instructor Last Name'], "Unknown")
+        }))
+        
+        # Create section data
+        section_data = pd.DataFrame({
+            'section_id': sections['Class Nbr'].to_numpy(),  # Use Class Nbr as section_id
             'course_id': course_id,
             'term_id': term_id,
             'instr_id': instr_id,
-            'section_num': row['Section'],
-            'max_seats': max_seats
+            'section_num': sections['Section'].to_numpy(),
+            'max_seats': sections['Enrollment Capacity'].fillna(0).to_numpy()
         })
-    
-    # Insert sections into the database
-    for section in section_data:
-        cursor.execute('''
-        INSERT INTO section (section_id, course_id, term_id, instr_id, section_num, max_seats)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (section['section_id'], section['course_id'], section['term_id'], 
-              section['instr_id'], section['section_num'], section['max_seats']))
-    
-    # Create a lookup dictionary for section IDs
-    section_lookup = {section['section_id']: section['section_id'] for section in section_data}
-    
-    conn.commit()
-    print(f"Processed {len(section_data)} sections")
-    return section_lookup
-
-def process_schedules(df, section_lookup, bldg_lookup):
-    """
-    Process schedule data from the DataFrame and load into the database.
-    """
-    print("Processing schedule data...")
-    
-    # Extract schedule information
-    schedules = df[['Class Nbr', 'Room', 'Class Days', 'Class Start Time', 'Class End Time']].drop_duplicates()
-    
-    # Function to extract room number
-    def extract_room_number(room):
-        if pd.isna(room):
-            return "UNKNOWN"
-        
-        # Extract room number (assuming format like "SEM 101" where "101" is the room number)
-        match = re.search(r'(\d+)$', room)
-        if match:
-            return match.group(1)
-        else:
-            return "UNKNOWN"
-    
-    # Create schedule data
-    schedule_data = []
-    for idx, (_, row) in enumerate(schedules.iterrows(), 1):
-        class_nbr = row['Class Nbr']
-        section_id = section_lookup.get(class_nbr)
-        
-        # Extract building code and room number
-        if pd.notna(row['Room']):
-            building_code = re.match(r'([A-Za-z]+)', row['Room'])
-            building_code = building_code.group(1) if building_code else "UNKNOWN"
-            room_num = extract_room_number(row['Room'])
+        section_data['row_hash'] = row_hash(section_data)
+        
+        # Insert new sections and update changed ones; unchanged sections are skipped
+        changed = section_data
+        if 'section' in self.existing_rows:
+            previous = self.existing_rows['section'].reindex(section_data['section_id'].to_numpy())
+            is_changed = previous.ne(section_data['row_hash'].to_numpy()).fillna(True)
+            changed = section_data[is_changed.to_numpy(dtype=bool)]
+        self.load_rows('section', changed, conflict_key='section_id')
+        
+        # Add the loaded section IDs to the lookup
+        if section_lookup is None:
+            section_lookup = section_data['section_id']
         else:
-            building_code = "UNKNOWN"
-            room_num = "UNKNOWN"
+            section_lookup = pd.concat([section_lookup, section_data['section_id']], ignore_index=True)
         
-        bldg_id = bldg_lookup.get(building_code)
+        print(f"Processed {len(section_data)} sections ({len(changed)} new or changed)")
+        return section_lookup
+
+    def process_schedules(self, df, section_lookup, schedule_lookup=None):
+        """
+        Process schedule data from the DataFrame and load into the database.
+        Returns a sorted array of the source row hashes seen so far, which is used
+        to skip duplicate schedule rows in later chunks. A schedule row's hash is its
+        identity, so a changed row is loaded as a new schedule and the old one is
+        removed by delete_missing_rows().
+        """
+        import pandas as pd
+        import numpy as np
+        import conflicts
+        import data_quality
+
+        print("Processing schedule data...")
+        
+        # Extract schedule information that hasn't been seen in an earlier chunk
+        schedules = df[['Class Nbr', 'Room', 'Class Days', 'Class Start Time', 'Class End Time',
+                        'BuildingCode', 'RoomNumber']].drop_duplicates()
+        row_hashes = row_hash(schedules[['Class Nbr', 'Room', 'Class Days', 'Class Start Time', 'Class End Time']])
+        if schedule_lookup is not None:
+            is_new = ~np.isin(row_hashes, schedule_lookup)
+            schedules = schedules[is_new]
+            row_hashes = row_hashes[is_new]
+        if schedule_lookup is None:
+            schedule_lookup = np.empty(0, dtype='int64')
+        schedule_lookup = np.union1d(schedule_lookup, row_hashes)
+        
+        # Skip schedules that are already in the database
+        if 'schedule' in self.existing_rows:
+            is_new = ~np.isin(row_hashes, self.existing_rows['schedule'])
+            schedules = schedules[is_new]
+            row_hashes = row_hashes[is_new]
+        
+        # Resolve section_id and bldg_id
+        class_nbr = schedules['Class Nbr']
+        section_id = class_nbr.where(class_nbr.isin(section_lookup))
+        bldg_id = self.dimensions['building'].lookup(schedules['BuildingCode'].to_frame('bldg_code'))
         
         # Create day pattern
-        day_pattern = ""
-        if pd.notna(row['Class Days']):
-            day_pattern += str(row['Class Days'])
+        start_time = schedules['Class Start Time']
+        end_time = schedules['Class End Time']
+        times = (' ' + start_time.astype(str) + '-' + end_time.astype(str)).where(
+            start_time.notna() & end_time.notna(), '')
+        day_pattern = schedules['Class Days'].astype(object).fillna('').astype(str) + times
         
-        if pd.notna(row['Class Start Time']) and pd.notna(row['Class End Time']):
-            day_pattern += f" {row['Class Start Time']}-{row['Class End Time']}"
+        # Times that aren't a time of day (an invalid_time issue) are loaded as
+        # NULL, so the meeting is kept without a time range
+        has_times = data_quality.valid_clock_times(start_time) & data_quality.valid_clock_times(end_time)
         
-        schedule_data.append({
-            'schedule_id': idx,
-            'section_id': section_id,
+        # Create schedule data, numbering the schedules on from the last loaded
+        first_id = self.next_schedule_id
+        self.next_schedule_id += len(schedules)
+        schedule_data = pd.DataFrame({
+            'schedule_id': range(first_id, first_id + len(schedules)),
+            'section_id': section_id.to_numpy(),
             'bldg_id': bldg_id,
-            'room_num': room_num,
-            'day_pattern': day_pattern
+            'room_num': schedules['RoomNumber'].to_numpy(),
+            'day_pattern': day_pattern.to_numpy(),
+            'days': conflicts.parse_days(schedules['Class Days']).to_numpy(),
+            'start_min': conflicts.to_minutes(start_time).where(has_times).array,
+            'end_min': conflicts.to_minutes(end_time).where(has_times).array,
+            'row_hash': row_hashes
         })
-    
-    # Insert schedules into the database
-    for schedule in schedule_data:
-        cursor.execute('''
-        INSERT INTO schedule (schedule_id, section_id, bldg_id, room_num, day_pattern)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (schedule['schedule_id'], schedule['section_id'], 
-              schedule['bldg_id'], schedule['room_num'], schedule['day_pattern']))
-    
-    conn.commit()
-    print(f"Processed {len(schedule_data)} schedules")
+        
+        # Insert schedules into the database
+        self.load_rows('schedule', schedule_data)
+        
+        print(f"Processed {len(schedule_data)} schedules")
+        return schedule_lookup
 
-def validate_database():
-    """
-    Run validation queries on the database to confirm its structure and contents.
-    """
-    print("\n--- Validating Database ---")
-    
-    # Count records in each table
-    cursor.execute('''
-    SELECT 'Department' as Table_Name, COUNT(*) as Record_Count FROM department
-    UNION ALL
-    SELECT 'Course', COUNT(*) FROM course
-    UNION ALL
-    SELECT 'Term', COUNT(*) FROM term
-    UNION ALL
-    SELECT 'Instructor', COUNT(*) FROM instructor
-    UNION ALL
-    SELECT 'Section', COUNT(*) FROM section
-    UNION ALL
-    SELECT 'Building', COUNT(*) FROM building
-    UNION ALL
-    SELECT 'Schedule', COUNT(*) FROM schedule;
-    ''')
-    
-    results = cursor.fetchall()
-    for table, count in results:
-        print(f"{table}: {count} records")
-    
-    # Validate foreign key relationships
-    print("\n--- Validating Foreign Key Relationships ---")
-    
-    # Courses per department
-    cursor.execute('''
-    SELECT d.dept_name, COUNT(c.course_id) as Course_Count
-    FROM department d
-    LEFT JOIN course c ON d.dept_id = c.dept_id
-    GROUP BY d.dept_name
-    ''')
-    
-    results = cursor.fetchall()
-    print("Courses per Department:")
-    for dept, count in results:
-        print(f"{dept}: {count} courses")
-    
-    # Sections per course
-    cursor.execute('''
-    SELECT c.course_name, COUNT(s.section_id) as Section_Count
-    FROM course c
-    LEFT JOIN section s ON c.course_id = s.course_id
-    GROUP BY c.course_name
-    LIMIT 5
-    ''')
-    
-    results = cursor.fetchall()
-    print("\nSections per Course (top 5):")
-    for course, count in results:
-        print(f"{course}: {count} sections")
-    
-    # Teaching load per instructor
-    cursor.execute('''
-    SELECT i.last_name, i.first_name, COUNT(s.section_id) as Section_Count
-    FROM instructor i
-    LEFT JOIN section s ON i.instr_id = s.instr_id
-    GROUP BY i.last_name, i.first_name
-    LIMIT 5
-    ''')
-    
-    results = cursor.fetchall()
-    print("\nSections per Instructor (top 5):")
-    for last_name, first_name, count in results:
-        print(f"{first_name} {last_name}: {count} sections")
-    
-    # Complex query to show complete class schedule (sample)
-    cursor.execute('''
-    SELECT 
-        d.dept_name as Department,
-        c.course_num as Course,
-        c.course_name as Title,
-        s.section_num as Section,
-        i.last_name as Instructor,
-        t.term_name as Term,
-        b.bldg_name as Building,
-        sch.room_num as Room,
-        sch.day_pattern as Schedule
-    FROM schedule sch
-    JOIN section s ON sch.section_id = s.section_id
-    JOIN course c ON s.course_id = c.course_id
-    JOIN department d ON c.dept_id = d.dept_id
-    JOIN instructor i ON s.instr_id = i.instr_id
-    JOIN term t ON s.term_id = t.term_id
-    JOIN building b ON sch.bldg_id = b.bldg_id
-    LIMIT 5
-    ''')
-    
-    results = cursor.fetchall()
-    print("\nSample Class Schedule (5 entries):")
-    for row in results:
-        print(f"{row[0]} - {row[1]} {row[2]} (Section {row[3]})")
-        print(f"  Instructor: {row[4]}, Term: {row[5]}")
-        print(f"  Location: {row[6]} Room {row[7]}, Schedule: {row[8]}")
-        print()
+    def schema_is_current(self):
+        """
+        Return True if the database is empty or was built with the natural-key
+        constraints, row hashes, meeting-time columns and room capacities of the
+        current schema.
+        """
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(schedule)")]
+        if not columns:
+            return True
+        occupancy = [row[1] for row in self.cursor.execute("PRAGMA table_info(room_occupancy)")]
+        return ({'row_hash', 'days', 'start_min', 'end_min'} <= set(columns) and
+                'seat_utilization' in occupancy)
+
+    def read_existing_rows(self):
+        """
+        Read the row hashes of the sections and schedules already in the database,
+        so an incremental load only writes the rows that changed.
+        """
+        import pandas as pd
+        import numpy as np
+
+        sections = pd.read_sql_query('SELECT section_id, row_hash FROM section', self.conn)
+        self.existing_rows['section'] = pd.Series(pd.array(sections['row_hash'], dtype='Int64'),
+                                             index=sections['section_id'].to_numpy())
+        schedules = pd.read_sql_query('SELECT row_hash FROM schedule', self.conn)
+        self.existing_rows['schedule'] = np.sort(schedules['row_hash'].to_numpy(dtype='int64'))
+        print(f"Found {len(sections)} sections and {len(schedules)} schedules in the existing database")
+
+    def delete_missing_rows(self, section_lookup, schedule_lookup):
+        """
+        Delete the sections and schedules that are no longer in the source data.
+        Departments, courses, terms, instructors and buildings are kept, since
+        they may still be referenced by earlier terms.
+        """
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS seen_section (section_id INTEGER PRIMARY KEY)")
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS seen_schedule (row_hash INTEGER PRIMARY KEY)")
+        self.cursor.execute("DELETE FROM seen_section")
+        self.cursor.execute("DELETE FROM seen_schedule")
+        if section_lookup is not None:
+            self.cursor.executemany("INSERT OR IGNORE INTO seen_section VALUES (?)",
+                               ((int(x),) for x in section_lookup))
+        if schedule_lookup is not None:
+            self.cursor.executemany("INSERT OR IGNORE INTO seen_schedule VALUES (?)",
+                               ((int(x),) for x in schedule_lookup))
+
+        self.cursor.execute("DELETE FROM schedule WHERE row_hash NOT IN (SELECT row_hash FROM seen_schedule)")
+        deleted_schedules = self.cursor.rowcount
+        self.cursor.execute("DELETE FROM schedule WHERE section_id NOT IN (SELECT section_id FROM seen_section)")
+        deleted_schedules += self.cursor.rowcount
+        self.cursor.execute("DELETE FROM section WHERE section_id NOT IN (SELECT section_id FROM seen_section)")
+        deleted_sections = self.cursor.rowcount
+
+        print(f"Deleted {deleted_sections} sections and {deleted_schedules} schedules no longer in the source")
+
+    def check_database(self):
+        """
+        Run the set-based data-quality checks on the loaded tables before the
+        load is committed. Returns the number of data-quality errors found in
+        the extract and the loaded tables.
+        """
+        import data_quality
+
+        print("Checking data quality...")
+        self.issue_counts = data_quality.check_database(self.conn)
+        for (rule, severity), count in self.issue_counts.items():
+            print(f"{severity} {rule}: {count}")
+        return sum(count for (_, severity), count in self.issue_counts.items() if severity == 'error')
+
+    def validate_database(self):
+        """
+        Run validation queries on the database to summarize its structure and contents.
+        """
+        print("\n--- Validating Database ---")
+        
+        # Count records in each table
+        self.cursor.execute(VALIDATION_QUERIES['record_counts'])
+        
+        results = self.cursor.fetchall()
+        for table, count in results:
+            print(f"{table}: {count} records")
+        
+        # Validate foreign key relationships
+        print("\n--- Validating Foreign Key Relationships ---")
+        
+        # Courses per department
+        self.cursor.execute(VALIDATION_QUERIES['courses_per_department'])
+        
+        results = self.cursor.fetchall()
+        print("Courses per Department:")
+        for dept, count in results:
+            print(f"{dept}: {count} courses")
+        
+        # Sections per course
+        self.cursor.execute(VALIDATION_QUERIES['sections_per_course'])
+        
+        results = self.cursor.fetchall()
+        print("\nSections per Course (top 5):")
+        for course, count in results:
+            print(f"{course}: {count} sections")
+        
+        # Teaching load per instructor
+        self.cursor.execute(VALIDATION_QUERIES['sections_per_instructor'])
+        
+        results = self.cursor.fetchall()
+        print("\nSections per Instructor (top 5):")
+        for last_name, first_name, count in results:
+            print(f"{first_name} {last_name}: {count} sections")
+        
+        # Complex query to show complete class schedule (sample)
+        self.cursor.execute(VALIDATION_QUERIES['class_schedule'])
+        
+        results = self.cursor.fetchall()
+        print("\nSample Class Schedule (5 entries):")
+        for row in results:
+            print(f"{row[0]} - {row[1]} {row[2]} (Section {row[3]})")
+            print(f"  Instructor: {row[4]}, Term: {row[5]}")
+            print(f"  Location: {row[6]} Room {row[7]}, Schedule: {row[8]}")
+            print()
+
+    def refresh_conflicts(self):
+        """
+        Recompute the conflict table from the loaded schedules.
+        Returns the number of room and instructor conflicts found.
+        """
+        import conflicts
+
+        print("Detecting scheduling conflicts...")
+        room_conflicts, instructor_conflicts = conflicts.refresh_conflicts(self.conn)
+        print(f"Found {room_conflicts} room conflicts and {instructor_conflicts} instructor conflicts")
+        return room_conflicts, instructor_conflicts
+
+    def refresh_reporting_tables(self):
+        """
+        Bring the materialized reporting tables up to date with the load.
+        Returns the number of flat rows written.
+        """
+        print("Refreshing reporting tables...")
+        removed, added, terms = reporting.refresh_reporting_tables(self.conn)
+        print(f"Reporting tables: {removed} stale rows removed, {added} rows added, {terms} terms summarized")
+        return added
+
+    def refresh_room_usage(self):
+        """
+        Recompute the room utilization tables for the terms that
+        refresh_reporting_tables() just summarized again, the terms that meet
+        in a room whose capacity changed, and any term without them yet (such
+        as every term of a database loaded before they existed). Returns the
+        number of rows written.
+        """
+        import room_usage
+
+        print("Computing room utilization...")
+        self.cursor.execute('''
+        INSERT OR IGNORE INTO refresh_term
+        SELECT DISTINCT f.term_id
+        FROM schedule_flat f
+        JOIN room r ON r.bldg_id = f.bldg_id AND r.room_num = f.room_num
+        LEFT JOIN previous_room p ON p.bldg_id = r.bldg_id AND p.room_num = r.room_num
+        WHERE r.capacity IS NOT p.capacity
+        ''')
+        term_ids = [row[0] for row in self.cursor.execute('''
+        SELECT term_id FROM refresh_term
+        UNION
+        SELECT term_id FROM term WHERE term_id NOT IN (SELECT term_id FROM room_occupancy)
+        ''')]
+        written = room_usage.refresh_room_usage(self.conn, term_ids)
+        print(f"Room utilization: {written['room_occupancy']} room days, "
+              f"{written['building_slot_usage']} building time slots and "
+              f"{written['room_free_slot']} free periods for {len(term_ids)} terms")
+        return sum(written.values())
+
+    def close(self):
+        """
+        Close the database connection, if it is open.
+        """
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.cursor = None
+
+    def run(self, files=None, chunk_size=None, workers=None, incremental=False):
+        """
+        Run every stage of the ETL on the given workbooks (the sample workbook by
+        default), timing each one with instrumentation.stage().
+        """
+        stage = instrumentation.stage
+        files = files or [EXCEL_FILE]
+        print("Starting ETL process...")
+
+        # Connect to the database, keeping the existing one for incremental loads
+        with stage('schema'):
+            self.connect_database(rebuild=not incremental)
+            if incremental and not self.schema_is_current():
+                print("Existing database was built with an older schema, rebuilding it")
+                self.close()
+                self.connect_database(rebuild=True)
+
+            # Create database schema
+            self.create_database_schema()
+            
+            # Issues are recorded afresh by every load
+            self.cursor.execute("DELETE FROM data_issue")
+            self.next_schedule_id = self.cursor.execute(
+                "SELECT COALESCE(MAX(schedule_id), 0) + 1 FROM schedule").fetchone()[0]
+            self.section_variants = None
+            self.room_capacities = None
+
+            # Room capacities before the load, to find the terms whose seat
+            # utilization must be recomputed (see refresh_room_usage())
+            self.cursor.execute("DROP TABLE IF EXISTS temp.previous_room")
+            self.cursor.execute("CREATE TEMP TABLE previous_room AS SELECT bldg_id, room_num, capacity FROM room")
+
+        # Read Excel data: several workbooks in parallel, or one workbook whole or as a stream of chunks.
+        # Every source is lazy, so reading is timed as the extract stage as the chunks are consumed.
+        if len(files) > 1:
+            chunks = iter_workbooks(files, workers, self.use_cache)
+        elif chunk_size:
+            chunks = iter_export_chunks(chunk_size, files[0], self.use_cache)
+        else:
+            chunks = map(self.read_excel_data, files)
+        chunks = self.compacted_chunks(chunks)
+
+        # Process data for each table inside a single transaction.
+        # Only the dimension registry and the section and schedule keys are
+        # carried from one chunk to the next.
+        import dimensions
+
+        self.dimensions = dimensions.DimensionRegistry()
+        section_lookup = schedule_lookup = None
+        if incremental:
+            with stage('read_existing'):
+                self.dimensions = dimensions.DimensionRegistry.from_database(self.conn)
+                self.read_existing_rows()
+        try:
+            for df in chunks:
+                rows = len(df)
+                with stage('check', rows) as record:
+                    df = self.check_extract(self.skip_archived_terms(df))
+                    record['rows_out'] = len(df)
+                with stage('departments', rows):
+                    self.process_departments(df)
+                with stage('courses', rows):
+                    self.process_courses(df)
+                with stage('terms', rows):
+                    self.process_terms(df)
+                with stage('instructors', rows):
+                    self.process_instructors(df)
+                with stage('buildings', rows):
+                    self.process_buildings(df)
+                with stage('rooms', rows):
+                    self.process_rooms(df)
+                with stage('sections', rows):
+                    section_lookup = self.process_sections(df, section_lookup)
+                with stage('schedules', rows):
+                    schedule_lookup = self.process_schedules(df, section_lookup, schedule_lookup)
+            if incremental:
+                with stage('delete_missing'):
+                    self.delete_missing_rows(section_lookup, schedule_lookup)
+            
+            # Check the loaded tables, and keep a strict run from committing bad data
+            with stage('quality') as record:
+                errors = self.check_database()
+                record['rows_out'] = sum(self.issue_counts.values())
+            if self.strict and errors:
+                raise ValueError(f"{errors} data-quality errors found, so the load was not committed")
+
+            self.print_load_stats()
+
+            # Find overlapping meetings in the same room or for the same instructor
+            with stage('conflicts') as record:
+                record['rows_out'] = sum(self.refresh_conflicts())
+
+            # Materialize the reporting tables where the loaded data changed
+            with stage('reporting') as record:
+                record['rows_out'] = self.refresh_reporting_tables()
+            with stage('room_usage') as record:
+                record['rows_out'] = self.refresh_room_usage()
+
+            # Index the loaded tables for the validation and reporting queries
+            with stage('indexes'):
+                self.create_indexes()
+        except Exception:
+            # A rebuild has no rollback journal; its build file is discarded instead
+            if self.build_file is None:
+                self.conn.rollback()
+            raise
+
+        # Keep the extract cache within its size limit
+        if self.use_cache:
+            import extract_cache
+
+            with stage('cache_evict'):
+                extract_cache.evict()
+
+        peak = peak_memory_mb()
+        if peak is not None:
+            print(f"Peak memory: {peak:.1f} MB")
+
+        # Validate database
+        with stage('validate'):
+            self.validate_database()
+
+        # Publish the new database, or the next generation of the updated one,
+        # committing the load, the derived tables and the generation together
+        with stage('publish'):
+            self.publish_database()
 
 def main():
     """
     Main ETL process function.
     """
-    print("Starting ETL process...")
-    
-    # Create database schema
-    create_database_schema()
-    
-    # Read Excel data
-    df = read_excel_data()
-    
-    # Process data for each table
-    dept_lookup = process_departments(df)
-    course_lookup = process_courses(df, dept_lookup)
-    term_lookup = process_terms(df)
-    instr_lookup = process_instructors(df)
-    bldg_lookup = process_buildings(df)
-    section_lookup = process_sections(df, course_lookup, term_lookup, instr_lookup)
-    process_schedules(df, section_lookup, bldg_lookup)
-    
-    # Validate database
-    validate_database()
-    
-    # Close connection
-    conn.close()
-    print("\nETL process completed successfully. Database: 'class_schedule.db'")
+    parser = argparse.ArgumentParser(description="Load the class schedule Excel export into SQLite.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="rows per executemany batch (1 = one INSERT per row)")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="stream the workbook in chunks of this many rows instead of reading it whole")
+    parser.add_argument('--input', default=None,
+                        help=f"workbook, directory of workbooks or glob pattern to load (default: {EXCEL_FILE})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes used to parse several workbooks (default: one per CPU)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always parse the workbooks instead of reusing cached extracts")
+    parser.add_argument('--incremental', action='store_true',
+                        help="update the existing database in place instead of rebuilding it")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="build the new database in memory before publishing it (needs enough RAM)")
+    parser.add_argument('--strict', action='store_true',
+                        help="fail without publishing the database if any data-quality error is found")
+    parser.add_argument('--report', default=None,
+                        help="write per-stage timings, row counts and peak memory to this JSON file")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="leave per-stage peak memory out of the report, which makes the run faster")
+    parser.add_argument('--profile', default=None,
+                        help="run under cProfile and write the profile (pstats format) to this file")
+    args = parser.parse_args()
+
+    files = resolve_input_files(args.input) if args.input else [EXCEL_FILE]
+    if not files:
+        parser.error(f"no workbooks found for {args.input}")
+
+    # Tracing allocations slows the run down, so only do it for a report
+    instrumentation.start(trace_memory=args.report is not None and not args.no_trace_memory)
+    with instrumentation.profiled(args.profile):
+        with ETLPipeline(DB_FILE, args.batch_size, use_cache=not args.no_cache,
+                         in_memory=args.in_memory, strict=args.strict) as pipeline:
+            pipeline.run(files, args.chunk_size, args.workers, args.incremental)
+
+    instrumentation.print_stage_stats()
+    if args.report:
+        instrumentation.write_report(args.report, input=files, database=DB_FILE,
+                                     max_rss_mb=peak_memory_mb(), extract_memory=pipeline.memory_stats,
+                                     data_issues=[{'rule': rule, 'severity': severity, 'count': count}
+                                                  for (rule, severity), count in pipeline.issue_counts.items()],
+                                     options=vars(args))
+        print(f"Report written to {args.report}")
+    print(f"\nETL process completed successfully. Database: '{DB_FILE}'")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,278 @@
+"""
+Bulk Export of the Class Scheduling Database
+
+Writes tables of class_schedule.db to Parquet, CSV or newline-delimited JSON
+for downstream consumers, without pulling whole tables into memory: rows are
+read with fetchmany() in batches of BATCH_ROWS and each batch is written out
+before the next is read, so memory depends on the batch size, not the table.
+Parquet batches are converted to Arrow record batches with the column types
+the table declares and written as one row group each.
+
+The denormalized schedule is the schedule_flat table that reporting.py
+maintains (one row per meeting with its section, course, department, term,
+instructor and building), which is also the default export. Any other table
+can be exported by name.
+
+With --per-term, the tables that hold rows of a single term (those in
+partitions.TERM_TABLES) are written as one file per term code:
+
+    exports/schedule_flat/202501.parquet
+
+Terms that have been archived are read from their read-only archive, so an
+export covers the main database and every partition. The terms are exported
+in parallel worker processes, each with its own read-only connection. Tables
+that don't belong to a term, such as department, and every table exported
+without --per-term, are written whole from the main database.
+
+Usage:
+    python export.py
+    python export.py section schedule course --format csv
+    python export.py schedule_flat --per-term --workers 4 --format ndjson
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import etl_process
+import partitions
+
+# Rows read per fetchmany() call, and written per Parquet row group
+BATCH_ROWS = 65536
+
+# Directory the exports are written to by default
+EXPORT_DIR = 'exports'
+
+# Writers by format name, and the file extension of each format
+WRITERS = {}
+EXTENSIONS = {}
+
+def writer(name, extension):
+    """
+    Register the decorated function as the writer for a format. A writer is
+    called with a path, the (name, declared type) pairs of the columns and an
+    iterator of row lists, and returns the number of rows written.
+    """
+    def register(func):
+        WRITERS[name] = func
+        EXTENSIONS[name] = extension
+        return func
+    return register
+
+def table_columns(conn, table):
+    """
+    Return the (name, declared type) pairs of a table's columns, or raise
+    ValueError if the database has no such table.
+    """
+    columns = [(row[1], row[2].upper()) for row in conn.execute(f"PRAGMA table_info({table})")]
+    if not columns:
+        raise ValueError(f"no table named {table}")
+    return columns
+
+def iter_batches(cursor, batch_rows=BATCH_ROWS):
+    """
+    Yield the rows of an executed query in lists of at most batch_rows rows.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield rows
+
+def arrow_type(declared):
+    """
+    Return the Arrow type of a column from its declared SQLite type, following
+    SQLite's type affinity rules; None lets Arrow infer it.
+    """
+    import pyarrow as pa
+
+    if 'INT' in declared:
+        return pa.int64()
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return pa.string()
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return pa.float64()
+    if 'BLOB' in declared:
+        return pa.binary()
+    return None
+
+@writer('parquet', '.parquet')
+def write_parquet(path, columns, batches):
+    """
+    Write each batch as an Arrow record batch, one Parquet row group per batch.
+    Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = [arrow_type(declared) for _, declared in columns]
+    schema = pa.schema([(name, column_type or pa.string()) for (name, _), column_type in zip(columns, types)])
+    count = 0
+    with pq.ParquetWriter(path, schema) as output:
+        for rows in batches:
+            arrays = [pa.array(values, type=column_type) for values, column_type in zip(zip(*rows), types)]
+            output.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+@writer('csv', '.csv')
+def write_csv(path, columns, batches):
+    """
+    Write a header row and then the rows, with NULL as an empty field.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        output = csv.writer(f)
+        output.writerow([name for name, _ in columns])
+        for rows in batches:
+            output.writerows(rows)
+            count += len(rows)
+    return count
+
+@writer('ndjson', '.ndjson')
+def write_ndjson(path, columns, batches):
+    """
+    Write one JSON object per line, keyed on the column names.
+    """
+    names = [name for name, _ in columns]
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for rows in batches:
+            f.write(''.join(encode(dict(zip(names, row))) + '\n' for row in rows))
+            count += len(rows)
+    return count
+
+def export_query(conn, table, path, fmt, where='', params=(), batch_rows=BATCH_ROWS):
+    """
+    Stream the rows of a table (optionally filtered by a WHERE clause) into a
+    file, written under a temporary name and renamed into place once complete.
+    Returns the number of rows written.
+    """
+    columns = table_columns(conn, table)
+    cursor = conn.execute(f"SELECT * FROM {table} {where}", params)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        count = WRITERS[fmt](tmp, columns, iter_batches(cursor, batch_rows))
+        os.replace(tmp, path)
+    finally:
+        cursor.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+def term_condition(table):
+    """
+    Return the partitions.TERM_TABLES condition that selects the rows of the
+    terms in the temporary archive_term table, or None if the table isn't
+    partitioned by term.
+    """
+    for name, condition in partitions.TERM_TABLES:
+        if name == table:
+            return condition.format(op='IN')
+    return None
+
+def export_table(db_file, table, output_dir, fmt, batch_rows=BATCH_ROWS):
+    """
+    Export a whole table of the main database to <output_dir>/<table>.<ext>.
+    Returns the path and the number of rows written.
+    """
+    path = os.path.join(output_dir, f"{table}{EXTENSIONS[fmt]}")
+    conn = partitions.connect(db_file)
+    try:
+        count = export_query(conn, table, path, fmt, batch_rows=batch_rows)
+    finally:
+        conn.close()
+    return path, count
+
+def export_term(db_file, table, term_code, output_dir, fmt, batch_rows=BATCH_ROWS):
+    """
+    Export the rows of one term of a table to <output_dir>/<table>/<term_code>.<ext>,
+    reading the term's archive if it has one. Runs in a worker process of
+    export_terms(). Returns the path and the number of rows written.
+    """
+    directory = os.path.join(output_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{term_code}{EXTENSIONS[fmt]}")
+    conn = partitions.connect(db_file, term_code)
+    try:
+        partitions.select_term(conn, term_code)
+        count = export_query(conn, table, path, fmt, f"WHERE {term_condition(table)}", batch_rows=batch_rows)
+    finally:
+        conn.close()
+    return path, count
+
+def term_codes(db_file):
+    """
+    Return the codes of every term in the main database and its archives, in order.
+    """
+    conn = partitions.connect(db_file)
+    try:
+        codes = {row[0] for row in conn.execute("SELECT DISTINCT term_code FROM term")}
+    finally:
+        conn.close()
+    return sorted(codes | set(partitions.archived_terms(db_file)))
+
+def export_terms(db_file, tables, output_dir, fmt, terms=None, workers=None, batch_rows=BATCH_ROWS):
+    """
+    Export each term of each table in parallel worker processes (one per CPU by
+    default), yielding the path and row count of every file as it is finished.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    terms = term_codes(db_file) if terms is None else list(terms)
+    jobs = [(db_file, table, term_code, output_dir, fmt, batch_rows) for table in tables for term_code in terms]
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield export_term(*job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(export_term, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export tables of the class schedule database.")
+    parser.add_argument('tables', nargs='*', default=['schedule_flat'],
+                        help="tables to export (default: schedule_flat, the denormalized schedule)")
+    parser.add_argument('--database', default=etl_process.DB_FILE)
+    parser.add_argument('--format', choices=sorted(WRITERS), default='parquet')
+    parser.add_argument('--output-dir', default=EXPORT_DIR)
+    parser.add_argument('--per-term', action='store_true',
+                        help="write one file per term for the tables partitioned by term")
+    parser.add_argument('--terms', nargs='+', default=None,
+                        help="codes of the terms to export with --per-term (default: every term)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for --per-term (default: one per CPU)")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help="rows read and written at a time")
+    args = parser.parse_args()
+
+    conn = partitions.connect(args.database)
+    try:
+        for table in args.tables:
+            table_columns(conn, table)
+    except ValueError as error:
+        parser.error(str(error))
+    finally:
+        conn.close()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    term_tables = [table for table in args.tables if args.per_term and term_condition(table)]
+    exports = [export_table(args.database, table, args.output_dir, args.format, args.batch_rows)
+               for table in args.tables if table not in term_tables]
+    if term_tables:
+        exports += export_terms(args.database, term_tables, args.output_dir, args.format,
+                                args.terms, args.workers, args.batch_rows)
+
+    for path, count in sorted(exports):
+        print(f"{path}: {count} rows ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    elapsed = time.perf_counter() - start
+    print(f"Exported {sum(count for _, count in exports)} rows to {len(exports)} files in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
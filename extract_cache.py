@@ -0,0 +1,182 @@
+"""
+Parsed-Extract Cache for the Class Scheduling ETL
+
+Parsing a workbook with openpyxl is the slowest part of the ETL, so the cleaned
+DataFrame produced from each workbook is kept on disk as a Parquet file and
+reused as long as the workbook hasn't changed. Entries are keyed on a hash of
+the workbook's contents; the path, size and modification time are only used to
+avoid re-hashing a file that hasn't been touched.
+
+Parquet support comes from pyarrow. If it isn't installed the cache is simply
+skipped and every run parses the workbook.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+# Directory that holds the cached extracts
+CACHE_DIR = '.etl_cache'
+
+# Cached extracts are evicted, least recently used first, above this total size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Bump whenever etl_process.normalize_extract() changes what it produces, so
+# extracts cached by an older version are not reused
+CACHE_VERSION = 3
+
+def available():
+    """
+    Return True if pyarrow is installed and Parquet files can be read and written.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def content_hash(path):
+    """
+    Return the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint(path):
+    """
+    Return the cache key for a workbook. The content hash is remembered next to
+    the cache together with the file's size and mtime, and only recomputed when
+    either of them changes.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    path_key = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    stamp_file = os.path.join(CACHE_DIR, f"{path_key}.json")
+
+    try:
+        with open(stamp_file) as f:
+            stamp = json.load(f)
+        if stamp['path'] == path and stamp['size'] == stat.st_size and stamp['mtime'] == stat.st_mtime_ns:
+            return f"{stamp['sha256']}-v{CACHE_VERSION}"
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha256 = content_hash(path)
+    stamp = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': sha256}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_atomic(stamp_file, lambda tmp: _write_json(tmp, stamp))
+    return f"{sha256}-v{CACHE_VERSION}"
+
+def cache_file(path):
+    """
+    Return the Parquet file that holds (or would hold) the extract for a workbook.
+    """
+    return os.path.join(CACHE_DIR, f"{fingerprint(path)}.parquet")
+
+def load(path):
+    """
+    Return the cached extract for a workbook, or None if there isn't one.
+    """
+    if not available():
+        return None
+
+    target = cache_file(path)
+    if not os.path.exists(target):
+        return None
+
+    import pandas as pd
+
+    df = pd.read_parquet(target)
+    _touch(target)
+    return df
+
+def iter_batches(path, batch_size):
+    """
+    Yield the cached extract for a workbook in DataFrames of at most batch_size
+    rows, or return None if there isn't one.
+    """
+    if not available():
+        return None
+
+    target = cache_file(path)
+    if not os.path.exists(target):
+        return None
+
+    import pyarrow.parquet as pq
+
+    _touch(target)
+    parquet_file = pq.ParquetFile(target)
+    return (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=batch_size))
+
+def store(path, df):
+    """
+    Save the extract for a workbook. Returns False if the DataFrame can't be
+    written as Parquet (for example a column mixing numbers and text).
+    """
+    if not available():
+        return False
+
+    import pyarrow as pa
+
+    target = cache_file(path)
+    try:
+        _write_atomic(target, lambda tmp: df.to_parquet(tmp, index=False))
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        print(f"Warning: could not cache extract for {path}: {e}")
+        return False
+    return True
+
+def evict(max_bytes=None):
+    """
+    Delete the least recently used cached extracts until the cache is no larger
+    than max_bytes. Returns the number of files deleted.
+    """
+    if max_bytes is None:
+        max_bytes = MAX_CACHE_BYTES
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.parquet'):
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(CACHE_DIR, name))
+        total -= size
+        deleted += 1
+    return deleted
+
+def _touch(target):
+    """
+    Mark a cached extract as recently used.
+    """
+    now = time.time()
+    os.utime(target, (now, now))
+
+def _write_json(target, data):
+    with open(target, 'w') as f:
+        json.dump(data, f)
+
+def _write_atomic(target, write):
+    """
+    Write a cache file through a temporary file and rename it into place, so
+    concurrent workers never see a partially written file.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,183 @@
+"""
+Synthetic Registrar Extract Generator for the Class Scheduling ETL
+
+Writes a workbook laid out like the registrar's "Basic Class Schedule" export
+(a title row, then the same 27 columns as the sample workbook), filled with
+made-up but realistic data: departments with their own subjects and courses,
+lecture and lab sections on the usual MWF and TR time slots, rooms that are
+booked about as densely as real ones, and instructors teaching a few sections
+per term. Values are written in the same shapes as the real export, such as
+catalog numbers padded with a space and times as "08.50" text.
+
+The same arguments and seed always produce the same workbook.
+
+Usage:
+    python generate_data.py --rows 100000 --output synthetic.xlsx
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['College', 'Acad Org', 'Subject', 'Catalog', 'Section', 'Title', 'Component', 'Session',
+           'Class Nbr', 'Instruction Mode', 'Class Days', 'Class Start Time', 'Class End Time',
+           'Start Date', 'End Date', 'Room', 'Instructor Last Name', 'Instructor First Name',
+           'Room Capacity', 'Enrollment Capacity', 'Current Enrollment', 'Waitlist Capacity',
+           'Waitlist Total', 'Combined?', 'Class Stat', 'Prgrss Unt', 'Acad Group']
+
+COLLEGES = ['ENGR', 'SCI', 'BUS', 'LIBA', 'EDUC', 'HLTH', 'FINE', 'AGRI']
+BUILDINGS = ['SEM', 'WPEB', 'LME', 'DMSC', 'CFA', 'MS', 'AB', 'PE', 'FA', 'SLH', 'KC', 'ANS',
+             'TB', 'CHS', 'CB', 'EJCH', 'JCSU', 'LLB', 'MIKC', 'PSAC']
+FIRST_NAMES = ['Erin', 'Lee', 'Sara', 'David', 'Maria', 'James', 'Anh', 'Carlos', 'Priya', 'John',
+               'Wei', 'Fatima', 'Robert', 'Olga', 'Kwame', 'Laura', 'Hiro', 'Ana', 'Mark', 'Nadia']
+SYLLABLES = ['ka', 'li', 'mo', 'ran', 'te', 'son', 'ber', 'ger', 'ha', 'vin', 'do', 'mar',
+             'sel', 'tor', 'ne', 'wick', 'ley', 'ton', 'ell', 'ross']
+TOPICS = ['Introduction to', 'Principles of', 'Topics in', 'Advanced', 'Methods in', 'Seminar in']
+
+# Weekly meeting patterns: days, first start (hour), minutes per meeting, slots per day
+PATTERNS = [('MWF', 8, 50, 9), ('TR', 8, 75, 6), ('MW', 8, 75, 6), ('M', 8, 170, 3),
+            ('T', 8, 170, 3), ('W', 13, 170, 2), ('R', 13, 170, 2), ('F', 8, 110, 4)]
+
+# Meetings a room holds per term, on average
+MEETINGS_PER_ROOM = 10
+
+# Sections an instructor teaches per term, on average
+SECTIONS_PER_INSTRUCTOR = 4
+
+def clock(minutes):
+    """
+    Format minutes after midnight as H.MM text, the way the export writes times.
+    """
+    return pd.Series(minutes // 60).map('{:02d}'.format) + '.' + pd.Series(minutes % 60).map('{:02d}'.format)
+
+def word(rng, count, syllables=2):
+    """
+    Return count made-up words built from random syllables.
+    """
+    parts = rng.choice(SYLLABLES, size=(count, syllables))
+    return pd.Series([''.join(p) for p in parts]).str.capitalize()
+
+def generate(rows, terms=2, departments=10, duplicate_rate=0.01, seed=0):
+    """
+    Return a DataFrame of about rows synthetic export rows (rows of them unique,
+    plus duplicate_rate * rows exact duplicates) spread over the given number
+    of terms and departments.
+    """
+    rng = np.random.default_rng(seed)
+    per_term = max(rows // terms, 1)
+
+    # Departments, each with its own subject code and catalog of courses
+    subjects = pd.Series([''.join(p) for p in rng.choice(list('ABCDEFGHIJKLMNOPRSTUVW'), size=(departments, 3))])
+    subjects = subjects + pd.Series(range(departments)).astype(str).where(subjects.duplicated(keep=False), '')
+    dept_college = rng.choice(COLLEGES, size=departments)
+    courses_per_dept = max(min(per_term // (departments * 8), 400), 5)
+    dept = rng.integers(0, departments, rows)
+    course = rng.integers(0, courses_per_dept, rows)
+    catalog = 100 + course * 2 + (course % 7 == 0)
+    topics = word(rng, courses_per_dept, 3)
+    titles = pd.Series(rng.choice(TOPICS, size=courses_per_dept)) + ' ' + topics
+
+    # Terms: alternating spring and fall semesters
+    term = np.repeat(np.arange(terms), per_term + 1)[:rows]
+    starts = [datetime(2020 + t // 2, 1 if t % 2 == 0 else 8, 21) for t in range(terms)]
+    term_start = pd.Series(starts)[term].reset_index(drop=True)
+    term_end = term_start + timedelta(days=105)
+
+    # Meeting times on the standard slots
+    pattern = rng.integers(0, len(PATTERNS), rows)
+    days = np.array([p[0] for p in PATTERNS])[pattern]
+    first_hour = np.array([p[1] for p in PATTERNS])[pattern]
+    length = np.array([p[2] for p in PATTERNS])[pattern]
+    slots = np.array([p[3] for p in PATTERNS])[pattern]
+    slot = (rng.random(rows) * slots).astype(int)
+    start = first_hour * 60 + slot * (length + 10)
+    end = start + length
+
+    # Rooms, booked about MEETINGS_PER_ROOM times a term
+    rooms = max(per_term // MEETINGS_PER_ROOM, 1)
+    room = rng.integers(0, rooms, rows)
+    room_name = (pd.Series(np.array(BUILDINGS)[room % len(BUILDINGS)]) + ' '
+                 + pd.Series(100 + room // len(BUILDINGS)).astype(str))
+
+    # Instructors, each teaching a few sections a term in one department
+    instructors = max(per_term // SECTIONS_PER_INSTRUCTOR, 1)
+    instructor = rng.integers(0, instructors, rows)
+    last_names = word(rng, instructors, 3)
+    first_names = pd.Series(rng.choice(FIRST_NAMES, size=instructors))
+
+    # A few sections are online or not yet scheduled
+    unscheduled = rng.random(rows) < 0.02
+
+    lab = rng.random(rows) < 0.25
+    capacity = np.where(lab, rng.integers(12, 40, rows), rng.integers(20, 250, rows))
+    df = pd.DataFrame({
+        'College': dept_college[dept],
+        'Acad Org': pd.Series(dept).map('R{:04d}'.format),
+        'Subject': subjects[dept].to_numpy(),
+        'Catalog': ' ' + pd.Series(catalog).astype(str),
+        'Section': pd.Series(1001 + np.arange(rows) % 90 + lab * 100).astype(str),
+        'Title': titles[course].to_numpy(),
+        'Component': np.where(lab, 'LAB', 'LEC'),
+        'Session': '1',
+        'Class Nbr': 10000 + np.arange(rows),
+        'Instruction Mode': np.where(unscheduled, 'OL', 'P'),
+        'Class Days': pd.Series(days).where(~unscheduled, None),
+        'Class Start Time': clock(start).where(~unscheduled, None),
+        'Class End Time': clock(end).where(~unscheduled, None),
+        'Start Date': term_start,
+        'End Date': term_end,
+        'Room': room_name.where(~unscheduled, 'ONLINE'),
+        'Instructor Last Name': last_names[instructor].to_numpy(),
+        'Instructor First Name': first_names[instructor].to_numpy(),
+        'Room Capacity': capacity + rng.integers(0, 30, rows),
+        'Enrollment Capacity': capacity,
+        'Current Enrollment': (capacity * rng.random(rows)).astype(int),
+        'Waitlist Capacity': 999,
+        'Waitlist Total': 0,
+        'Combined?': 'No',
+        'Class Stat': 'A',
+        'Prgrss Unt': 3,
+        'Acad Group': '140'
+    }, columns=COLUMNS)
+
+    # Exact duplicate rows, as the export sometimes repeats a line
+    duplicates = int(rows * duplicate_rate)
+    if duplicates:
+        df = pd.concat([df, df.iloc[rng.integers(0, rows, duplicates)]], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
+
+def write_workbook(df, path, title='Basic Class Schedule'):
+    """
+    Write the DataFrame as an export workbook: a title row, the header, then
+    the rows. Uses openpyxl's write-only mode so large files fit in memory.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([title, f" {len(df)}"])
+    ws.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic class schedule export.")
+    parser.add_argument('--rows', type=int, default=10000, help="unique rows to generate")
+    parser.add_argument('--terms', type=int, default=2, help="terms the rows are spread over")
+    parser.add_argument('--departments', type=int, default=10, help="departments the rows are spread over")
+    parser.add_argument('--duplicate-rate', type=float, default=0.01,
+                        help="extra exact duplicate rows, as a fraction of --rows")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument('--output', default='synthetic.xlsx', help="workbook to write")
+    args = parser.parse_args()
+
+    df = generate(args.rows, args.terms, args.departments, args.duplicate_rate, args.seed)
+    write_workbook(df, args.output)
+    print(f"Wrote {len(df)} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Stage Instrumentation for the Class Scheduling ETL
+
+Records, for every stage of a run, how many times it ran, the wall-clock and
+CPU time it took, the rows it took in and wrote out, and the peak memory
+allocated while it ran. Stages that run once per chunk are added up under one
+name. The totals can be printed, written to a JSON report for tracking runs
+over time, and a whole run can be wrapped in cProfile.
+
+Peak memory comes from tracemalloc, which slows Python allocations down, so it
+is only measured once start(trace_memory=True) has been called.
+
+Usage:
+    with instrumentation.stage('departments', rows_in=len(df)):
+        ...   # rows written with instrumentation.count_rows(n)
+
+    for df in instrumentation.iter_stage('extract', chunks):
+        ...
+"""
+
+import cProfile
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Totals per stage name, in the order the stages first ran
+stage_stats = {}
+
+# Records of the stages currently running, innermost last
+_active = []
+
+# Wall-clock and CPU time when start() was called
+_started = {}
+
+def start(trace_memory=False):
+    """
+    Start timing a run, and start tracemalloc if trace_memory is set.
+    """
+    stage_stats.clear()
+    _started.update(time=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    wall=time.perf_counter(), cpu=time.process_time())
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def _traced_peak():
+    return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Time the body of a with block as one run of the named stage. Yields the
+    run's record, whose rows_out can be set directly or through count_rows().
+    """
+    # Fold the peak so far into the enclosing stages before resetting it
+    if tracemalloc.is_tracing():
+        peak = _traced_peak()
+        for outer in _active:
+            outer['peak'] = max(outer['peak'], peak)
+        tracemalloc.reset_peak()
+
+    record = {'calls': 1, 'rows_in': rows_in or 0, 'rows_out': 0, 'peak': 0}
+    _active.append(record)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        _active.pop()
+        record['peak'] = max(record['peak'], _traced_peak())
+        for outer in _active:
+            outer['peak'] = max(outer['peak'], record['peak'])
+
+        stats = stage_stats.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                              'rows_in': 0, 'rows_out': 0, 'peak_mb': None})
+        stats['calls'] += record['calls']
+        stats['wall_s'] += wall
+        stats['cpu_s'] += cpu
+        stats['rows_in'] += record['rows_in']
+        stats['rows_out'] += record['rows_out']
+        if tracemalloc.is_tracing():
+            stats['peak_mb'] = max(stats['peak_mb'] or 0.0, record['peak'] / (1024 * 1024))
+
+def iter_stage(name, iterable):
+    """
+    Yield the DataFrames of an iterable, timing each step of the iteration as
+    a run of the named stage. Used for extracts that are read lazily.
+    """
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as record:
+            item = next(iterator, None)
+            if item is None:
+                record['calls'] = 0
+            else:
+                record['rows_out'] = len(item)
+        if item is None:
+            return
+        yield item
+
+def count_rows(count):
+    """
+    Add rows written to the stage that is currently running, if any.
+    """
+    if _active:
+        _active[-1]['rows_out'] += count
+
+def print_stage_stats():
+    """
+    Print the totals for every stage.
+    """
+    print("\n--- Stage Timings ---")
+    for name, stats in stage_stats.items():
+        line = (f"{name}: {stats['wall_s']:.3f}s wall, {stats['cpu_s']:.3f}s CPU, "
+                f"{stats['rows_in']} rows in, {stats['rows_out']} rows out")
+        if stats['peak_mb'] is not None:
+            line += f", {stats['peak_mb']:.1f} MB peak"
+        print(line)
+
+def write_report(path, **extra):
+    """
+    Write the stage totals and the totals for the whole run to a JSON file.
+    Extra keyword arguments are added to the top level of the report.
+    """
+    report = {
+        'started': _started.get('time'),
+        'python': platform.python_version(),
+        'wall_s': time.perf_counter() - _started.get('wall', time.perf_counter()),
+        'cpu_s': time.process_time() - _started.get('cpu', time.process_time()),
+        'peak_mb': _traced_peak() / (1024 * 1024) if tracemalloc.is_tracing() else None,
+        'stages': [{'name': name, **stats} for name, stats in stage_stats.items()]
+    }
+    report.update(extra)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+@contextmanager
+def profiled(path):
+    """
+    Run the body of a with block under cProfile and save the profile to path.
+    The file is in pstats format, which snakeviz, flameprof and gprof2dot can
+    turn into a flame graph or call graph. Does nothing if path is None.
+    """
+    if path is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
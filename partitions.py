@@ -0,0 +1,261 @@
+"""
+Term Partitions for the Class Scheduling Database
+
+The main database holds the terms that are still being scheduled. A term that
+has closed (its end date has passed) can be archived: its sections, schedules,
+conflicts, reporting rows and the departments, courses, instructors and
+buildings they reference are copied into a database of its own, compacted with
+VACUUM and made read-only, and then deleted from the main database. Queries on
+the current terms never read through years of history, and the ETL, which
+skips rows of archived terms, never writes to an archive.
+
+Archives live next to the main database, one per term code:
+
+    class_schedule_archive/term_202501.db
+
+Every archive has the same schema as the main database, so the queries in
+query_service.py run unchanged against either. A query for one term only
+needs the partition that holds it (see connect() and partition_file()), and
+query_service.py routes queries with a term_code parameter that way.
+attach_archives() attaches archives to a connection and creates temporary
+UNION ALL views (all_schedule_flat, all_course_summary and so on) over the
+main database and every attached archive, for reports that span terms.
+Surrogate IDs are only unique within a partition, so reports across
+partitions should go through the denormalized tables, which carry names.
+
+Usage:
+    python partitions.py list
+    python partitions.py archive --closed
+    python partitions.py archive 202501 202505
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import date
+from urllib.parse import quote
+
+import etl_process
+
+# Tables with rows that belong to one term, in the order their rows are deleted,
+# and the condition that selects the rows of the terms in archive_term
+TERM_TABLES = [
+    ('conflict', '''schedule_id_a {op} (SELECT sch.schedule_id FROM schedule sch
+                    JOIN section s ON sch.section_id = s.section_id
+                    WHERE s.term_id IN (SELECT term_id FROM archive_term))'''),
+    ('schedule_flat', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('course_summary', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('instructor_summary', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('building_summary', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('room_summary', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('room_occupancy', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('building_slot_usage', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('room_free_slot', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('schedule', '''section_id {op} (SELECT section_id FROM section
+                    WHERE term_id IN (SELECT term_id FROM archive_term))'''),
+    ('section', 'term_id {op} (SELECT term_id FROM archive_term)'),
+    ('term', 'term_id {op} (SELECT term_id FROM archive_term)')
+]
+
+# Dimension rows an archive keeps only if its sections and schedules use them
+DIMENSION_PRUNES = [
+    "DELETE FROM course WHERE course_id NOT IN (SELECT course_id FROM section)",
+    "DELETE FROM department WHERE dept_id NOT IN (SELECT dept_id FROM course)",
+    "DELETE FROM instructor WHERE instr_id NOT IN (SELECT instr_id FROM section)",
+    "DELETE FROM room WHERE (bldg_id, room_num) NOT IN (SELECT bldg_id, room_num FROM schedule)",
+    "DELETE FROM building WHERE bldg_id NOT IN (SELECT bldg_id FROM schedule)",
+    "DELETE FROM data_issue"
+]
+
+# Tables combined across partitions by the views of attach_archives()
+UNION_TABLES = ['schedule_flat', 'term', 'course_summary', 'instructor_summary',
+                'building_summary', 'room_summary', 'room_occupancy', 'building_slot_usage']
+
+def archive_dir(db_file):
+    """
+    Return the directory that holds the archives of a database.
+    """
+    return f"{os.path.splitext(db_file)[0]}_archive"
+
+def archive_file(db_file, term_code):
+    """
+    Return the archive file of a term, whether or not it exists.
+    """
+    return os.path.join(archive_dir(db_file), f"term_{term_code}.db")
+
+def archived_terms(db_file):
+    """
+    Return the codes of the archived terms of a database, in order.
+    """
+    directory = archive_dir(db_file)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[len('term_'):-len('.db')] for name in os.listdir(directory)
+                  if name.startswith('term_') and name.endswith('.db'))
+
+def partition_file(db_file, term_code):
+    """
+    Return the database that holds a term: its archive if it has one, otherwise
+    the main database.
+    """
+    if term_code is not None:
+        path = archive_file(db_file, term_code)
+        if os.path.exists(path):
+            return path
+    return db_file
+
+def read_only_uri(path):
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
+
+def connect(db_file, term_code=None):
+    """
+    Open a read-only connection to the partition that holds a term, or to the
+    main database if term_code is None.
+    """
+    return sqlite3.connect(read_only_uri(partition_file(db_file, term_code)), uri=True)
+
+def closed_terms(conn, today=None):
+    """
+    Return the codes of the terms in a database whose every term has ended
+    before today.
+    """
+    today = (today or date.today()).isoformat()
+    return [row[0] for row in conn.execute('''
+    SELECT term_code FROM term
+    GROUP BY term_code
+    HAVING COUNT(date(end_date)) = COUNT(*) AND MAX(date(end_date)) < ?
+    ORDER BY term_code
+    ''', (today,))]
+
+def select_term(conn, term_code):
+    """
+    Fill the temporary archive_term table with the IDs of the terms with a code.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_term (term_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM archive_term")
+    conn.execute("INSERT INTO archive_term SELECT term_id FROM term WHERE term_code = ?", (term_code,))
+
+def write_archive(conn, term_code, target):
+    """
+    Copy the database open on conn into target, keep only the rows of one term
+    and the dimension rows they use, compact it and make it read-only.
+    """
+    tmp = f"{target}.{os.getpid()}.tmp"
+    archive = sqlite3.connect(tmp)
+    try:
+        conn.backup(archive)
+        archive.execute("PRAGMA journal_mode = DELETE")
+        select_term(archive, term_code)
+        for table, condition in TERM_TABLES:
+            archive.execute(f"DELETE FROM {table} WHERE {condition.format(op='NOT IN')}")
+        for sql in DIMENSION_PRUNES:
+            archive.execute(sql)
+        archive.execute("INSERT INTO schedule_search (schedule_search) VALUES ('optimize')")
+        archive.commit()
+        archive.execute("VACUUM")
+        archive.execute("ANALYZE")
+        archive.commit()
+        archive.close()
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+    finally:
+        archive.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def archive_term(db_file, term_code):
+    """
+    Move one term out of the main database into its read-only archive. The
+    archive is written first and the term's rows are then deleted from the
+    main database in one transaction that advances its generation, so readers
+    see the term in one place or the other. Archiving a term again finishes an
+    archive that was interrupted. Returns the number of sections and schedules
+    moved.
+    """
+    conn = sqlite3.connect(db_file)
+    try:
+        select_term(conn, term_code)
+        if conn.execute("SELECT COUNT(*) FROM archive_term").fetchone()[0] == 0 and \
+                not os.path.exists(archive_file(db_file, term_code)):
+            raise ValueError(f"no term with code {term_code} in {db_file}")
+
+        sections, schedules = conn.execute('''
+        SELECT (SELECT COUNT(*) FROM section WHERE term_id IN (SELECT term_id FROM archive_term)),
+               (SELECT COUNT(*) FROM schedule WHERE section_id IN
+                   (SELECT section_id FROM section WHERE term_id IN (SELECT term_id FROM archive_term)))
+        ''').fetchone()
+
+        target = archive_file(db_file, term_code)
+        if not os.path.exists(target):
+            os.makedirs(archive_dir(db_file), exist_ok=True)
+            write_archive(conn, term_code, target)
+
+        generation = conn.execute("PRAGMA user_version").fetchone()[0]
+        for table, condition in TERM_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE {condition.format(op='IN')}")
+        conn.execute(f"PRAGMA user_version = {generation + 1}")
+        conn.commit()
+    finally:
+        conn.close()
+    return sections, schedules
+
+def attach_archives(conn, db_file, term_codes=None):
+    """
+    Attach the archives of the given terms (every archived term by default) to
+    a connection opened with uri=True, read-only, and create temporary views
+    all_<table> that combine each table in UNION_TABLES across the main
+    database and the archives, with a partition column naming where each row
+    came from. SQLite attaches at most about ten databases to a connection.
+    Returns the codes of the attached terms.
+    """
+    term_codes = archived_terms(db_file) if term_codes is None else list(term_codes)
+    for term_code in term_codes:
+        conn.execute("ATTACH DATABASE ? AS ?",
+                     (read_only_uri(archive_file(db_file, term_code)), f"term_{term_code}"))
+
+    schemas = [('main', 'main')] + [(f"term_{code}", code) for code in term_codes]
+    for table in UNION_TABLES:
+        arms = ' UNION ALL '.join(f"SELECT '{name}' AS partition, * FROM {schema}.{table}"
+                                  for schema, name in schemas)
+        conn.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+        conn.execute(f"CREATE TEMP VIEW all_{table} AS {arms}")
+    return term_codes
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed terms into read-only partitions.")
+    parser.add_argument('--database', default=etl_process.DB_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list the terms in the main database and the archives")
+    archive = commands.add_parser('archive', help="move terms into read-only archives")
+    archive.add_argument('terms', nargs='*', help="codes of the terms to archive, such as 202501")
+    archive.add_argument('--closed', action='store_true', help="archive every term that has ended")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        conn = connect(args.database)
+        for term_code, term_name, sections in conn.execute('''
+        SELECT t.term_code, t.term_name, COUNT(s.section_id)
+        FROM term t LEFT JOIN section s ON s.term_id = t.term_id
+        GROUP BY t.term_id ORDER BY t.term_code
+        '''):
+            print(f"{term_code} {term_name}: {sections} sections (main)")
+        conn.close()
+        for term_code in archived_terms(args.database):
+            path = archive_file(args.database, term_code)
+            print(f"{term_code}: archived in {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+        return
+
+    terms = list(args.terms)
+    if args.closed:
+        conn = sqlite3.connect(args.database)
+        terms += closed_terms(conn)
+        conn.close()
+    if not terms:
+        parser.error("no terms to archive")
+    for term_code in dict.fromkeys(terms):
+        sections, schedules = archive_term(args.database, term_code)
+        print(f"Archived {term_code}: {sections} sections and {schedules} schedules "
+              f"into {archive_file(args.database, term_code)}")
+
+if __name__ == "__main__":
+    main()
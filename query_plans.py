@@ -0,0 +1,180 @@
+"""
+Query Plan Check for the Class Scheduling Database
+
+Runs EXPLAIN QUERY PLAN on every query shipped with the project (the queries in
+etl_process.VALIDATION_QUERIES, the statements in validation.sql and the named
+queries in query_service.QUERIES) and fails if
+any of them falls back to a full table scan where an index should be used:
+
+- a table scanned without an index inside a join (once per outer row),
+- an automatic index, which SQLite builds when a join has no usable index,
+- a full scan of the section or schedule tables, which grow with every term.
+
+A dimension table may still be scanned as the outermost loop of a query that
+reports on all of its rows, and samples such as "SELECT * FROM course LIMIT 5"
+may scan since they stop after a few rows. Loops
+over tables with at most one row don't count as outer loops, and a fact table
+may be scanned after a lookup in a table with at most one row, since the lookup
+then matches every fact row (as for the one department in the sample
+workbook). Scans of materialized subqueries and CTEs are not checked, since
+they aren't tables.
+
+Usage:
+    python query_plans.py
+    python query_plans.py --database other.db
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+import etl_process
+import query_service
+
+# Tables that grow with the number of terms loaded
+FACT_TABLES = {'section', 'schedule'}
+
+VALIDATION_SQL = 'validation.sql'
+
+def read_sql_file(path):
+    """
+    Return the statements in a sqlite3 shell script, keyed by the title of the
+    last .print command before each one. Dot-commands and comments are skipped.
+    """
+    queries = {}
+    title = 'statement'
+    lines = []
+    for line in open(path):
+        stripped = line.strip()
+        if stripped.startswith('.'):
+            match = re.match(r'\.print\s+"(?:\\n)?=*\s*(.*?)\s*=*"', stripped)
+            if match:
+                title = match.group(1)
+            continue
+        if stripped.startswith('--'):
+            continue
+        lines.append(line)
+        if stripped.endswith(';'):
+            name = title
+            count = 2
+            while name in queries:
+                name = f"{title} ({count})"
+                count += 1
+            queries[name] = ''.join(lines)
+            lines = []
+    return queries
+
+def shipped_queries():
+    """
+    Return every query shipped with the project, keyed by a readable name.
+    """
+    queries = dict(etl_process.VALIDATION_QUERIES)
+    queries.update(read_sql_file(VALIDATION_SQL))
+    queries.update(query_service.QUERIES)
+    return queries
+
+def table_aliases(sql):
+    """
+    Return a mapping of the aliases used in a query to their table names.
+    """
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        aliases[table] = table
+        if alias and alias.upper() not in ('ON', 'WHERE', 'JOIN', 'LEFT', 'INNER', 'GROUP',
+                                           'ORDER', 'LIMIT', 'UNION', 'USING'):
+            aliases[alias] = table
+    return aliases
+
+def is_sample(sql):
+    """
+    Return True for samples that stop after a few rows: a LIMIT with no
+    grouping, sorting or aggregation that would have to read every row first.
+    """
+    if re.search(r'\b(GROUP\s+BY|ORDER\s+BY|DISTINCT|UNION|COUNT|SUM|AVG|MIN|MAX)\b', sql, re.I):
+        return False
+    return re.search(r'\bLIMIT\s+\d+\s*;?\s*$', sql, re.I) is not None
+
+def table_rows(conn, table):
+    """
+    Return the number of rows in a table, or None if it isn't a table.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                          (table,)).fetchone()
+    if not exists:
+        return None
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+def plan_problems(conn, sql):
+    """
+    Return a list of descriptions of the full table scans in a query's plan.
+    """
+    # Named parameters are bound to NULL; the plan doesn't depend on their values
+    params = dict.fromkeys(query_service.query_parameters(sql))
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    aliases = table_aliases(sql)
+    sample = is_sample(sql)
+
+    problems = []
+    runs_once = {}
+    single_row_search = {}
+    for _, parent, _, detail in plan:
+        if not detail.startswith(('SCAN', 'SEARCH')):
+            continue
+        name = detail.split()[1]
+        table = aliases.get(name, name)
+        rows = table_rows(conn, table)
+
+        # A loop is outermost if every loop before it at this level runs once
+        outermost = runs_once.get(parent, True)
+        runs_once[parent] = outermost and rows is not None and rows <= 1
+        filtered = single_row_search.get(parent, False)
+        if detail.startswith('SEARCH') and rows is not None and rows <= 1:
+            single_row_search[parent] = True
+
+        if 'AUTOMATIC' in detail:
+            problems.append(f"missing index: {detail}")
+            continue
+        if not detail.startswith('SCAN') or 'INDEX' in detail or rows is None:
+            continue
+
+        if not outermost:
+            problems.append(f"full scan inside a join: {detail}")
+        elif table in FACT_TABLES and not sample and not filtered:
+            problems.append(f"full scan of {table}: {detail}")
+    return problems
+
+def check_query_plans(conn, queries=None):
+    """
+    Check the plans of the given queries (all shipped queries by default).
+    Prints each failing query and returns True if every plan is acceptable.
+    """
+    if queries is None:
+        queries = shipped_queries()
+
+    ok = True
+    for name, sql in queries.items():
+        problems = plan_problems(conn, sql)
+        if problems:
+            ok = False
+            print(f"FAIL {name}")
+            for problem in problems:
+                print(f"  {problem}")
+    print(f"Checked {len(queries)} queries: {'all use indexes' if ok else 'full table scans found'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the shipped queries use indexes.")
+    parser.add_argument('--database', default=etl_process.DB_FILE)
+    args = parser.parse_args()
+    if not os.path.exists(args.database):
+        parser.error(f"no database at {args.database}; run etl_process.py first")
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    ok = check_query_plans(conn)
+    conn.close()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
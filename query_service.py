@@ -0,0 +1,498 @@
+"""
+Read-Side Query Service for the Class Scheduling Database
+
+Runs a fixed set of named, parameterized queries (QUERIES) for the programs
+that read the schedule, such as a course search page or a room finder, over a
+pool of read-only connections, and keeps their results in an LRU cache.
+
+The database is in WAL mode once the ETL has published it, so the pooled
+readers never wait on a load and a load never waits on them. Each query runs
+in its own read transaction, and first reads the database generation: the
+PRAGMA user_version that the ETL advances every time it publishes a load,
+together with the inode of the database file. Cached results are only used
+while the generation is unchanged, so a load invalidates the whole cache at
+once, and a query never mixes data from two loads.
+
+A rebuild published over a database that wasn't in WAL mode renames a new file
+into place; pooled connections notice the new inode and reopen on it.
+
+Queries with a term_code parameter run on the partition that holds the term:
+the read-only archive of a closed term (see partitions.py), through a pool and
+cache of its own, or the main database.
+
+Usage:
+    python query_service.py query schedule_by_room bldg_code=WPEB room_num=100
+    python query_service.py serve --port 8000
+    python query_service.py bench --threads 8
+
+    from query_service import QueryService
+
+    service = QueryService('class_schedule.db')
+    result = service.query('schedule_by_instructor', last_name='Keith', first_name='Erin')
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, urlparse
+
+import etl_process
+import partitions
+
+# Read-only connections kept open per service
+POOL_SIZE = 4
+
+# Query results kept in the cache
+CACHE_SIZE = 1024
+
+# Columns returned by the schedule queries, one row per meeting pattern. They
+# read the materialized schedule_flat table (see reporting.py) rather than
+# joining the seven normalized tables on every request.
+SCHEDULE_SELECT = '''
+SELECT term_code, course_num, course_name, section_num, last_name, first_name,
+       bldg_code, room_num, day_pattern, days, start_min, end_min
+FROM schedule_flat
+'''
+
+# Named queries. Parameters are bound by name (:term_code), never formatted into
+# the SQL. They are also checked by query_plans.py, so every query must be able
+# to use the indexes from etl_process.INDEXES.
+QUERIES = {
+    'schedule_by_term': SCHEDULE_SELECT + '''
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+    ''',
+    'schedule_by_department': SCHEDULE_SELECT + '''
+    WHERE dept_name = :dept_name
+    ''',
+    'schedule_by_instructor': SCHEDULE_SELECT + '''
+    WHERE last_name = :last_name AND first_name = :first_name
+    ''',
+    'schedule_by_room': SCHEDULE_SELECT + '''
+    WHERE bldg_code = :bldg_code AND room_num = :room_num
+    ''',
+    'sections_per_instructor': '''
+    SELECT last_name, first_name, sections, seats
+    FROM instructor_summary
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+    ORDER BY sections DESC, last_name, first_name
+    ''',
+    'room_usage': '''
+    SELECT bldg_code, room_num, meetings, weekly_minutes
+    FROM room_summary
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+      AND room_num != 'UNKNOWN'
+    ORDER BY meetings DESC, bldg_code, room_num
+    ''',
+    'rooms_in_use': '''
+    SELECT DISTINCT bldg_code, room_num
+    FROM schedule_flat
+    WHERE days & (1 << (instr('MTWRFSU', upper(:day)) - 1))
+      AND start_min <= :minute AND end_min > :minute
+      AND room_num != 'UNKNOWN'
+    ORDER BY bldg_code, room_num
+    ''',
+    'room_occupancy': '''
+    SELECT room_num, day, capacity, meetings, booked_minutes, peak_meetings, peak_seats, seat_utilization
+    FROM room_occupancy
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+      AND bldg_code = :bldg_code
+    ORDER BY room_num, instr('MTWRFSU', day)
+    ''',
+    'busiest_slots': '''
+    SELECT bldg_code, day, slot_start, peak_meetings, peak_rooms, peak_seats, peak_capacity, seat_utilization
+    FROM building_slot_usage
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+    ORDER BY peak_meetings DESC, bldg_code, instr('MTWRFSU', day), slot_start
+    LIMIT 20
+    ''',
+    'free_rooms': '''
+    SELECT room_num, free_start, free_end
+    FROM room_free_slot
+    WHERE term_id IN (SELECT term_id FROM term WHERE term_code = :term_code)
+      AND bldg_code = :bldg_code
+      AND day = upper(:day)
+      AND free_start <= :start_min AND free_end >= :end_min
+    ORDER BY room_num
+    '''
+}
+
+def query_parameters(sql):
+    """
+    Return the names of the named parameters of a query, in order.
+    """
+    return list(dict.fromkeys(re.findall(r':(\w+)', sql)))
+
+class ConnectionPool:
+    """
+    A fixed set of read-only connections to one database file, shared by
+    threads. Connections are opened when first needed, and a connection opened
+    on a file that has since been replaced by a rename is reopened on the new
+    file when it is next handed out.
+
+    When every connection is in use, waiting threads are served in arrival
+    order: a returned connection is handed straight to the longest waiter, so
+    busy threads can't keep taking it back ahead of them.
+    """
+
+    def __init__(self, db_file, size=POOL_SIZE):
+        self.db_file = db_file
+        self.uri = f"file:{quote(os.path.abspath(db_file))}?mode=ro"
+        self.lock = threading.Lock()
+        self.idle = [(None, None)] * size
+        self.waiters = deque()
+
+    def open(self):
+        # Autocommit mode, so read transactions are begun and ended explicitly
+        return sqlite3.connect(self.uri, uri=True, check_same_thread=False, isolation_level=None)
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            waiter = [threading.Event(), None]
+            self.waiters.append(waiter)
+        waiter[0].wait()
+        return waiter[1]
+
+    def release(self, item):
+        with self.lock:
+            if self.waiters:
+                waiter = self.waiters.popleft()
+                waiter[1] = item
+                waiter[0].set()
+            else:
+                self.idle.append(item)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection, waiting for one to be returned if all are in use.
+        Yields the connection and the inode of the file it has open.
+        """
+        conn, inode = self.acquire()
+        try:
+            current = os.stat(self.db_file).st_ino
+            if conn is None or inode != current:
+                if conn is not None:
+                    conn.close()
+                conn, inode = self.open(), current
+            yield conn, inode
+        finally:
+            self.release((conn, inode))
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            if conn is not None:
+                conn.close()
+
+class ResultCache:
+    """
+    LRU cache of query results for the current database generation. Results
+    stored under any other generation are dropped as soon as a query sees a
+    new one.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, generation, key):
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return result
+
+    def put(self, generation, key, result):
+        with self.lock:
+            if generation != self.generation or self.size <= 0:
+                return
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {'generation': self.generation, 'entries': len(self.entries),
+                    'hits': self.hits, 'misses': self.misses}
+
+class QueryService:
+    """
+    Runs the named queries over a connection pool with a shared result cache.
+    Safe to use from many threads. Set cache_size to 0 to turn the cache off.
+    """
+
+    def __init__(self, db_file=etl_process.DB_FILE, pool_size=POOL_SIZE, cache_size=CACHE_SIZE):
+        self.db_file = db_file
+        self.pool_size = pool_size
+        self.pool = ConnectionPool(db_file, pool_size)
+        self.cache = ResultCache(cache_size)
+
+        # Services for the archived terms queried so far, keyed by archive file
+        self.archives = {}
+        self.archives_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query(self, name, **params):
+        """
+        Run a named query with the given parameters. Returns a dict with the
+        database generation, the column names and the rows as tuples. Results
+        may come from the cache and be shared between callers, so they must
+        not be modified. Raises KeyError for an unknown query name.
+        """
+        sql = QUERIES[name]
+        archive = self.archive_service(params.get('term_code'))
+        if archive is not None:
+            return archive.query(name, **params)
+
+        key = (name, tuple(sorted(params.items())))
+        with self.pool.connection() as (conn, inode):
+            # The generation and the rows are read from the same snapshot
+            conn.execute("BEGIN")
+            try:
+                generation = (inode, conn.execute("PRAGMA user_version").fetchone()[0])
+                result = self.cache.get(generation, key)
+                if result is None:
+                    cursor = conn.execute(sql, params)
+                    result = {'generation': generation[1],
+                              'columns': [column[0] for column in cursor.description],
+                              'rows': cursor.fetchall()}
+                    self.cache.put(generation, key, result)
+            finally:
+                conn.execute("COMMIT")
+        return result
+
+    def archive_service(self, term_code):
+        """
+        Return the service for the archive that holds a term, or None if the
+        term is in the main database. Archives are read-only, so each keeps
+        its pool and cache for the life of this service.
+        """
+        path = partitions.partition_file(self.db_file, term_code)
+        if path == self.db_file:
+            return None
+        with self.archives_lock:
+            service = self.archives.get(path)
+            if service is None:
+                service = QueryService(path, self.pool_size, self.cache.size)
+                self.archives[path] = service
+        return service
+
+    def close(self):
+        self.pool.close()
+        with self.archives_lock:
+            for service in self.archives.values():
+                service.close()
+            self.archives.clear()
+
+def run_direct(db_file, name, params):
+    """
+    Run a named query on a connection of its own, the way a script that
+    doesn't pool connections would. Used as the benchmark baseline.
+    """
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_file))}?mode=ro", uri=True)
+    try:
+        return conn.execute(QUERIES[name], params).fetchall()
+    finally:
+        conn.close()
+
+def sample_workload(db_file, count, seed=0):
+    """
+    Return count (query name, parameters) requests with parameters picked at
+    random from the values in the database.
+    """
+    conn = sqlite3.connect(db_file)
+    terms = [row[0] for row in conn.execute("SELECT term_code FROM term")]
+    departments = [row[0] for row in conn.execute("SELECT dept_name FROM department")]
+    instructors = conn.execute("SELECT last_name, first_name FROM instructor").fetchall()
+    rooms = conn.execute("SELECT DISTINCT bldg_code, room_num FROM room_summary").fetchall()
+    conn.close()
+
+    rng = random.Random(seed)
+
+    def free_room_request():
+        start = rng.randrange(480, 1200, 30)
+        return 'free_rooms', {'term_code': rng.choice(terms), 'bldg_code': rng.choice(rooms)[0],
+                              'day': rng.choice('MTWRF'), 'start_min': start, 'end_min': start + 60}
+
+    makers = [
+        lambda: ('schedule_by_term', {'term_code': rng.choice(terms)}),
+        lambda: ('schedule_by_department', {'dept_name': rng.choice(departments)}),
+        lambda: ('schedule_by_instructor', dict(zip(('last_name', 'first_name'), rng.choice(instructors)))),
+        lambda: ('schedule_by_room', dict(zip(('bldg_code', 'room_num'), rng.choice(rooms)))),
+        lambda: ('sections_per_instructor', {'term_code': rng.choice(terms)}),
+        lambda: ('room_usage', {'term_code': rng.choice(terms)}),
+        lambda: ('rooms_in_use', {'day': rng.choice('MTWRF'), 'minute': rng.randrange(480, 1200, 30)}),
+        free_room_request
+    ]
+    # Lookups of one instructor or room are far more common than whole-term reports
+    weights = [1, 4, 20, 20, 1, 1, 4, 4]
+    return [maker() for maker in rng.choices(makers, weights, k=count)]
+
+def run_load(execute, workload, threads):
+    """
+    Run the workload on the given number of threads, each calling
+    execute(name, params). Returns the elapsed seconds and every latency.
+    """
+    latencies = []
+
+    def worker(requests):
+        own = []
+        for name, params in requests:
+            start = time.perf_counter()
+            execute(name, params)
+            own.append(time.perf_counter() - start)
+        latencies.extend(own)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        for future in [executor.submit(worker, workload[i::threads]) for i in range(threads)]:
+            future.result()
+    return time.perf_counter() - start, sorted(latencies)
+
+def benchmark(db_file, threads, requests, seed=0):
+    """
+    Print the throughput and latency of the same workload run with a new
+    connection per query, over the connection pool, and over the pool with
+    the result cache.
+    """
+    workload = sample_workload(db_file, requests, seed)
+    print(f"{requests} requests on {threads} threads against {db_file}")
+
+    modes = [('connection per query', None, 0), ('pool', threads, 0), ('pool + cache', threads, CACHE_SIZE)]
+    for label, pool_size, cache_size in modes:
+        if pool_size is None:
+            execute = lambda name, params: run_direct(db_file, name, params)
+            service = None
+        else:
+            service = QueryService(db_file, pool_size, cache_size)
+            execute = lambda name, params, service=service: service.query(name, **params)
+
+        elapsed, latencies = run_load(execute, workload, threads)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+        line = f"{label}: {requests / elapsed:.0f} queries/s, p50 {p50:.2f} ms, p99 {p99:.2f} ms"
+        if service is not None:
+            if cache_size:
+                stats = service.cache.stats()
+                line += f", {stats['hits'] / max(stats['hits'] + stats['misses'], 1):.0%} cache hits"
+            service.close()
+        print(line)
+
+def make_handler(service):
+    """
+    Return an HTTP request handler that serves the named queries as JSON:
+    GET /queries lists them with their parameters, GET /query/<name>?param=value
+    runs one, and GET /stats shows the cache statistics.
+    """
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if parts == ['queries']:
+                self.send_json(200, {name: query_parameters(sql) for name, sql in QUERIES.items()})
+            elif parts == ['stats']:
+                self.send_json(200, service.cache.stats())
+            elif len(parts) == 2 and parts[0] == 'query':
+                if parts[1] not in QUERIES:
+                    self.send_json(404, {'error': f"unknown query: {parts[1]}"})
+                    return
+                # Bad or missing parameters are the client's error, anything
+                # else the database raises (a missing table, a locked file) ours
+                try:
+                    result = service.query(parts[1], **dict(parse_qsl(url.query)))
+                except (sqlite3.ProgrammingError, ValueError) as e:
+                    self.send_json(400, {'error': str(e)})
+                    return
+                except sqlite3.Error as e:
+                    self.send_json(500, {'error': str(e)})
+                    return
+                self.send_json(200, result)
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the class schedule database.")
+    parser.add_argument('--database', default=etl_process.DB_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help="run one named query and print its rows")
+    query.add_argument('name', choices=sorted(QUERIES))
+    query.add_argument('params', nargs='*', metavar='param=value')
+
+    serve = commands.add_parser('serve', help="serve the named queries over HTTP as JSON")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--pool-size', type=int, default=POOL_SIZE)
+
+    bench = commands.add_parser('bench', help="measure throughput under concurrent load")
+    bench.add_argument('--threads', type=int, default=8)
+    bench.add_argument('--requests', type=int, default=5000)
+    bench.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        params = dict(param.split('=', 1) for param in args.params)
+        with QueryService(args.database, pool_size=1) as service:
+            result = service.query(args.name, **params)
+        print('|'.join(result['columns']))
+        for row in result['rows']:
+            print('|'.join('' if value is None else str(value) for value in row))
+    elif args.command == 'serve':
+        with QueryService(args.database, args.pool_size) as service:
+            server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+            print(f"Serving {args.database} on http://{args.host}:{args.port}/queries")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            server.server_close()
+    else:
+        benchmark(args.database, args.threads, args.requests, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Input Readers for the Class Scheduling ETL
+
+Reads registrar exports in any of the formats upstream can produce: Excel
+workbooks (every sheet), CSV and Parquet. The format is detected from the
+file's first bytes rather than its name. Every reader yields plain DataFrames
+of at most chunk_size rows (or one per sheet or file without a chunk size)
+with the same column names, so etl_process.normalize_extract() and the
+process_* stages don't need to know where the rows came from.
+
+Workbooks and CSV files may start with title rows, as the registrar's "Basic
+Class Schedule" export does; the header is the first row that names the key
+columns in HEADER_COLUMNS. Header names are matched without regard to case,
+spacing or underscores, and the names other exports use for the same column
+are renamed through COLUMN_ALIASES.
+
+CSV and Parquet are read with pyarrow when it is installed, which is many times
+faster than parsing a workbook; without it pandas reads them instead.
+
+Other formats can be added with the reader() decorator:
+
+    @readers.reader('json', '.json')
+    def iter_json(path, chunk_size=None):
+        ...
+"""
+
+import csv
+
+import extract_cache
+
+# Readers by format name, and the file extensions of each format
+READERS = {}
+EXTENSIONS = {}
+
+# Rows searched for the header at the top of a sheet or CSV file
+HEADER_SEARCH_ROWS = 10
+
+# Columns a row must name to be taken as the header
+HEADER_COLUMNS = {'Subject', 'Catalog', 'Class Nbr'}
+
+# Header names used by other exports, keyed as column_key() formats them, and
+# the registrar workbook's name for the same column
+COLUMN_ALIASES = {
+    'college': 'College',
+    'acad org': 'Acad Org',
+    'academic org': 'Acad Org',
+    'academic organization': 'Acad Org',
+    'subject': 'Subject',
+    'subject code': 'Subject',
+    'catalog': 'Catalog',
+    'catalog nbr': 'Catalog',
+    'catalog number': 'Catalog',
+    'title': 'Title',
+    'course title': 'Title',
+    'section': 'Section',
+    'section nbr': 'Section',
+    'class section': 'Section',
+    'class nbr': 'Class Nbr',
+    'class number': 'Class Nbr',
+    'class days': 'Class Days',
+    'meeting days': 'Class Days',
+    'class start time': 'Class Start Time',
+    'meeting start time': 'Class Start Time',
+    'class end time': 'Class End Time',
+    'meeting end time': 'Class End Time',
+    'start date': 'Start Date',
+    'class start date': 'Start Date',
+    'end date': 'End Date',
+    'class end date': 'End Date',
+    'room': 'Room',
+    'facility': 'Room',
+    'facility id': 'Room',
+    'instructor last name': 'Instructor Last Name',
+    'instructor first name': 'Instructor First Name',
+    'enrollment capacity': 'Enrollment Capacity',
+    'enrollment cap': 'Enrollment Capacity',
+    'enrl cap': 'Enrollment Capacity',
+    'room capacity': 'Room Capacity',
+    'room cap': 'Room Capacity',
+    'facility capacity': 'Room Capacity'
+}
+
+def column_key(name):
+    """
+    Return a header name lower-cased, with underscores as spaces and runs of
+    whitespace collapsed, for matching against COLUMN_ALIASES.
+    """
+    return ' '.join(str(name).replace('_', ' ').lower().split())
+
+def canonical_column(name):
+    """
+    Return the registrar workbook's name for a column, or the name stripped of
+    surrounding whitespace if it isn't one the ETL reads.
+    """
+    return COLUMN_ALIASES.get(column_key(name), str(name).strip())
+
+def is_header(row):
+    """
+    Return True if a row of cell values names every column in HEADER_COLUMNS.
+    """
+    names = {canonical_column(value) for value in row if value is not None}
+    return HEADER_COLUMNS <= names
+
+def reader(name, *extensions):
+    """
+    Register the decorated function as the reader for a format. A reader is
+    called with a path and a chunk size (None to read all of it) and yields
+    DataFrames.
+    """
+    def register(func):
+        READERS[name] = func
+        for extension in extensions:
+            EXTENSIONS[extension] = name
+        return func
+    return register
+
+def detect_format(path):
+    """
+    Return the format of a file from its first bytes: Parquet files start with
+    PAR1 and .xlsx workbooks are zip archives. Anything else is read as CSV.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == b'PAR1':
+        return 'parquet'
+    if magic.startswith(b'PK'):
+        return 'xlsx'
+    return 'csv'
+
+def iter_frames(path, chunk_size=None):
+    """
+    Yield the rows of an export in DataFrames of at most chunk_size rows, or
+    one DataFrame per sheet or file if chunk_size is None.
+    """
+    yield from READERS[detect_format(path)](path, chunk_size)
+
+@reader('xlsx', '.xlsx', '.xlsm')
+def iter_excel(path, chunk_size=None):
+    """
+    Stream every sheet of a workbook with openpyxl's read-only mode, so only the
+    current chunk is held in memory. Sheets without a header row are skipped.
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+
+            header = None
+            for _, row in zip(range(HEADER_SEARCH_ROWS), rows):
+                if is_header(row):
+                    header = row
+                    break
+            if header is None:
+                print(f"Warning: no header row in sheet '{sheet.title}' of {path}, skipping it")
+                continue
+
+            batch = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                batch.append(row)
+                if chunk_size and len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def find_csv_header(path):
+    """
+    Return the number of lines before the header of a CSV file and the header.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for index, row in zip(range(HEADER_SEARCH_ROWS), csv.reader(f)):
+            if is_header(row):
+                return index, row
+    raise ValueError(f"{path}: no header row in the first {HEADER_SEARCH_ROWS} lines")
+
+@reader('csv', '.csv')
+def iter_csv(path, chunk_size=None):
+    """
+    Read a CSV file with pyarrow's multithreaded parser, or pandas without
+    pyarrow. Every column is read as text, so a value in a later block can't
+    contradict the type inferred from an earlier one; normalize_extract() gives
+    the key columns their types. Only empty fields are missing values.
+    """
+    import pandas as pd
+
+    skip, header = find_csv_header(path)
+
+    if not extract_cache.available():
+        options = dict(skiprows=skip, dtype=str, keep_default_na=False, na_values=[''], encoding='utf-8-sig')
+        if chunk_size is None:
+            yield pd.read_csv(path, **options)
+        else:
+            yield from pd.read_csv(path, chunksize=chunk_size, **options)
+        return
+
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    read_options = pa_csv.ReadOptions(skip_rows=skip)
+    convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                            strings_can_be_null=True, null_values=[''])
+    if chunk_size is None:
+        yield pa_csv.read_csv(path, read_options=read_options, convert_options=convert_options).to_pandas()
+        return
+
+    # The streaming reader's batches follow its block size, so regroup them
+    # into chunks of chunk_size rows
+    pending = []
+    rows = 0
+    for batch in pa_csv.open_csv(path, read_options=read_options, convert_options=convert_options):
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows < chunk_size:
+            continue
+        table = pa.Table.from_batches(pending)
+        for start in range(0, rows - chunk_size + 1, chunk_size):
+            yield table.slice(start, chunk_size).to_pandas()
+        remainder = rows % chunk_size
+        pending = table.slice(rows - remainder).to_batches() if remainder else []
+        rows = remainder
+    if rows:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+@reader('parquet', '.parquet', '.pq')
+def iter_parquet(path, chunk_size=None):
+    """
+    Read a Parquet file, batch by batch when a chunk size is given.
+    """
+    import pandas as pd
+
+    if not extract_cache.available():
+        df = pd.read_parquet(path)
+        if chunk_size is None:
+            yield df
+        else:
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
+        return
+    if chunk_size is None:
+        yield pd.read_parquet(path)
+        return
+
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
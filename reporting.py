@@ -0,0 +1,206 @@
+"""
+Materialized Reporting Tables for the Class Scheduling Database
+
+Almost every report joins schedule, section, course, department, instructor,
+term and building. schedule_flat stores the result of that join, one row per
+schedule, and the summary tables store the usual aggregates per term: sections
+and seats per course and per instructor, sections and meetings per building,
+and meetings and weekly minutes per room. Reports then read a single indexed
+table instead of repeating the seven-table join.
+
+The tables are refreshed at the end of every load, and only where the source
+changed: each flat row keeps the row_hash of its schedule and section, so rows
+whose schedule was deleted or whose section was updated are dropped, schedules
+that have no flat row yet are added, and the summaries are recomputed only for
+the terms those rows belong to. Departments, courses, terms, instructors and
+buildings are never changed by a load, only added, so they can't make a flat
+row stale.
+"""
+
+# Columns of schedule_flat, in table order
+FLAT_COLUMNS = ['schedule_id', 'section_id', 'term_id', 'term_code', 'term_name',
+                'dept_id', 'dept_code', 'dept_name', 'course_id', 'course_num', 'course_name',
+                'section_num', 'max_seats', 'instr_id', 'last_name', 'first_name',
+                'bldg_id', 'bldg_code', 'bldg_name', 'room_num', 'day_pattern',
+                'days', 'start_min', 'end_min', 'schedule_hash', 'section_hash']
+
+# The seven-table join that schedule_flat materializes
+FLAT_SELECT = '''
+SELECT sch.schedule_id, s.section_id, t.term_id, t.term_code, t.term_name,
+       d.dept_id, d.dept_code, d.dept_name, c.course_id, c.course_num, c.course_name,
+       s.section_num, s.max_seats, i.instr_id, i.last_name, i.first_name,
+       b.bldg_id, b.bldg_code, b.bldg_name, sch.room_num, sch.day_pattern,
+       sch.days, sch.start_min, sch.end_min, sch.row_hash, s.row_hash
+FROM schedule sch
+JOIN section s ON sch.section_id = s.section_id
+JOIN course c ON s.course_id = c.course_id
+JOIN department d ON c.dept_id = d.dept_id
+JOIN instructor i ON s.instr_id = i.instr_id
+JOIN term t ON s.term_id = t.term_id
+JOIN building b ON sch.bldg_id = b.bldg_id
+'''
+
+# Meeting days in a days bitmask, for weekly minutes
+MEETING_DAYS = ' + '.join(f"((days >> {bit}) & 1)" for bit in range(7))
+
+# Summary tables, recomputed from schedule_flat for the terms in refresh_term.
+# Sections are counted once each, however many meeting patterns they have.
+SUMMARY_QUERIES = {
+    'course_summary': '''
+    SELECT term_id, course_id, dept_name, course_num, course_name,
+           COUNT(*) AS sections, SUM(max_seats) AS seats
+    FROM (SELECT DISTINCT term_id, section_id, course_id, dept_name, course_num, course_name, max_seats
+          FROM schedule_flat WHERE term_id IN (SELECT term_id FROM refresh_term))
+    GROUP BY term_id, course_id
+    ''',
+    'instructor_summary': '''
+    SELECT term_id, instr_id, last_name, first_name,
+           COUNT(*) AS sections, SUM(max_seats) AS seats
+    FROM (SELECT DISTINCT term_id, section_id, instr_id, last_name, first_name, max_seats
+          FROM schedule_flat WHERE term_id IN (SELECT term_id FROM refresh_term))
+    GROUP BY term_id, instr_id
+    ''',
+    'building_summary': '''
+    SELECT term_id, bldg_id, bldg_code, bldg_name,
+           COUNT(DISTINCT section_id) AS sections, COUNT(*) AS meetings
+    FROM schedule_flat
+    WHERE term_id IN (SELECT term_id FROM refresh_term)
+    GROUP BY term_id, bldg_id
+    ''',
+    'room_summary': f'''
+    SELECT term_id, bldg_id, room_num, bldg_code, bldg_name, COUNT(*) AS meetings,
+           SUM(COALESCE(end_min - start_min, 0) * ({MEETING_DAYS})) AS weekly_minutes
+    FROM schedule_flat
+    WHERE term_id IN (SELECT term_id FROM refresh_term)
+    GROUP BY term_id, bldg_id, room_num
+    '''
+}
+
+def create_tables(cursor):
+    """
+    Create schedule_flat and the summary tables.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS schedule_flat (
+        schedule_id INTEGER PRIMARY KEY,
+        section_id INTEGER NOT NULL,
+        term_id INTEGER NOT NULL,
+        term_code TEXT NOT NULL,
+        term_name TEXT NOT NULL,
+        dept_id INTEGER NOT NULL,
+        dept_code TEXT NOT NULL,
+        dept_name TEXT NOT NULL,
+        course_id INTEGER NOT NULL,
+        course_num TEXT NOT NULL,
+        course_name TEXT NOT NULL,
+        section_num TEXT NOT NULL,
+        max_seats INTEGER NOT NULL,
+        instr_id INTEGER NOT NULL,
+        last_name TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        bldg_code TEXT NOT NULL,
+        bldg_name TEXT NOT NULL,
+        room_num TEXT NOT NULL,
+        day_pattern TEXT NOT NULL,
+        days INTEGER NOT NULL,
+        start_min INTEGER,
+        end_min INTEGER,
+        schedule_hash INTEGER NOT NULL,
+        section_hash INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS course_summary (
+        term_id INTEGER NOT NULL,
+        course_id INTEGER NOT NULL,
+        dept_name TEXT NOT NULL,
+        course_num TEXT NOT NULL,
+        course_name TEXT NOT NULL,
+        sections INTEGER NOT NULL,
+        seats INTEGER NOT NULL,
+        PRIMARY KEY (term_id, course_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS instructor_summary (
+        term_id INTEGER NOT NULL,
+        instr_id INTEGER NOT NULL,
+        last_name TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        sections INTEGER NOT NULL,
+        seats INTEGER NOT NULL,
+        PRIMARY KEY (term_id, instr_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS building_summary (
+        term_id INTEGER NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        bldg_code TEXT NOT NULL,
+        bldg_name TEXT NOT NULL,
+        sections INTEGER NOT NULL,
+        meetings INTEGER NOT NULL,
+        PRIMARY KEY (term_id, bldg_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS room_summary (
+        term_id INTEGER NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        room_num TEXT NOT NULL,
+        bldg_code TEXT NOT NULL,
+        bldg_name TEXT NOT NULL,
+        meetings INTEGER NOT NULL,
+        weekly_minutes INTEGER NOT NULL,
+        PRIMARY KEY (term_id, bldg_id, room_num)
+    )
+    ''')
+
+def refresh_reporting_tables(conn):
+    """
+    Bring schedule_flat and the summary tables up to date with the loaded
+    schedules, rewriting only the rows and terms that changed. Nothing is
+    committed; the caller owns the transaction. Returns the number of flat rows removed and added, and of terms refreshed.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_term (term_id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM refresh_term")
+
+    # Flat rows whose schedule is gone or whose schedule or section row changed
+    cursor.execute('''
+    CREATE TEMP TABLE stale_flat AS
+    SELECT f.schedule_id, f.term_id
+    FROM schedule_flat f
+    LEFT JOIN schedule sch ON sch.schedule_id = f.schedule_id
+    LEFT JOIN section s ON s.section_id = sch.section_id
+    WHERE sch.row_hash IS NOT f.schedule_hash OR s.row_hash IS NOT f.section_hash
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO refresh_term SELECT term_id FROM stale_flat")
+    cursor.execute("DELETE FROM schedule_flat WHERE schedule_id IN (SELECT schedule_id FROM stale_flat)")
+    removed = cursor.rowcount
+    cursor.execute("DROP TABLE stale_flat")
+
+    # Schedules without a flat row: new ones, and the ones just removed as stale
+    cursor.execute('''
+    CREATE TEMP TABLE new_flat AS
+    SELECT sch.schedule_id, s.term_id
+    FROM schedule sch
+    JOIN section s ON sch.section_id = s.section_id
+    WHERE NOT EXISTS (SELECT 1 FROM schedule_flat f WHERE f.schedule_id = sch.schedule_id)
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO refresh_term SELECT term_id FROM new_flat")
+    cursor.execute(f'''
+    INSERT INTO schedule_flat ({', '.join(FLAT_COLUMNS)})
+    {FLAT_SELECT}
+    WHERE sch.schedule_id IN (SELECT schedule_id FROM new_flat)
+    ''')
+    added = cursor.rowcount
+    cursor.execute("DROP TABLE new_flat")
+
+    # Recompute the summaries of the terms that changed
+    for table, sql in SUMMARY_QUERIES.items():
+        cursor.execute(f"DELETE FROM {table} WHERE term_id IN (SELECT term_id FROM refresh_term)")
+        cursor.execute(f"INSERT INTO {table} {sql}")
+    terms = cursor.execute("SELECT COUNT(*) FROM refresh_term").fetchone()[0]
+    return removed, added, terms
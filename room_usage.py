@@ -0,0 +1,337 @@
+"""
+Room Utilization for the Class Scheduling Database
+
+validation.sql can count the meetings held in each room, but not how many
+hours a room is booked, how many sections run at the same time or when a room
+is free. This module lays each term's meetings on a time grid: one row per
+room and weekday, one column per SLOT_MINUTES-minute slot of the day, holding
+the number of meetings in session. Every meeting adds 1 at its first slot and
+-1 after its last (two np.bincount calls over all meetings), and a cumulative
+sum along each row turns that into the counts, so the grid is built without a
+Python loop per meeting, room or slot.
+
+Seats are the enrollment capacities (max_seats) of the sections in session,
+and a room's capacity is its Room Capacity in the room table. Seat
+utilization compares the two: the seats in session over the capacity of the
+rooms they meet in, summed over the booked time, so 0.5 means rooms are half
+full on average while in use. It is missing where no capacity is known.
+
+Three tables are computed from the grid:
+
+- room_occupancy: minutes booked, meetings, the most meetings and seats in
+  session at once, and seat utilization against the room's capacity, per room
+  and weekday of each term,
+- building_slot_usage: the most meetings, rooms in use, seats in session and
+  capacity of the rooms in use, and seat utilization, per building, weekday
+  and REPORT_SLOT_MINUTES-minute time slot,
+- room_free_slot: the free periods between OPEN_MINUTE and CLOSE_MINUTE of
+  every room used in the term, per weekday, for room finders.
+
+Rooms that aren't known and meetings without a time range within the day are
+left out. The tables are refreshed per term from schedule_flat, for the terms
+whose schedules changed in the load (see reporting.refresh_reporting_tables()).
+
+Usage:
+    python room_usage.py                  # recompute every term
+    sqlite3 class_schedule.db "SELECT * FROM room_free_slot WHERE bldg_code = 'WPEB' AND day = 'T'"
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from conflicts import DAY_LETTERS
+
+# Resolution of the time grid; registrar meeting times fall on five-minute marks
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# Rooms laid on the time grid at once, which bounds the grid's memory
+GRID_ROOMS = 2048
+
+# Length of the time slots reported in building_slot_usage
+REPORT_SLOT_MINUTES = 30
+
+# Hours in which free periods are listed in room_free_slot, in minutes after midnight
+OPEN_MINUTE = 7 * 60
+CLOSE_MINUTE = 22 * 60
+
+# Columns of each table, in table order
+TABLE_COLUMNS = {
+    'room_occupancy': ['term_id', 'bldg_id', 'room_num', 'day', 'bldg_code', 'capacity',
+                       'meetings', 'booked_minutes', 'peak_meetings', 'peak_seats', 'seat_utilization'],
+    'building_slot_usage': ['term_id', 'bldg_id', 'day', 'slot_start', 'bldg_code',
+                            'peak_meetings', 'peak_rooms', 'peak_seats', 'peak_capacity',
+                            'seat_utilization'],
+    'room_free_slot': ['term_id', 'bldg_id', 'room_num', 'day', 'free_start', 'free_end', 'bldg_code']
+}
+
+def create_tables(cursor):
+    """
+    Create room_occupancy, building_slot_usage and room_free_slot.
+    Times are minutes after midnight and day is a letter of DAY_LETTERS.
+    capacity is the room's Room Capacity, and seat_utilization the seats in
+    session over the capacity of their rooms (NULL where it isn't known).
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS room_occupancy (
+        term_id INTEGER NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        room_num TEXT NOT NULL,
+        day TEXT NOT NULL,
+        bldg_code TEXT NOT NULL,
+        capacity INTEGER,
+        meetings INTEGER NOT NULL,
+        booked_minutes INTEGER NOT NULL,
+        peak_meetings INTEGER NOT NULL,
+        peak_seats INTEGER NOT NULL,
+        seat_utilization REAL,
+        PRIMARY KEY (term_id, bldg_id, room_num, day)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS building_slot_usage (
+        term_id INTEGER NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        slot_start INTEGER NOT NULL,
+        bldg_code TEXT NOT NULL,
+        peak_meetings INTEGER NOT NULL,
+        peak_rooms INTEGER NOT NULL,
+        peak_seats INTEGER NOT NULL,
+        peak_capacity INTEGER NOT NULL,
+        seat_utilization REAL,
+        PRIMARY KEY (term_id, bldg_id, day, slot_start)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS room_free_slot (
+        term_id INTEGER NOT NULL,
+        bldg_id INTEGER NOT NULL,
+        room_num TEXT NOT NULL,
+        day TEXT NOT NULL,
+        free_start INTEGER NOT NULL,
+        free_end INTEGER NOT NULL,
+        bldg_code TEXT NOT NULL,
+        PRIMARY KEY (term_id, bldg_id, room_num, day, free_start)
+    )
+    ''')
+
+def read_term_meetings(conn, term_id):
+    """
+    Read the schedules of one term that have a known room and a time range
+    within the day, with the capacity of their room.
+    """
+    return pd.read_sql_query('''
+    SELECT f.bldg_id, f.bldg_code, f.room_num, r.capacity, f.days, f.start_min, f.end_min, f.max_seats
+    FROM schedule_flat f
+    LEFT JOIN room r ON r.bldg_id = f.bldg_id AND r.room_num = f.room_num
+    WHERE f.term_id = ? AND f.room_num != 'UNKNOWN' AND f.end_min > f.start_min
+      AND f.start_min < 24 * 60 AND f.end_min <= 24 * 60
+    ''', conn, params=(term_id,))
+
+def time_grid(cell, first, last, cells, weights=None):
+    """
+    Return a (cells, SLOTS_PER_DAY) grid of the meetings in session (or the sum
+    of their weights) in every slot, given each meeting's grid row and its
+    first and one-past-last slot.
+    """
+    width = SLOTS_PER_DAY + 1
+    size = cells * width
+    delta = (np.bincount(cell * width + first, weights, minlength=size) -
+             np.bincount(cell * width + last, weights, minlength=size))
+    return delta.reshape(cells, width)[:, :SLOTS_PER_DAY].cumsum(axis=1).astype('int32')
+
+def free_periods(in_use):
+    """
+    Return the grid row, first slot and one-past-last slot of every run of free
+    slots between OPEN_MINUTE and CLOSE_MINUTE in a grid of booked slots.
+    """
+    window = ~in_use[:, OPEN_MINUTE // SLOT_MINUTES:CLOSE_MINUTE // SLOT_MINUTES]
+    padded = np.zeros((window.shape[0], window.shape[1] + 2), dtype='int8')
+    padded[:, 1:-1] = window
+    edges = np.diff(padded, axis=1)
+
+    # np.nonzero walks the grid row by row, so the nth start pairs with the nth end
+    row, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)
+    offset = OPEN_MINUTE // SLOT_MINUTES
+    return row, start + offset, end + offset
+
+def ratio(numerator, denominator):
+    """
+    Return numerator / denominator as floats, with None where the denominator
+    is zero or missing, for a nullable REAL column.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numerator / denominator
+    return pd.Series(values).astype(object).where(np.isfinite(values), None)
+
+def room_batches(building_start, count):
+    """
+    Yield (first, end) ranges of consecutive rooms that cover whole buildings
+    and hold at most GRID_ROOMS rooms, unless one building has more.
+    """
+    first = previous = 0
+    for end in list(building_start[1:]) + [count]:
+        if end - first > GRID_ROOMS and previous > first:
+            yield first, previous
+            first = previous
+        previous = end
+    yield first, count
+
+def analyze_rooms(term_id, meetings, room, rooms):
+    """
+    Lay the meetings of some rooms on the time grid and return the rows of each
+    table in TABLE_COLUMNS as DataFrames. room is each meeting's row in rooms,
+    which are sorted by building.
+    """
+    # One grid entry per meeting day, in the row of its room and weekday
+    days = len(DAY_LETTERS)
+    on_day = (meetings['days'].to_numpy(dtype='int64')[:, None] >> np.arange(days)) & 1
+    meeting, day = np.nonzero(on_day)
+    cell = room[meeting] * days + day
+
+    # Slots are clipped to the day, so a time past midnight can't spill into
+    # the next row of the grid
+    first = np.clip(meetings['start_min'].to_numpy(dtype='int64')[meeting] // SLOT_MINUTES, 0, SLOTS_PER_DAY)
+    last = np.clip(-(-meetings['end_min'].to_numpy(dtype='int64')[meeting] // SLOT_MINUTES), 0, SLOTS_PER_DAY)
+
+    cells = len(rooms) * days
+    in_session = time_grid(cell, first, last, cells)
+    seats = time_grid(cell, first, last, cells,
+                      meetings['max_seats'].to_numpy(dtype='float64')[meeting])
+    in_use = in_session > 0
+    letters = np.array(list(DAY_LETTERS))
+    bldg_id = rooms['bldg_id'].to_numpy()
+    bldg_code = rooms['bldg_code'].to_numpy()
+    room_num = rooms['room_num'].to_numpy()
+
+    # Capacity of every grid row, and the seats and capacity in use in every
+    # slot, counting only rooms with a known capacity
+    capacity = np.repeat(rooms['capacity'].to_numpy(dtype='float64', na_value=np.nan), days)
+    known = ~np.isnan(capacity)
+    capacity_in_use = in_use * np.where(known, capacity, 0).astype('int32')[:, None]
+    known_seats = seats * known[:, None]
+
+    # Occupancy of every room and weekday with a meeting
+    count = np.bincount(cell, minlength=cells)
+    booked = np.flatnonzero(count)
+    occupancy = pd.DataFrame({
+        'term_id': term_id,
+        'bldg_id': bldg_id[booked // days],
+        'room_num': room_num[booked // days],
+        'day': letters[booked % days],
+        'bldg_code': bldg_code[booked // days],
+        'capacity': pd.array(capacity[booked], dtype='Int64'),
+        'meetings': count[booked],
+        'booked_minutes': in_use[booked].sum(axis=1) * SLOT_MINUTES,
+        'peak_meetings': in_session[booked].max(axis=1),
+        'peak_seats': seats[booked].max(axis=1),
+        'seat_utilization': ratio(seats[booked].sum(axis=1), capacity[booked] * in_use[booked].sum(axis=1))
+    }, columns=TABLE_COLUMNS['room_occupancy'])
+
+    # Sum the rooms of each building, then take the peak of each report slot
+    building_start = np.flatnonzero(np.r_[True, bldg_id[1:] != bldg_id[:-1]])
+    per_report = REPORT_SLOT_MINUTES // SLOT_MINUTES
+
+    def building_slots(grid):
+        totals = np.add.reduceat(grid.reshape(len(rooms), days, SLOTS_PER_DAY), building_start, axis=0)
+        return totals.reshape(len(building_start), days, -1, per_report)
+
+    def building_peaks(grid):
+        return building_slots(grid).max(axis=3)
+
+    peak_meetings = building_peaks(in_session)
+    slot_seats = building_slots(known_seats).sum(axis=3)
+    slot_capacity = building_slots(capacity_in_use).sum(axis=3)
+    building, slot_day, slot = np.nonzero(peak_meetings)
+    slots = pd.DataFrame({
+        'term_id': term_id,
+        'bldg_id': bldg_id[building_start][building],
+        'day': letters[slot_day],
+        'slot_start': slot * REPORT_SLOT_MINUTES,
+        'bldg_code': bldg_code[building_start][building],
+        'peak_meetings': peak_meetings[building, slot_day, slot],
+        'peak_rooms': building_peaks(in_use.astype('int32'))[building, slot_day, slot],
+        'peak_seats': building_peaks(seats)[building, slot_day, slot],
+        'peak_capacity': building_peaks(capacity_in_use)[building, slot_day, slot],
+        'seat_utilization': ratio(slot_seats[building, slot_day, slot], slot_capacity[building, slot_day, slot])
+    }, columns=TABLE_COLUMNS['building_slot_usage'])
+
+    # Free periods of every room, on every weekday
+    free_cell, free_start, free_end = free_periods(in_use)
+    free = pd.DataFrame({
+        'term_id': term_id,
+        'bldg_id': bldg_id[free_cell // days],
+        'room_num': room_num[free_cell // days],
+        'day': letters[free_cell % days],
+        'free_start': free_start * SLOT_MINUTES,
+        'free_end': free_end * SLOT_MINUTES,
+        'bldg_code': bldg_code[free_cell // days]
+    }, columns=TABLE_COLUMNS['room_free_slot'])
+
+    return {'room_occupancy': occupancy, 'building_slot_usage': slots, 'room_free_slot': free}
+
+def analyze_term(term_id, meetings):
+    """
+    Lay one term's meetings (see read_term_meetings()) on the time grid, at
+    most GRID_ROOMS rooms at a time, and return the rows of each table in
+    TABLE_COLUMNS as DataFrames.
+    """
+    if meetings.empty:
+        return {table: pd.DataFrame(columns=columns) for table, columns in TABLE_COLUMNS.items()}
+
+    # Rooms sorted by building, so the rooms of a building are consecutive grid
+    # rows, and meetings sorted by room, so each batch of rooms is one slice
+    rooms = (meetings[['bldg_id', 'room_num', 'bldg_code', 'capacity']].drop_duplicates(['bldg_id', 'room_num'])
+             .sort_values(['bldg_id', 'room_num']).reset_index(drop=True))
+    room = pd.MultiIndex.from_frame(rooms[['bldg_id', 'room_num']]).get_indexer(
+        pd.MultiIndex.from_frame(meetings[['bldg_id', 'room_num']]))
+    order = np.argsort(room, kind='stable')
+    meetings, room = meetings.iloc[order], room[order]
+
+    bldg_id = rooms['bldg_id'].to_numpy()
+    building_start = np.flatnonzero(np.r_[True, bldg_id[1:] != bldg_id[:-1]])
+    batches = []
+    for first, end in room_batches(building_start, len(rooms)):
+        lo, hi = np.searchsorted(room, [first, end])
+        batches.append(analyze_rooms(term_id, meetings.iloc[lo:hi], room[lo:hi] - first,
+                                     rooms.iloc[first:end].reset_index(drop=True)))
+    return {table: pd.concat([batch[table] for batch in batches], ignore_index=True)
+            for table in TABLE_COLUMNS}
+
+def refresh_room_usage(conn, term_ids=None):
+    """
+    Recompute the room utilization tables for the given terms (every term by
+    default) from schedule_flat, in the caller's transaction. Returns the
+    number of rows written per table.
+    """
+    if term_ids is None:
+        term_ids = [row[0] for row in conn.execute("SELECT term_id FROM term")]
+
+    written = dict.fromkeys(TABLE_COLUMNS, 0)
+    for term_id in term_ids:
+        tables = analyze_term(term_id, read_term_meetings(conn, term_id))
+        for table, rows in tables.items():
+            columns = TABLE_COLUMNS[table]
+            conn.execute(f"DELETE FROM {table} WHERE term_id = ?", (term_id,))
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows[columns].astype(object).where(rows[columns].notna(), None).itertuples(index=False, name=None))
+            written[table] += len(rows)
+    return written
+
+def main():
+    import etl_process
+
+    conn = sqlite3.connect(etl_process.DB_FILE)
+    create_tables(conn.cursor())
+    for table, count in refresh_room_usage(conn).items():
+        print(f"{table}: {count} rows")
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    main()
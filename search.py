@@ -0,0 +1,144 @@
+"""
+Full-Text Catalog Search for the Class Scheduling Database
+
+Finds sections by partial course title, course number ("CS457", or "CS 457")
+or instructor name, using an SQLite FTS5 index instead of LIKE '%...%' scans.
+The index, schedule_search, has one document per schedule_flat row (see
+reporting.py), so a match leads straight to the section and its meeting time.
+
+Triggers on schedule_flat keep the index in step with it: the reporting
+refresh only ever inserts and deletes flat rows, so a load updates the
+documents of exactly the rows it changed. Every search word is matched as a
+prefix ("data" finds "Database Systems"), and results are ranked with BM25,
+weighting course numbers above titles and titles above instructor names.
+Queries that match a large part of the catalog skip the ranking, which would
+otherwise cost more than the search itself.
+
+Usage:
+    python search.py "data keith"
+    python search.py CS457 --term 202501
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+# Course numbers are indexed whole and split into subject and number, so both
+# "CS457" and "CS 457" (or just "457") find CS457
+COURSE_TEXT = ("{row}.course_num || ' ' || rtrim({row}.course_num, '0123456789') || ' ' || "
+               "substr({row}.course_num, length(rtrim({row}.course_num, '0123456789')) + 1)")
+
+INSTRUCTOR_TEXT = "{row}.first_name || ' ' || {row}.last_name"
+
+# BM25 weights of the course number, course title and instructor columns
+RANK = 'bm25(10.0, 5.0, 2.0)'
+
+# Ranking costs about a microsecond per matching document, so queries that
+# match more documents than this (a one- or two-letter prefix, say) are too
+# broad to rank usefully and return their first matches in index order instead
+MAX_RANKED_MATCHES = 5000
+
+SEARCH_SQL = '''
+SELECT f.term_code, f.course_num, f.course_name, f.section_num, f.last_name, f.first_name,
+       f.bldg_code, f.room_num, f.day_pattern, f.days, f.start_min, f.end_min
+FROM schedule_search
+JOIN schedule_flat f ON f.schedule_id = schedule_search.rowid
+WHERE schedule_search MATCH :match
+  AND (:term_code IS NULL OR f.term_id IN (SELECT term_id FROM term WHERE term_code = :term_code))
+ORDER BY {order}
+LIMIT :limit
+'''
+
+def create_index(cursor):
+    """
+    Create the search index and the triggers that maintain it. An index added
+    to a database that already has reporting rows is filled from them.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'schedule_search'").fetchone()
+
+    # Prefix indexes on 2 and 3 characters keep short prefix queries fast
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS schedule_search
+    USING fts5(course_num, course_name, instructor, prefix = '2 3')
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS schedule_flat_search_insert AFTER INSERT ON schedule_flat
+    BEGIN
+        INSERT INTO schedule_search (rowid, course_num, course_name, instructor)
+        VALUES (new.schedule_id, {COURSE_TEXT.format(row='new')}, new.course_name,
+                {INSTRUCTOR_TEXT.format(row='new')});
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS schedule_flat_search_delete AFTER DELETE ON schedule_flat
+    BEGIN
+        DELETE FROM schedule_search WHERE rowid = old.schedule_id;
+    END
+    ''')
+
+    if not exists:
+        cursor.execute(f"INSERT INTO schedule_search (schedule_search, rank) VALUES ('rank', '{RANK}')")
+        cursor.execute(f'''
+        INSERT INTO schedule_search (rowid, course_num, course_name, instructor)
+        SELECT schedule_id, {COURSE_TEXT.format(row='f')}, course_name, {INSTRUCTOR_TEXT.format(row='f')}
+        FROM schedule_flat f
+        ''')
+
+def match_expression(text):
+    """
+    Turn what a user typed into an FTS5 query that matches every word as a
+    prefix, or return None if there are no words in it.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search(conn, text, term_code=None, limit=20):
+    """
+    Return the best matching sections, with their schedules, as a list of
+    dicts. term_code restricts the search to one term. Results are ranked
+    unless more than MAX_RANKED_MATCHES documents match.
+    """
+    match = match_expression(text)
+    if match is None:
+        return []
+    matches = conn.execute("SELECT COUNT(*) FROM schedule_search WHERE schedule_search MATCH ?",
+                           (match,)).fetchone()[0]
+    order = 'rank' if matches <= MAX_RANKED_MATCHES else 'schedule_search.rowid'
+    cursor = conn.execute(SEARCH_SQL.format(order=order),
+                          {'match': match, 'term_code': term_code, 'limit': limit})
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def main():
+    # etl_process imports this module to create the index, so it's only
+    # imported here, once both are loaded
+    import etl_process
+
+    parser = argparse.ArgumentParser(description="Search the class schedule by course or instructor.")
+    parser.add_argument('text', help="course number, words of the course title or instructor name")
+    parser.add_argument('--term', default=None, help="only search this term code, such as 202501")
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--database', default=etl_process.DB_FILE)
+    args = parser.parse_args()
+    if not os.path.exists(args.database):
+        parser.error(f"no database at {args.database}; run etl_process.py first")
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    start = time.perf_counter()
+    results = search(conn, args.text, args.term, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    conn.close()
+
+    for row in results:
+        print(f"{row['term_code']} {row['course_num']} {row['course_name']} (Section {row['section_num']}) - "
+              f"{row['first_name']} {row['last_name']}, {row['bldg_code']} {row['room_num']}, "
+              f"{row['day_pattern']}")
+    print(f"{len(results)} results in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
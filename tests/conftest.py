@@ -0,0 +1,34 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import etl_process
+import generate_data
+
+@pytest.fixture
+def export():
+    """
+    A small synthetic export, as a DataFrame with the registrar's columns.
+    """
+    return generate_data.generate(400, terms=2, departments=3, seed=1)
+
+def run_etl(tmp_path, frames, chunk_size=None, name='class_schedule.db', **options):
+    """
+    Write each frame to a CSV file, load them with the ETL into a database in
+    tmp_path and return an open connection to it.
+    """
+    if not isinstance(frames, list):
+        frames = [frames]
+    files = []
+    for i, frame in enumerate(frames):
+        path = tmp_path / f"export_{i}.csv"
+        frame.to_csv(path, index=False)
+        files.append(str(path))
+    db_file = str(tmp_path / name)
+    with etl_process.ETLPipeline(db_file, use_cache=False) as pipeline:
+        pipeline.run(files, chunk_size=chunk_size, workers=1, **options)
+    return sqlite3.connect(db_file)
@@ -0,0 +1,16 @@
+import os
+import sqlite3
+
+import etl_process
+from conftest import run_etl
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def schema(conn):
+    return dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+def test_checked_in_database_has_the_current_schema(tmp_path, export):
+    # Regenerate class_schedule.db (see the README) when this fails
+    built = run_etl(tmp_path, export)
+    checked_in = sqlite3.connect(f"file:{os.path.join(REPO_DIR, etl_process.DB_FILE)}?mode=ro", uri=True)
+    assert schema(checked_in) == schema(built)
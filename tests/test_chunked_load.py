@@ -0,0 +1,15 @@
+import pytest
+
+from conftest import run_etl
+
+def table_rows(conn):
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+        "AND name NOT LIKE 'schedule_search%' ORDER BY name")]
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in tables}
+
+@pytest.mark.parametrize('chunk_size', [37, 1000])
+def test_chunked_load_matches_a_whole_load(tmp_path, export, chunk_size):
+    whole = table_rows(run_etl(tmp_path, export, name='whole.db'))
+    chunked = table_rows(run_etl(tmp_path, export, chunk_size=chunk_size, name='chunked.db'))
+    assert chunked == whole
@@ -0,0 +1,53 @@
+import pandas as pd
+
+import conflicts
+
+def meetings(*schedules):
+    """
+    Expand (schedule_id, section_id, room_num, instr_id, days, start, end)
+    tuples, all in one term and building, into meetings.
+    """
+    frame = pd.DataFrame(schedules, columns=['schedule_id', 'section_id', 'room_num', 'instr_id',
+                                             'days', 'start_min', 'end_min'])
+    frame['days'] = conflicts.parse_days(frame['days'])
+    return conflicts.expand_meetings(frame.assign(term_id=1, bldg_id=1))
+
+def conflict_rows(*schedules):
+    found = conflicts.detect_conflicts(meetings(*schedules))
+    return sorted(found.itertuples(index=False, name=None))
+
+def test_overlapping_day_patterns_conflict():
+    # The module docstring's example: MW 9:00-10:15 against MWF 9:30-10:20
+    assert conflict_rows((1, 10, '101', None, 'MW', 540, 615),
+                         (2, 20, '101', None, 'MWF', 570, 620)) == [('room', 1, 2, 'MW', 570, 615)]
+
+def test_find_overlaps_reports_each_day():
+    pairs = conflicts.find_overlaps(meetings((1, 10, '101', None, 'MW', 540, 615),
+                                             (2, 20, '101', None, 'MWF', 570, 620)),
+                                    ['term_id', 'bldg_id', 'room_num'])
+    assert sorted(pairs.itertuples(index=False, name=None)) == [(1, 2, 1, 570, 615), (1, 2, 4, 570, 615)]
+
+def test_summarize_pairs_combines_days():
+    pairs = pd.DataFrame({'schedule_id_a': [1, 1, 1], 'schedule_id_b': [2, 2, 2], 'day': [1, 4, 4],
+                          'overlap_start': [570, 560, 560], 'overlap_end': [615, 600, 600]})
+    summary = conflicts.summarize_pairs(pairs, 'room')
+    assert list(summary.itertuples(index=False, name=None)) == [('room', 1, 2, 'MW', 560, 615)]
+
+def test_touching_meetings_do_not_conflict():
+    assert conflict_rows((1, 10, '101', 7, 'TR', 540, 615),
+                         (2, 20, '101', 7, 'TR', 615, 690)) == []
+
+def test_meetings_of_one_section_are_not_an_instructor_conflict():
+    # A lecture and a lab of the same section, taught by one instructor in two rooms
+    assert conflict_rows((1, 10, '101', 7, 'M', 540, 600),
+                         (2, 10, '102', 7, 'M', 570, 630)) == []
+    assert conflict_rows((1, 10, '101', 7, 'M', 540, 600),
+                         (2, 20, '102', 7, 'M', 570, 630)) == [('instructor', 1, 2, 'M', 570, 600)]
+
+def test_unknown_rooms_do_not_conflict():
+    assert conflict_rows((1, 10, 'UNKNOWN', None, 'M', 540, 600),
+                         (2, 20, 'UNKNOWN', None, 'M', 540, 600)) == []
+
+def test_meetings_without_times_are_ignored():
+    assert conflict_rows((1, 10, '101', None, 'M', None, None),
+                         (2, 20, '101', None, 'M', 540, 600)) == []
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from conftest import run_etl
+
+def issue_details(conn, rule):
+    return [row[0] for row in conn.execute("SELECT detail FROM data_issue WHERE rule = ?", (rule,))]
+
+def test_missing_room_is_recorded_not_fatal(tmp_path, export):
+    export.loc[3, 'Room'] = None
+    conn = run_etl(tmp_path, export)
+    details = issue_details(conn, 'orphan_room')
+    assert details
+    assert all(detail is not None for detail in details)
+    assert "Room  has no building code or room number" in details
+
+def test_orphan_room_names_the_missing_part(tmp_path, export):
+    export.loc[3, 'Room'] = 'SEM LAB'
+    export.loc[4, 'Room'] = '101'
+    conn = run_etl(tmp_path, export)
+    details = issue_details(conn, 'orphan_room')
+    assert "Room SEM LAB has no room number" in details
+    assert "Room 101 has no building code" in details
+
+def test_bad_start_time_without_end_time_is_recorded_not_fatal(tmp_path, export):
+    export.loc[5, 'Class Start Time'] = '25.00'
+    export.loc[5, 'Class End Time'] = None
+    conn = run_etl(tmp_path, export)
+    details = issue_details(conn, 'invalid_time')
+    assert details == ["Class Start Time 25.0, Class End Time  is not a time of day, loaded without a time"]
+
+def test_invalid_times_are_loaded_without_a_time(tmp_path, export):
+    export.loc[5, ['Class Days', 'Class Start Time', 'Class End Time']] = ['U', '25.00', '26.00']
+    conn = run_etl(tmp_path, export)
+    times = conn.execute("SELECT start_min, end_min FROM schedule WHERE section_id = ?",
+                         (int(export.loc[5, 'Class Nbr']),)).fetchall()
+    assert times == [(None, None)]
+    assert conn.execute("SELECT MAX(end_min) FROM schedule").fetchone()[0] <= 24 * 60
+
+def loaded_issues(conn):
+    return sorted(conn.execute("SELECT stage, rule, severity, source, row_key, detail FROM data_issue"))
+
+def test_chunked_and_whole_runs_record_the_same_issues(tmp_path, export):
+    # A conflicting row for a class number loaded near the start, late in the file
+    conflicting = export.iloc[[2]].assign(Section='9999')
+    export = pd.concat([export, conflicting], ignore_index=True)
+    whole = run_etl(tmp_path, export, name='whole.db')
+    chunked = run_etl(tmp_path, export, chunk_size=37, name='chunked.db')
+
+    issues = loaded_issues(whole)
+    assert [row for row in issues if row[1] == 'duplicate_class_nbr'] == [
+        ('extract', 'duplicate_class_nbr', 'warning', 'extract', int(export.loc[2, 'Class Nbr']),
+         "Class Nbr already loaded from a different row, skipped")]
+    assert loaded_issues(chunked) == issues
+    for table in ['section', 'schedule']:
+        query = f"SELECT * FROM {table} ORDER BY 1"
+        assert chunked.execute(query).fetchall() == whole.execute(query).fetchall()
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+import dimensions
+from conftest import run_etl
+
+def test_terms_with_the_same_start_date(tmp_path, export):
+    # A full term and a short session that start on the same day
+    first = export['Start Date'].min()
+    short = export.index[export['Start Date'] == first][::2]
+    export.loc[short, 'End Date'] = first + pd.Timedelta(days=50)
+    conn = run_etl(tmp_path, export)
+
+    loaded = dict(conn.execute('''
+    SELECT s.section_id, t.end_date FROM section s JOIN term t ON s.term_id = t.term_id
+    '''))
+    expected = export.drop_duplicates('Class Nbr').set_index('Class Nbr')['End Date']
+    assert {nbr: pd.Timestamp(end) for nbr, end in loaded.items()} == expected.to_dict()
+
+def test_courses_with_the_same_number_and_title_in_two_departments(tmp_path, export):
+    # Two departments offering a course under the same number and title
+    export['College'] = export['College'].where(export.index % 2 == 0, 'OTHER')
+    conn = run_etl(tmp_path, export)
+
+    loaded = dict(conn.execute('''
+    SELECT s.section_id, d.dept_name FROM section s
+    JOIN course c ON s.course_id = c.course_id
+    JOIN department d ON c.dept_id = d.dept_id
+    '''))
+    expected = export.drop_duplicates('Class Nbr').set_index('Class Nbr')['College']
+    assert loaded == expected.to_dict()
+
+def test_lookup_needs_the_full_key():
+    registry = dimensions.DimensionRegistry()
+    terms = pd.DataFrame({'start_date': ['2025-01-21', '2025-01-21'], 'end_date': ['2025-05-06', '2025-03-01']})
+    registry['term'].add(terms, [1, 2])
+
+    assert list(registry['term'].lookup(terms)) == [1, 2]
+    with pytest.raises(ValueError):
+        registry['term'].lookup(terms[['start_date']])
+    with pytest.raises(ValueError):
+        registry['term'].add(terms.iloc[:1], [3])
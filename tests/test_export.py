@@ -0,0 +1,52 @@
+import csv
+import json
+import os
+
+import pytest
+
+import export as exporter
+import partitions
+from conftest import run_etl
+
+def read_rows(path, fmt):
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path).to_pylist()
+    with open(path, encoding='utf-8') as f:
+        if fmt == 'csv':
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f]
+
+@pytest.mark.parametrize('fmt', ['parquet', 'csv', 'ndjson'])
+def test_per_term_export_matches_schedule_flat(tmp_path, export, fmt):
+    db_file = str(tmp_path / 'class_schedule.db')
+    conn = run_etl(tmp_path, export)
+    expected = dict(conn.execute("SELECT term_code, COUNT(*) FROM schedule_flat GROUP BY term_code"))
+    columns = [name for name, _ in exporter.table_columns(conn, 'schedule_flat')]
+    conn.close()
+
+    # One term is read from its archive
+    partitions.archive_term(db_file, min(expected))
+    output_dir = str(tmp_path / 'exports')
+    files = sorted(exporter.export_terms(db_file, ['schedule_flat'], output_dir, fmt, workers=2, batch_rows=50))
+
+    assert [os.path.basename(path) for path, _ in files] == [f"{code}.{fmt}" for code in sorted(expected)]
+    for path, count in files:
+        rows = read_rows(path, fmt)
+        term_code = os.path.basename(path).split('.')[0]
+        assert count == len(rows) == expected[term_code]
+        assert list(rows[0]) == columns
+        assert {row['term_code'] for row in rows} == {term_code}
+
+def test_whole_table_export(tmp_path, export):
+    db_file = str(tmp_path / 'class_schedule.db')
+    conn = run_etl(tmp_path, export)
+    departments = conn.execute("SELECT * FROM department ORDER BY dept_id").fetchall()
+    conn.close()
+
+    path, count = exporter.export_table(db_file, 'department', str(tmp_path), 'ndjson')
+    assert count == len(departments)
+    assert [tuple(row.values()) for row in read_rows(path, 'ndjson')] == departments
+    with pytest.raises(ValueError):
+        exporter.export_table(db_file, 'no_such_table', str(tmp_path), 'csv')
@@ -0,0 +1,39 @@
+import sqlite3
+
+import pytest
+
+import etl_process
+from conftest import run_etl
+
+def test_failed_derived_tables_leave_the_published_load(tmp_path, export, monkeypatch):
+    conn = run_etl(tmp_path, export)
+    before = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('section', 'schedule', 'schedule_flat', 'room_occupancy')}
+    generation = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+
+    def fail(self):
+        raise RuntimeError("room usage failed")
+
+    # The base tables and the reporting tables are written before room usage
+    # fails; none of it may be committed without the new generation
+    monkeypatch.setattr(etl_process.ETLPipeline, 'refresh_room_usage', fail)
+    with pytest.raises(RuntimeError):
+        run_etl(tmp_path, export.iloc[: len(export) // 2], incremental=True)
+
+    conn = sqlite3.connect(str(tmp_path / 'class_schedule.db'))
+    after = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in before}
+    assert after == before
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == generation
+
+def test_incremental_load_publishes_derived_tables_with_the_generation(tmp_path, export):
+    run_etl(tmp_path, export).close()
+    conn = run_etl(tmp_path, export.iloc[: len(export) // 2], incremental=True)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert conn.execute('''
+    SELECT COUNT(*) FROM schedule_flat
+    WHERE schedule_id NOT IN (SELECT schedule_id FROM schedule)
+    ''').fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM schedule_flat").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0]
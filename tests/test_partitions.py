@@ -0,0 +1,40 @@
+import os
+import sqlite3
+
+import partitions
+from conftest import run_etl
+
+def count(conn, sql, *params):
+    return conn.execute(sql, params).fetchone()[0]
+
+def test_archived_term_is_skipped_by_loads_and_still_queried(tmp_path, export):
+    db_file = str(tmp_path / 'class_schedule.db')
+    conn = run_etl(tmp_path, export)
+    term_code = count(conn, "SELECT MIN(term_code) FROM term")
+    flat_rows = count(conn, "SELECT COUNT(*) FROM schedule_flat")
+    term_rows = count(conn, "SELECT COUNT(*) FROM schedule_flat WHERE term_code = ?", term_code)
+    sections = count(conn, '''
+    SELECT COUNT(*) FROM section WHERE term_id IN (SELECT term_id FROM term WHERE term_code = ?)
+    ''', term_code)
+    conn.close()
+
+    assert partitions.archive_term(db_file, term_code)[0] == sections
+    assert partitions.archived_terms(db_file) == [term_code]
+    archive = partitions.connect(db_file, term_code)
+    assert count(archive, "SELECT COUNT(*) FROM section") == sections
+    assert count(archive, "SELECT COUNT(DISTINCT term_code) FROM term") == 1
+    archive.close()
+    assert os.stat(partitions.archive_file(db_file, term_code)).st_mode & 0o777 == 0o444
+
+    # A later load of the whole export leaves the archived term out
+    conn = run_etl(tmp_path, export)
+    assert count(conn, "SELECT COUNT(*) FROM term WHERE term_code = ?", term_code) == 0
+    assert count(conn, "SELECT COUNT(*) FROM schedule_flat") == flat_rows - term_rows
+    conn.close()
+
+    # Queries across partitions still see every row
+    conn = sqlite3.connect(partitions.read_only_uri(db_file), uri=True)
+    assert partitions.attach_archives(conn, db_file) == [term_code]
+    assert count(conn, "SELECT COUNT(*) FROM all_schedule_flat") == flat_rows
+    assert count(conn, "SELECT COUNT(*) FROM all_schedule_flat WHERE partition = ?", term_code) == term_rows
+    conn.close()
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+import query_service
+from conftest import run_etl
+
+def test_result_cache_drops_results_of_an_older_generation():
+    cache = query_service.ResultCache(size=2)
+    cache.get((1, 1), 'a')
+    cache.put((1, 1), 'a', 'rows a')
+    assert cache.get((1, 1), 'a') == 'rows a'
+
+    # A new generation empties the cache, and results of the old one aren't stored
+    assert cache.get((1, 2), 'a') is None
+    cache.put((1, 1), 'a', 'stale rows')
+    assert cache.get((1, 2), 'a') is None
+    assert cache.stats() == {'generation': (1, 2), 'entries': 0, 'hits': 1, 'misses': 3}
+
+def test_result_cache_evicts_the_least_recently_used():
+    cache = query_service.ResultCache(size=2)
+    cache.get(1, 'a')
+    for key in 'abc':
+        cache.put(1, key, key)
+        cache.get(1, 'a')
+    assert [cache.get(1, key) for key in 'abc'] == ['a', None, 'c']
+
+def test_connection_pool_reuses_connections_until_the_file_is_replaced(tmp_path, export):
+    db_file = str(run_etl(tmp_path, export).execute("PRAGMA database_list").fetchone()[2])
+    pool = query_service.ConnectionPool(db_file, size=1)
+    with pool.connection() as (first, inode):
+        pass
+    with pool.connection() as (again, same_inode):
+        assert again is first and same_inode == inode
+
+    # A database published by a rename is picked up on the next borrow
+    shutil.copy(db_file, db_file + '.new')
+    os.replace(db_file + '.new', db_file)
+    with pool.connection() as (reopened, new_inode):
+        assert reopened is not first and new_inode != inode
+    pool.close()
+
+def test_query_service_sees_a_new_generation(tmp_path, export):
+    conn = run_etl(tmp_path, export)
+    term_code = conn.execute("SELECT MIN(term_code) FROM term").fetchone()[0]
+    with query_service.QueryService(str(tmp_path / 'class_schedule.db')) as service:
+        before = service.query('schedule_by_term', term_code=term_code)
+        assert service.query('schedule_by_term', term_code=term_code) is before
+
+        conn.execute("DELETE FROM schedule_flat WHERE term_code = ?", (term_code,))
+        conn.execute(f"PRAGMA user_version = {before['generation'] + 1}")
+        conn.commit()
+        after = service.query('schedule_by_term', term_code=term_code)
+        assert after['generation'] == before['generation'] + 1
+        assert before['rows'] and not after['rows']
+
+@pytest.fixture
+def server(tmp_path, export):
+    run_etl(tmp_path, export).close()
+    service = query_service.QueryService(str(tmp_path / 'class_schedule.db'))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), query_service.make_handler(service))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", tmp_path / 'class_schedule.db'
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+def get(url):
+    try:
+        with urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as error:
+        return error.code, json.load(error)
+
+def test_http_errors_are_json(server):
+    base, db_file = server
+    status, body = get(f"{base}/query/schedule_by_term")
+    assert status == 400 and 'error' in body
+
+    conn = sqlite3.connect(db_file)
+    conn.execute("DROP TABLE schedule_flat")
+    conn.commit()
+    conn.close()
+    status, body = get(f"{base}/query/schedule_by_term?term_code=202001")
+    assert status == 500 and 'no such table' in body['error']
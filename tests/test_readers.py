@@ -0,0 +1,39 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import etl_process
+
+def write_aliased_workbook(path, export):
+    """
+    Write an export as a workbook of two sheets whose headers spell some
+    columns differently.
+    """
+    half = len(export) // 2
+    renamed = export.iloc[half:].rename(columns={'Class Nbr': 'class_number', 'Catalog': 'Catalog Nbr',
+                                                 'Enrollment Capacity': 'enrl cap'})
+    with pd.ExcelWriter(path) as writer:
+        export.iloc[:half].to_excel(writer, sheet_name='Spring', index=False)
+        renamed.to_excel(writer, sheet_name='Fall', index=False)
+
+def load(path, db_file, chunk_size=None):
+    with etl_process.ETLPipeline(str(db_file), use_cache=False) as pipeline:
+        pipeline.run([str(path)], chunk_size=chunk_size)
+    conn = sqlite3.connect(str(db_file))
+    rows = {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+            for table in ['course', 'section', 'schedule']}
+    conn.close()
+    return rows
+
+@pytest.mark.parametrize('chunk_size', [None, 50])
+def test_sheets_with_aliased_headers(tmp_path, export, chunk_size):
+    path = tmp_path / 'export.xlsx'
+    write_aliased_workbook(path, export)
+    rows = load(path, tmp_path / 'schedule.db', chunk_size)
+    assert len(rows['section']) == export['Class Nbr'].nunique()
+
+def test_aliased_sheets_load_the_same_whole_or_chunked(tmp_path, export):
+    path = tmp_path / 'export.xlsx'
+    write_aliased_workbook(path, export)
+    assert load(path, tmp_path / 'whole.db') == load(path, tmp_path / 'chunked.db', chunk_size=50)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import room_usage
+from conftest import run_etl
+
+MONDAY = 1
+
+def meetings():
+    # Two overlapping meetings in a room for 100, and one in a room of unknown capacity
+    return pd.DataFrame({
+        'bldg_id': [1, 1, 1],
+        'bldg_code': ['SEM', 'SEM', 'SEM'],
+        'room_num': ['101', '101', '102'],
+        'capacity': [100, 100, np.nan],
+        'days': [MONDAY, MONDAY, MONDAY],
+        'start_min': [600, 630, 600],
+        'end_min': [660, 690, 630],
+        'max_seats': [40, 60, 10]
+    })
+
+def test_room_seat_utilization():
+    occupancy = room_usage.analyze_term(1, meetings())['room_occupancy'].set_index('room_num')
+    assert occupancy.loc['101', 'capacity'] == 100
+    assert occupancy.loc['101', 'booked_minutes'] == 90
+    assert occupancy.loc['101', 'peak_seats'] == 100
+    # 40 seats for 30 minutes, 100 for 30 and 60 for 30, in 90 minutes of a room for 100
+    assert occupancy.loc['101', 'seat_utilization'] == pytest.approx(6000 / 9000)
+    assert pd.isna(occupancy.loc['102', 'capacity'])
+    assert occupancy.loc['102', 'seat_utilization'] is None
+
+def test_building_seat_utilization():
+    slots = room_usage.analyze_term(1, meetings())['building_slot_usage'].set_index('slot_start')
+    assert list(slots.index) == [600, 630, 660]
+    assert list(slots['peak_rooms']) == [2, 1, 1]
+    assert list(slots['peak_seats']) == [50, 100, 60]
+    # Rooms of unknown capacity count toward neither seats nor capacity
+    assert list(slots['peak_capacity']) == [100, 100, 100]
+    assert list(slots['seat_utilization']) == pytest.approx([0.4, 1.0, 0.6])
+
+def test_room_capacity_is_loaded(tmp_path, export):
+    conn = run_etl(tmp_path, export, chunk_size=50)
+    loaded = {(code, room): capacity for code, room, capacity in conn.execute('''
+    SELECT b.bldg_code, r.room_num, r.capacity FROM room r JOIN building b ON r.bldg_id = b.bldg_id
+    ''')}
+    scheduled = export[export['Room'] != 'ONLINE']
+    expected = scheduled.groupby('Room')['Room Capacity'].max()
+    assert {f"{code} {room}": capacity for (code, room), capacity in loaded.items()
+            if room != 'UNKNOWN'} == expected.to_dict()
+    assert conn.execute("SELECT COUNT(*) FROM room_occupancy WHERE seat_utilization IS NULL").fetchone()[0] == 0
+
+def test_exports_without_room_capacity(tmp_path, export):
+    conn = run_etl(tmp_path, export.drop(columns='Room Capacity'))
+    assert conn.execute("SELECT COUNT(*), COUNT(capacity) FROM room").fetchone()[0] > 0
+    assert conn.execute("SELECT COUNT(capacity) FROM room").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(seat_utilization) FROM room_occupancy").fetchone()[0] == 0
+
+def test_meetings_past_midnight_stay_in_their_row():
+    # Room 101's Sunday row is followed by room 102's Monday row on the grid
+    late = pd.DataFrame({
+        'bldg_id': [1, 1],
+        'bldg_code': ['SEM', 'SEM'],
+        'room_num': ['101', '102'],
+        'capacity': [100, 100],
+        'days': [1 << 6, MONDAY],
+        'start_min': [25 * 60, 600],
+        'end_min': [26 * 60, 630],
+        'max_seats': [40, 60]
+    })
+    occupancy = room_usage.analyze_term(1, late)['room_occupancy'].set_index(['room_num', 'day'])
+    assert occupancy.loc[('102', 'M'), 'peak_meetings'] == 1
+    assert occupancy.loc[('102', 'M'), 'seat_utilization'] == pytest.approx(0.6)
+
+def test_load_with_a_meeting_past_midnight(tmp_path, export):
+    late = export.iloc[[0]].assign(**{'Class Days': 'U', 'Class Start Time': '25.00',
+                                      'Class End Time': '26.00', 'Room': 'ZZZ 1',
+                                      'Class Nbr': export['Class Nbr'].max() + 1})
+    conn = run_etl(tmp_path, pd.concat([export, late], ignore_index=True))
+    assert conn.execute("SELECT COUNT(*) FROM room_occupancy WHERE bldg_code = 'ZZZ'").fetchone()[0] == 0
+
+def test_incremental_capacity_change_matches_a_rebuild(tmp_path, export):
+    room = export.loc[export['Room'] != 'ONLINE', 'Room'].iloc[0]
+    changed = export.assign(**{'Room Capacity': export['Room Capacity'].where(export['Room'] != room, 5)})
+    run_etl(tmp_path, export, chunk_size=50, name='incremental.db').close()
+    incremental = run_etl(tmp_path, changed, chunk_size=50, name='incremental.db', incremental=True)
+    rebuilt = run_etl(tmp_path, changed, chunk_size=50, name='rebuilt.db')
+
+    for sql in ("SELECT bldg_id, room_num, capacity FROM room ORDER BY 1, 2",
+                "SELECT * FROM room_occupancy ORDER BY 1, 2, 3, 4",
+                "SELECT * FROM building_slot_usage ORDER BY 1, 2, 3, 4"):
+        assert incremental.execute(sql).fetchall() == rebuilt.execute(sql).fetchall()
+    assert incremental.execute("SELECT MIN(capacity) FROM room").fetchone()[0] == 5
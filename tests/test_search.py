@@ -0,0 +1,28 @@
+import search
+from conftest import run_etl
+
+def course_nums(conn, text):
+    return {row['course_num'] for row in search.search(conn, text, limit=1000)}
+
+def test_search_follows_an_incremental_load(tmp_path, export):
+    courses = (export['Subject'] + export['Catalog'].str.strip()).unique()
+    kept, added = courses[0], courses[1]
+    first = export[(export['Subject'] + export['Catalog'].str.strip()) != added]
+    run_etl(tmp_path, first).close()
+
+    # Drop every section of one course and add those of another
+    second = export[(export['Subject'] + export['Catalog'].str.strip()) != kept]
+    conn = run_etl(tmp_path, second, incremental=True)
+    assert course_nums(conn, added) == {added}
+    assert course_nums(conn, kept) == set()
+    assert conn.execute("SELECT COUNT(*) FROM schedule_search").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM schedule_flat").fetchone()[0]
+
+def test_search_matches_course_number_prefixes_and_instructors(tmp_path, export):
+    conn = run_etl(tmp_path, export)
+    row = export.iloc[0]
+    subject, number = row['Subject'], row['Catalog'].strip()
+    assert f"{subject}{number}" in course_nums(conn, f"{subject} {number}")
+    results = search.search(conn, f"{row['Instructor Last Name'][:4]} {subject}", limit=1000)
+    assert results and all(result['last_name'].startswith(row['Instructor Last Name'][:4]) for result in results)
+    assert search.search(conn, "!!") == []
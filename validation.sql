@@ -30,9 +30,15 @@
 .print "\n=== Building Table Schema ==="
 .schema building
 
+.print "\n=== Room Table Schema ==="
+.schema room
+
 .print "\n=== Schedule Table Schema ==="
 .schema schedule
 
+.print "\n=== Reporting Table Schema ==="
+.schema schedule_flat
+
 -- 2. Data Validation - Count records in each table
 .print "\n=== Record Counts ==="
 SELECT 'Department' as Table_Name, COUNT(*) as Record_Count FROM department
@@ -107,23 +113,17 @@ ORDER BY Schedule_Count DESC;
 
 .print "\n=== Complete Class Schedule (Sample) ==="
 SELECT 
-    d.dept_name as Department,
-    c.course_num as Course,
-    c.course_name as Title,
-    s.section_num as Section,
-    i.last_name as Instructor,
-    t.term_name as Term,
-    b.bldg_name as Building,
-    sch.room_num as Room,
-    sch.day_pattern as Schedule
-FROM schedule sch
-JOIN section s ON sch.section_id = s.section_id
-JOIN course c ON s.course_id = c.course_id
-JOIN department d ON c.dept_id = d.dept_id
-JOIN instructor i ON s.instr_id = i.instr_id
-JOIN term t ON s.term_id = t.term_id
-JOIN building b ON sch.bldg_id = b.bldg_id
-ORDER BY d.dept_name, c.course_num, s.section_num
+    dept_name as Department,
+    course_num as Course,
+    course_name as Title,
+    section_num as Section,
+    last_name as Instructor,
+    term_name as Term,
+    bldg_name as Building,
+    room_num as Room,
+    day_pattern as Schedule
+FROM schedule_flat
+ORDER BY dept_name, course_num, section_num
 LIMIT 10;
 
 .print "\n=== Sections with Highest Enrollment Capacity ==="
@@ -141,51 +141,95 @@ ORDER BY s.max_seats DESC
 LIMIT 10;
 
 .print "\n=== Class Days Distribution ==="
+WITH day (bit, name) AS (
+    VALUES (1, 'M'), (2, 'T'), (4, 'W'), (8, 'R'), (16, 'F'), (32, 'S'), (64, 'U')
+),
+patterns AS (
+    SELECT days, COUNT(*) as Class_Count
+    FROM schedule
+    GROUP BY days
+)
 SELECT 
-    SUBSTR(sch.day_pattern, 1, 2) as Day,
-    COUNT(sch.schedule_id) as Class_Count
-FROM schedule sch
-WHERE SUBSTR(sch.day_pattern, 1, 1) IN ('M', 'T', 'W', 'R', 'F')
-GROUP BY Day
-ORDER BY 
-    CASE Day
-        WHEN 'M' THEN 1
-        WHEN 'T' THEN 2
-        WHEN 'W' THEN 3
-        WHEN 'R' THEN 4
-        WHEN 'F' THEN 5
-        ELSE 6
-    END;
-
-.print "\n=== Room Utilization (Top 10) ==="
+    day.name as Day,
+    SUM(p.Class_Count) as Class_Count
+FROM day
+JOIN patterns p ON p.days & day.bit
+GROUP BY day.bit
+ORDER BY day.bit;
+
+.print "\n=== Rooms in Use on Tuesday at 10:30 ==="
 SELECT 
     b.bldg_name,
     sch.room_num,
-    COUNT(sch.schedule_id) as Usage_Count
-FROM schedule sch
-JOIN building b ON sch.bldg_id = b.bldg_id
-GROUP BY b.bldg_id, sch.room_num
+    c.course_num,
+    sch.day_pattern
+FROM building b
+JOIN schedule sch ON sch.bldg_id = b.bldg_id
+JOIN section s ON sch.section_id = s.section_id
+JOIN course c ON s.course_id = c.course_id
+WHERE sch.days & 2
+  AND sch.start_min <= 10 * 60 + 30
+  AND sch.end_min > 10 * 60 + 30
+ORDER BY b.bldg_name, sch.room_num;
+
+.print "\n=== Room Utilization (Top 10) ==="
+SELECT 
+    bldg_name,
+    room_num,
+    SUM(meetings) as Usage_Count,
+    SUM(weekly_minutes) as Weekly_Minutes
+FROM room_summary
+GROUP BY bldg_id, room_num
 ORDER BY Usage_Count DESC
 LIMIT 10;
 
-.print "\n=== Potential Scheduling Conflicts (Same Room, Same Time) ==="
+.print "\n=== Room Occupancy by Weekday (Top 10) ==="
+SELECT
+    bldg_code,
+    room_num,
+    day,
+    capacity,
+    meetings,
+    printf('%.1f', booked_minutes / 60.0) as Hours_Booked,
+    peak_meetings,
+    printf('%.0f%%', 100 * seat_utilization) as Seats_Used
+FROM room_occupancy
+ORDER BY booked_minutes DESC, bldg_code, room_num
+LIMIT 10;
+
+.print "\n=== Busiest Time Slots per Building (Top 10) ==="
+SELECT
+    bldg_code,
+    day,
+    printf('%d:%02d', slot_start / 60, slot_start % 60) as Slot,
+    peak_meetings,
+    peak_rooms,
+    peak_seats,
+    peak_capacity,
+    printf('%.0f%%', 100 * seat_utilization) as Seats_Used
+FROM building_slot_usage
+ORDER BY peak_meetings DESC, bldg_code, day, slot_start
+LIMIT 10;
+
+.print "\n=== Scheduling Conflicts (Same Room or Instructor, Overlapping Times) ==="
 SELECT 
-    a.section_id as Section_A,
-    b.section_id as Section_B,
+    cf.conflict_type,
     c1.course_num as Course_A,
     c2.course_num as Course_B,
     bldg.bldg_name,
     a.room_num,
-    a.day_pattern
-FROM schedule a
-JOIN schedule b ON a.bldg_id = b.bldg_id AND a.room_num = b.room_num AND a.day_pattern = b.day_pattern
+    cf.days,
+    printf('%d:%02d-%d:%02d', cf.overlap_start / 60, cf.overlap_start % 60,
+           cf.overlap_end / 60, cf.overlap_end % 60) as Overlap
+FROM conflict cf
+JOIN schedule a ON cf.schedule_id_a = a.schedule_id
+JOIN schedule b ON cf.schedule_id_b = b.schedule_id
 JOIN section s1 ON a.section_id = s1.section_id
 JOIN section s2 ON b.section_id = s2.section_id
 JOIN course c1 ON s1.course_id = c1.course_id
 JOIN course c2 ON s2.course_id = c2.course_id
 JOIN building bldg ON a.bldg_id = bldg.bldg_id
-WHERE a.section_id < b.section_id
-ORDER BY bldg.bldg_name, a.room_num, a.day_pattern
+ORDER BY cf.conflict_type, bldg.bldg_name, a.room_num, cf.days
 LIMIT 10;
 
 .print "\n=== Course Offerings by Department ==="
@@ -199,4 +243,13 @@ JOIN section s ON c.course_id = s.course_id
 GROUP BY d.dept_id
 ORDER BY Section_Count DESC;
 
+.print "\n=== Data-Quality Issues ==="
+SELECT 
+    severity,
+    rule,
+    COUNT(*) as Issue_Count
+FROM data_issue
+GROUP BY severity, rule
+ORDER BY severity, Issue_Count DESC;
+
 .print "\n=== Database Validation Complete ==="
\ No newline at end of file